@@ -0,0 +1,110 @@
+import asyncio
+from collections.abc import Callable, Coroutine
+from contextlib import suppress
+from typing import Any
+
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy.exc import DBAPIError
+
+from api.profiling import ProfiledRoute
+from configs.config import settings
+from configs.logging_config import logger
+from database.database import statement_timeout
+from exceptions import Overloaded
+from utils.metrics import HTTP_REQUESTS_CANCELLED, HTTP_STATEMENT_TIMEOUTS
+
+# Код ошибки Postgres query_canceled: запрос прерван по statement_timeout
+QUERY_CANCELED = "57014"
+# Нестандартный код "клиент закрыл соединение" (nginx): ответ никто не получит, код нужен для метрик и логов
+CLIENT_CLOSED_REQUEST = 499
+
+
+def route_statement_timeout(path: str) -> int:
+    """
+    Возвращает ограничение времени запросов к БД для маршрута, мс.
+
+    :param path: Шаблон пути маршрута (`/trading/dynamics`).
+    """
+    return settings.DB_ROUTE_STATEMENT_TIMEOUTS_MS.get(path, settings.DB_STATEMENT_TIMEOUT_MS)
+
+
+async def wait_for_disconnect(request: Request) -> None:
+    """Ждет разрыва соединения клиентом (тело запроса должно быть уже прочитано)."""
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def run_until_disconnect(request: Request, handler: Coroutine[Any, Any, Response]) -> Response | None:
+    """
+    Выполняет обработчик запроса, отменяя его при разрыве соединения клиентом.
+
+    Отмена прерывает ожидание asyncpg: драйвер отправляет серверу запрос
+    на отмену выполняемого выражения, и соединение возвращается в пул.
+
+    :param request: Входящий запрос.
+    :param handler: Обработчик запроса.
+    :return: Ответ обработчика или None, если клиент разорвал соединение.
+    """
+    # Тело читается заранее (Request кэширует его): дальше receive() вернет только разрыв соединения
+    await request.body()
+    handler_task = asyncio.ensure_future(handler)
+    disconnect_task = asyncio.ensure_future(wait_for_disconnect(request))
+    try:
+        await asyncio.wait((handler_task, disconnect_task), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in (disconnect_task, handler_task):
+            if not task.done():
+                task.cancel()
+        with suppress(asyncio.CancelledError):
+            await disconnect_task
+    if handler_task.done() and not handler_task.cancelled():
+        return handler_task.result()
+    # Ошибки отмененного обработчика (например, прерванного запроса к БД) клиенту уже не нужны
+    await asyncio.gather(handler_task, return_exceptions=True)
+    return None
+
+
+class CancellableRoute(ProfiledRoute):
+    """
+    Маршрут, не дающий запросу занимать соединение с БД дольше нужного.
+
+    - транзакции запроса получают `statement_timeout` маршрута
+      (`DB_ROUTE_STATEMENT_TIMEOUTS_MS` или `DB_STATEMENT_TIMEOUT_MS`),
+      запрос, прерванный по нему, получает ответ 504;
+    - при разрыве соединения клиентом обработчик отменяется вместе
+      с выполняемым запросом к БД;
+    - запрос, не допущенный к БД при перегрузке (`AdmissionLimiter`),
+      сразу получает ответ 503 с заголовком Retry-After.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def cancellable_handler(request: Request) -> Response:
+            token = statement_timeout.set(route_statement_timeout(self.path))
+            try:
+                response = await run_until_disconnect(request, handler(request))
+            except DBAPIError as e:
+                if getattr(e.orig, "sqlstate", None) != QUERY_CANCELED:
+                    raise
+                HTTP_STATEMENT_TIMEOUTS.labels(self.path).inc()
+                logger.warning("Запрос %s?%s прерван по statement_timeout", request.url.path, request.url.query)
+                raise HTTPException(
+                    status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                    detail="Запрос выполнялся слишком долго, сузьте диапазон дат или уменьшите limit",
+                ) from e
+            except Overloaded as e:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Сервис перегружен, повторите запрос позже",
+                    headers={"Retry-After": str(e.retry_after)},
+                ) from e
+            finally:
+                statement_timeout.reset(token)
+            if response is None:
+                HTTP_REQUESTS_CANCELLED.labels(self.path).inc()
+                logger.info("Клиент разорвал соединение, запрос %s?%s отменен", request.url.path, request.url.query)
+                return Response(status_code=CLIENT_CLOSED_REQUEST)
+            return response
+
+        return cancellable_handler
@@ -0,0 +1,112 @@
+import hashlib
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response, status
+from pydantic import BaseModel
+from services.data_version import DataVersionService
+
+from utils.redis_client import get_expiries
+
+
+def make_etag(payload: bytes) -> str:
+    """
+    Вычисляет сильный ETag для тела ответа.
+
+    :param payload: Тело ответа.
+    :return: Значение заголовка ETag (в кавычках).
+    """
+    return f'"{hashlib.md5(payload).hexdigest()}"'  # noqa: S324
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """
+    Проверяет, совпадает ли ETag с одним из значений заголовка If-None-Match.
+
+    :param request: Входящий запрос.
+    :param etag: Текущий ETag ресурса.
+    :return: True, если клиент уже имеет актуальную версию ресурса.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in {value.strip().removeprefix("W/") for value in if_none_match.split(",")}
+
+
+def is_not_modified_since(request: Request, last_modified: str) -> bool:
+    """
+    Проверяет заголовок If-Modified-Since (учитывается только без If-None-Match).
+
+    :param request: Входящий запрос.
+    :param last_modified: Значение заголовка Last-Modified ресурса.
+    :return: True, если ресурс не менялся с указанного клиентом времени.
+    """
+    if_modified_since = request.headers.get("if-modified-since")
+    if not if_modified_since or "if-none-match" in request.headers:
+        return False
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+def conditional_response(request: Request, payload: bytes, max_age: int) -> Response:
+    """
+    Формирует JSON-ответ с заголовками ETag/Cache-Control или ответ 304 Not Modified.
+
+    :param request: Входящий запрос.
+    :param payload: Готовое JSON-тело ответа.
+    :param max_age: Время (в секундах), в течение которого клиент может не перепроверять ответ.
+    :return: Ответ 200 с телом или 304 без тела.
+    """
+    etag = make_etag(payload)
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+    if is_not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+
+class Conditional:
+    """
+    Условные ответы для эндпоинтов торгов.
+
+    ETag строится из версии данных (последний загруженный бюллетень) и нормализованных
+    параметров запроса, поэтому проверка If-None-Match не требует ни запроса в БД,
+    ни сериализации ответа.
+    """
+
+    def __init__(self, request: Request, response: Response, data_version_service: DataVersionService):
+        """
+        Инициализирует объект условного ответа.
+
+        :param request: Входящий запрос.
+        :param response: Ответ, в который добавляются заголовки кэширования.
+        :param data_version_service: Сервис версии данных.
+        """
+        self.request = request
+        self.response = response
+        self.data_version_service = data_version_service
+
+    async def check(self, params: BaseModel) -> Response | None:
+        """
+        Проверяет предусловия запроса и выставляет заголовки кэширования.
+
+        :param params: Провалидированные параметры запроса.
+        :return: Ответ 304 Not Modified, если у клиента актуальные данные, иначе None.
+        """
+        version = await self.data_version_service.get()
+        if version is None:
+            return None
+        etag = make_etag(
+            f"{version.model_dump_json()}:{self.request.url.path}:{params.model_dump_json(exclude_defaults=True)}".encode()
+        )
+        headers = {
+            "ETag": etag,
+            "Last-Modified": format_datetime(version.updated_at, usegmt=True),
+            "Cache-Control": f"public, max-age={get_expiries()}",
+        }
+        if is_not_modified(self.request, etag) or is_not_modified_since(self.request, headers["Last-Modified"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        self.response.headers.update(headers)
+        return None
@@ -1,20 +1,133 @@
 from typing import Annotated
 
-from fastapi import Depends
-from services.tradings import TradingService
+from fastapi import Depends, Header, HTTPException, Request, Response, status
+from fastapi_cache import FastAPICache
+from services.admission import admission_limiters
+from services.catalog import CatalogService
+from services.data_version import DataVersionService
+from services.events import trading_events, TradingEventBroker
+from services.snapshot import trading_snapshot, TradingSnapshot
+from services.tradings import TradingBatchService, TradingService
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.database import get_db
+from api.conditional import Conditional
+from configs.config import settings
+from database.database import AsyncSessionLocal, get_db
 
 
-def trading_service(session: Annotated[AsyncSession, Depends(get_db)]) -> TradingService:
+def data_version_service() -> DataVersionService:
+    """
+    Функция для создания экземпляра DataVersionService.
+
+    :return: Экземпляр DataVersionService, использующий бэкенд и префикс fastapi_cache.
+    """
+    return DataVersionService(FastAPICache.get_backend(), FastAPICache.get_prefix())
+
+
+async def snapshot(
+    version_service: Annotated[DataVersionService, Depends(data_version_service)],
+) -> TradingSnapshot | None:
+    """
+    Возвращает снимок торгов в памяти, если он включен (`SNAPSHOT_ENABLED`) и актуален.
+
+    После загрузки бюллетеней снимок отстает от БД, пока не дочитает новые строки.
+    До этого запросы выполняются в БД: иначе старые строки снимка попали бы
+    в кэш (и ETag новой версии) до следующей загрузки.
+
+    :param version_service: Сервис версии данных.
+    :return: Снимок торгов или None.
+    """
+    if not settings.SNAPSHOT_ENABLED:
+        return None
+    if trading_snapshot.version != await version_service.get():
+        return None
+    return trading_snapshot
+
+
+SnapshotDepends = Annotated[TradingSnapshot | None, Depends(snapshot)]
+
+
+def trading_service(session: Annotated[AsyncSession, Depends(get_db)], snapshot: SnapshotDepends) -> TradingService:
     """
     Функция для создания экземпляра TradingService.
 
-    :param session: Асинхронная сессия базы данных, полученная через Depends(get_db).
-    :return: Экземпляр TradingService, использующий переданную сессию.
+    :param session: Асинхронная сессия базы данных, полученная через Depends(get_db) (создается при первом запросе к БД).
+    :param snapshot: Снимок торгов в памяти (если включен).
+    :return: Экземпляр TradingService, использующий переданную сессию и контроль допуска к БД процесса.
     """
-    return TradingService(session)
+    return TradingService(session, snapshot, admission_limiters)
 
 
 TradingServiceDepends = Annotated[TradingService, Depends(trading_service)]
+
+
+def trading_batch_service(snapshot: SnapshotDepends) -> TradingBatchService:
+    """
+    Функция для создания экземпляра TradingBatchService.
+
+    :param snapshot: Снимок торгов в памяти (если включен).
+    :return: Экземпляр TradingBatchService, открывающий сессии через AsyncSessionLocal.
+    """
+    return TradingBatchService(AsyncSessionLocal, snapshot)
+
+
+TradingBatchServiceDepends = Annotated[TradingBatchService, Depends(trading_batch_service)]
+
+
+def catalog_service(session: Annotated[AsyncSession, Depends(get_db)]) -> CatalogService:
+    """
+    Функция для создания экземпляра CatalogService.
+
+    :param session: Асинхронная сессия базы данных, полученная через Depends(get_db) (создается при первом запросе к БД).
+    :return: Экземпляр CatalogService, использующий бэкенд и префикс fastapi_cache.
+    """
+    return CatalogService(session, FastAPICache.get_backend(), FastAPICache.get_prefix())
+
+
+CatalogServiceDepends = Annotated[CatalogService, Depends(catalog_service)]
+
+
+def trading_event_broker() -> TradingEventBroker:
+    """
+    Возвращает рассылку событий о новых торговых днях текущего процесса.
+
+    :return: Экземпляр TradingEventBroker, подписанный на канал событий при запуске приложения.
+    """
+    return trading_events
+
+
+TradingEventsDepends = Annotated[TradingEventBroker, Depends(trading_event_broker)]
+
+
+def conditional(
+    request: Request,
+    response: Response,
+    version_service: Annotated[DataVersionService, Depends(data_version_service)],
+) -> Conditional:
+    """
+    Функция для создания объекта условного ответа (ETag/Last-Modified).
+
+    :param request: Входящий запрос.
+    :param response: Ответ, в который добавляются заголовки кэширования.
+    :param version_service: Сервис версии данных.
+    :return: Экземпляр Conditional.
+    """
+    return Conditional(request, response, version_service)
+
+
+ConditionalDepends = Annotated[Conditional, Depends(conditional)]
+
+
+def verify_admin_token(x_admin_token: Annotated[str | None, Header()] = None) -> None:
+    """
+    Проверяет токен доступа к административным эндпоинтам.
+
+    Если `ADMIN_TOKEN` не задан, административные эндпоинты отключены.
+
+    :param x_admin_token: Значение заголовка `X-Admin-Token`.
+    :raises HTTPException: 404, если доступ отключен, и 403 при неверном токене.
+    """
+    if settings.ADMIN_TOKEN is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if not settings.check_admin_token(x_admin_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Неверный токен администратора")
@@ -0,0 +1,78 @@
+import functools
+import time
+from collections.abc import Callable, Coroutine
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from configs.config import settings
+from configs.logging_config import logger
+from utils.profiling import current_profile, RequestProfile
+
+PROFILE_HEADER = "x-profile"
+PROFILE_QUERY = "profile"
+
+
+def profiling_requested(request: Request) -> bool:
+    """
+    Проверяет, запрошено ли профилирование запроса.
+
+    Профилирование включается заголовком `X-Profile: 1` или параметром
+    `?profile=1` и только вместе с верным заголовком `X-Admin-Token`.
+    Без токена флаг молча игнорируется.
+    """
+    flag = request.headers.get(PROFILE_HEADER) or request.query_params.get(PROFILE_QUERY)
+    if flag not in ("1", "true"):
+        return False
+    return settings.check_admin_token(request.headers.get("x-admin-token"))
+
+
+def _mark_endpoint(endpoint: Callable[..., Coroutine[Any, Any, Any]]) -> Callable[..., Coroutine[Any, Any, Any]]:
+    """Оборачивает эндпоинт, отмечая в профиле начало и окончание его выполнения."""
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        profile = current_profile.get()
+        if profile is None:
+            return await endpoint(*args, **kwargs)
+        profile.endpoint_started = time.perf_counter()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            profile.endpoint_finished = time.perf_counter()
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """
+    Маршрут с профилированием по запросу.
+
+    Время запроса разбивается на этапы: разрешение зависимостей (`get_db`,
+    сервисы, валидация параметров), обращения к кэшу, запросы к БД, создание
+    ORM-объектов, остальной код эндпоинта и сериализация ответа. Результат
+    возвращается в заголовке `Server-Timing` и пишется в лог.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        super().__init__(path, _mark_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def profiled_handler(request: Request) -> Response:
+            if not profiling_requested(request):
+                return await handler(request)
+            profile = RequestProfile()
+            token = current_profile.set(profile)
+            try:
+                response = await handler(request)
+            finally:
+                current_profile.reset(token)
+                profile.finish()
+            response.headers["Server-Timing"] = profile.server_timing()
+            logger.info("Профиль запроса %s?%s: %s", request.url.path, request.url.query, profile.timings())
+            return response
+
+        return profiled_handler
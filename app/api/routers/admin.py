@@ -0,0 +1,14 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query
+
+from api.dependencies import verify_admin_token
+from schemas.admin import SlowQuery
+from utils.query_monitor import query_monitor
+
+router = APIRouter(dependencies=[Depends(verify_admin_token)])
+
+
+@router.get("/slow_queries", summary="Последние медленные запросы к БД с планами выполнения")
+async def get_slow_queries(limit: Annotated[int, Query(ge=1, le=1000)] = 50) -> list[SlowQuery]:
+    return [SlowQuery.model_validate(query, from_attributes=True) for query in query_monitor.recent(limit)]
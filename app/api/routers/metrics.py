@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from utils.metrics import collect_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", summary="Метрики Prometheus", include_in_schema=False)
+async def get_metrics() -> Response:
+    return Response(collect_metrics(), media_type=CONTENT_TYPE_LATEST)
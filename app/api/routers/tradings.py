@@ -1,33 +1,86 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
-from api.dependencies import TradingServiceDepends
-from schemas.params import DynamicParams, LastParams, LimitOffset
-from schemas.tradings import Trading, TradingLastDays
+from api.cancellation import CancellableRoute
+from api.conditional import conditional_response
+from api.dependencies import (
+    CatalogServiceDepends,
+    ConditionalDepends,
+    TradingBatchServiceDepends,
+    TradingEventsDepends,
+    TradingServiceDepends,
+)
+from schemas.params import BatchParams, DynamicParams, LastParams, LimitOffset
+from schemas.tradings import CatalogItem, PartialTrading, TradingLastDays
+from utils.redis_client import get_expiries
 
-router = APIRouter()
+router = APIRouter(route_class=CancellableRoute)
 
 
 @router.get("/last_trading_dates", summary="Список дат последних торговых дней")
 async def get_last_trading_dates(
-    trading_service: TradingServiceDepends, params: Annotated[LimitOffset, Query()]
+    trading_service: TradingServiceDepends, conditional: ConditionalDepends, params: Annotated[LimitOffset, Query()]
 ) -> TradingLastDays:
+    if not_modified := await conditional.check(params):
+        return not_modified
     results = await trading_service.get_last_dates(**params.model_dump())
     return TradingLastDays(dates=results)
 
 
-@router.get("/dynamics", summary="Список торгов за заданный период")
+@router.get("/dynamics", summary="Список торгов за заданный период", response_model_exclude_unset=True)
 async def get_dynamics(
-    trading_service: TradingServiceDepends, params: Annotated[DynamicParams, Query()]
-) -> list[Trading]:
+    trading_service: TradingServiceDepends, conditional: ConditionalDepends, params: Annotated[DynamicParams, Query()]
+) -> list[PartialTrading]:
+    if not_modified := await conditional.check(params):
+        return not_modified
     results = await trading_service.filter(**params.model_dump(exclude_unset=True))
     return results
 
 
-@router.get("/trading_results", summary="Список последних торгов")
+@router.get("/trading_results", summary="Список последних торгов", response_model_exclude_unset=True)
 async def get_trading_results(
-    trading_service: TradingServiceDepends, params: Annotated[LastParams, Query()]
-) -> list[Trading]:
+    trading_service: TradingServiceDepends, conditional: ConditionalDepends, params: Annotated[LastParams, Query()]
+) -> list[PartialTrading]:
+    if not_modified := await conditional.check(params):
+        return not_modified
     results = await trading_service.filter(**params.model_dump(exclude_unset=True))
     return results
+
+
+@router.post("/batch", summary="Пакет запросов фильтрации торгов", response_model_exclude_unset=True)
+async def get_batch_results(
+    batch_service: TradingBatchServiceDepends, params: BatchParams
+) -> list[list[PartialTrading]]:
+    results = await batch_service.filter_many([query.model_dump(exclude_unset=True) for query in params.queries])
+    return results
+
+
+@router.get(
+    "/events",
+    summary="Поток событий о новых торговых днях (Server-Sent Events)",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def get_events(events: TradingEventsDepends) -> StreamingResponse:
+    return StreamingResponse(
+        events.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/catalog/oils", summary="Справочник кодов нефтепродуктов", response_model=list[CatalogItem])
+async def get_catalog_oils(catalog_service: CatalogServiceDepends, request: Request) -> Response:
+    return conditional_response(request, await catalog_service.get("oils"), get_expiries())
+
+
+@router.get("/catalog/bases", summary="Справочник базисов поставки", response_model=list[CatalogItem])
+async def get_catalog_bases(catalog_service: CatalogServiceDepends, request: Request) -> Response:
+    return conditional_response(request, await catalog_service.get("bases"), get_expiries())
+
+
+@router.get("/catalog/delivery_types", summary="Справочник типов поставки", response_model=list[CatalogItem])
+async def get_catalog_delivery_types(catalog_service: CatalogServiceDepends, request: Request) -> Response:
+    return conditional_response(request, await catalog_service.get("delivery_types"), get_expiries())
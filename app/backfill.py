@@ -0,0 +1,218 @@
+"""
+Историческая загрузка бюллетеней в несколько процессов.
+
+Собирает список бюллетеней за диапазон дат со страниц результатов торгов,
+исключает уже загруженные (контрольные точки в таблице `backfill_checkpoints`)
+и делит оставшиеся на непрерывные по датам части по числу процессов. Каждая
+часть загружается в отдельном процессе со своей HTTP-сессией и пулом
+соединений с БД: разбор XLS-файлов занимает процессор, и один процесс
+ограничен одним ядром.
+
+Загруженный бюллетень отмечается в контрольных точках в той же транзакции,
+что и его строки, поэтому прерванная загрузка при повторном запуске
+продолжается с незагруженных бюллетеней.
+
+Запуск:
+
+    python backfill.py --start 2023-01-01 --end 2024-12-31 --workers 4
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from multiprocessing import get_context
+from typing import Any
+
+from aiohttp import ClientSession, TCPConnector
+from parser_main import download_data, process_page, refresh_derived_data
+from services.backfill import BackfillService
+from services.bulletin_writer import BulletinWriter
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession, create_async_engine
+
+from configs.config import settings
+from configs.logging_config import logger
+from utils.ingestion_stats import IngestionStats
+
+Bulletin = tuple[str, date]
+
+
+async def collect_bulletins(
+    base_url: str, start_date: date, end_date: date, first_page: int, last_page: int, stats: IngestionStats
+) -> list[Bulletin]:
+    """
+    Собирает ссылки на бюллетени за диапазон дат.
+
+    Страницы обходятся от новых бюллетеней к старым до первой страницы
+    с датой раньше `start_date`.
+
+    :return: Ссылки на файлы с датами торгов от новых к старым.
+    """
+    bulletins = []
+    async with ClientSession() as session:
+        for page in range(first_page, last_page + 1):
+            file_links, reached_boundary = await process_page(
+                session, page, stats, base_url, start_date.year, end_date.year
+            )
+            bulletins.extend((link, day) for link, day in file_links if start_date <= day <= end_date)
+            if reached_boundary or any(day < start_date for _, day in file_links):
+                break
+    return sorted(bulletins, key=lambda bulletin: bulletin[1], reverse=True)
+
+
+def split_shards(bulletins: list[Bulletin], workers: int) -> list[list[Bulletin]]:
+    """
+    Делит бюллетени на непрерывные по датам части примерно одинакового размера.
+
+    :param bulletins: Бюллетени, отсортированные по дате.
+    :param workers: Количество частей.
+    :return: Непустые части.
+    """
+    size, rest = divmod(len(bulletins), max(workers, 1))
+    shards, start = [], 0
+    for index in range(max(workers, 1)):
+        stop = start + size + (index < rest)
+        if stop > start:
+            shards.append(bulletins[start:stop])
+        start = stop
+    return shards
+
+
+async def load_shard(
+    shard: list[Bulletin], base_url: str, database_url: str, options: dict[str, Any]
+) -> dict[str, Any]:
+    """
+    Загружает часть бюллетеней (выполняется в отдельном процессе).
+
+    :param shard: Ссылки на файлы с датами торгов.
+    :param base_url: Адрес сайта биржи.
+    :param database_url: Адрес базы данных.
+    :param options: Параметры загрузки (`max_concurrent_requests`, `max_db_concurrent`, `batch_size`).
+    :return: Сводка статистики загрузки части.
+    """
+    stats = IngestionStats()
+    engine = create_async_engine(database_url, pool_size=options["max_db_concurrent"], max_overflow=0)
+    session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    writer = BulletinWriter(
+        session_factory,
+        stats,
+        batch_size=options["batch_size"],
+        max_concurrent=options["max_db_concurrent"],
+        checkpoint=True,
+    )
+    connector = TCPConnector(limit=options["max_concurrent_requests"])
+    try:
+        async with ClientSession(connector=connector) as session, writer:
+            await asyncio.gather(
+                *(download_data(session, base_url + link, day, writer, stats) for link, day in shard)
+            )
+    finally:
+        await engine.dispose()
+    stats.finish()
+    logger.info("Часть %s - %s загружена: %s", shard[0][1], shard[-1][1], stats.summary())
+    return stats.summary()
+
+
+def run_shard(shard: list[Bulletin], base_url: str, database_url: str, options: dict[str, Any]) -> dict[str, Any]:
+    """Точка входа процесса загрузки части."""
+    return asyncio.run(load_shard(shard, base_url, database_url, options))
+
+
+async def backfill(
+    start_date: date,
+    end_date: date,
+    workers: int,
+    base_url: str = settings.SPIMEX_BASE_URL,
+    database_url: str = settings.get_db_postgres_url(),
+    first_page: int = settings.PARSER_FIRST_PAGE,
+    last_page: int = settings.PARSER_LAST_PAGE,
+    max_concurrent_requests: int = settings.PARSER_MAX_CONCURRENT_REQUESTS,
+    max_db_concurrent: int = settings.PARSER_MAX_DB_CONCURRENT,
+    batch_size: int = settings.PARSER_BATCH_SIZE,
+) -> dict[str, Any]:
+    """
+    Загружает бюллетени за диапазон дат в `workers` процессов.
+
+    :param start_date: Начальная дата торгов.
+    :param end_date: Конечная дата торгов.
+    :param workers: Количество процессов.
+    :param base_url: Адрес сайта биржи (или его локальной замены).
+    :param database_url: Адрес базы данных.
+    :param first_page: Первая страница результатов торгов.
+    :param last_page: Последняя страница результатов торгов.
+    :param max_concurrent_requests: Максимальное число одновременных HTTP-запросов в процессе.
+    :param max_db_concurrent: Максимальное число одновременных записей в БД в процессе.
+    :param batch_size: Количество бюллетеней в одной транзакции.
+    :return: Сводка: количество бюллетеней, уже загруженных ранее, и суммарная статистика процессов.
+    """
+    started = time.perf_counter()
+    stats = IngestionStats()
+    bulletins = await collect_bulletins(base_url, start_date, end_date, first_page, last_page, stats)
+    engine = create_async_engine(database_url)
+    try:
+        async with async_sessionmaker(bind=engine)() as session:
+            loaded = await BackfillService(session).loaded_dates(start_date, end_date)
+    finally:
+        await engine.dispose()
+    pending = [bulletin for bulletin in bulletins if bulletin[1] not in loaded]
+    logger.info("Найдено %s бюллетеней, загружено ранее %s", len(bulletins), len(bulletins) - len(pending))
+
+    shards = split_shards(pending, workers)
+    options = {
+        "max_concurrent_requests": max_concurrent_requests,
+        "max_db_concurrent": max_db_concurrent,
+        "batch_size": batch_size,
+    }
+    loop = asyncio.get_running_loop()
+    # spawn: дочерние процессы не наследуют цикл событий и соединения родителя
+    with ProcessPoolExecutor(max_workers=max(len(shards), 1), mp_context=get_context("spawn")) as executor:
+        results = await asyncio.gather(
+            *(loop.run_in_executor(executor, run_shard, shard, base_url, database_url, options) for shard in shards)
+        )
+
+    elapsed = time.perf_counter() - started
+    files = sum(result["files"] for result in results)
+    rows = sum(result["rows"] for result in results)
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "workers": len(shards),
+        "bulletins": len(bulletins),
+        "skipped": len(bulletins) - len(pending),
+        "pages": stats.pages,
+        "files": files,
+        "rows": rows,
+        "errors": stats.errors + sum(result["errors"] for result in results),
+        "files_per_s": round(files / elapsed, 2) if elapsed else 0.0,
+        "rows_per_s": round(rows / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    summary = await backfill(
+        args.start,
+        args.end,
+        args.workers,
+        first_page=args.first_page,
+        last_page=args.last_page,
+        batch_size=args.batch_size,
+    )
+    logger.info("Историческая загрузка завершена: %s", summary)
+    if summary["files"]:
+        await refresh_derived_data()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Историческая загрузка бюллетеней в несколько процессов")
+    parser.add_argument("--start", type=date.fromisoformat, required=True, help="Начальная дата (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today(), help="Конечная дата (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Количество процессов")
+    parser.add_argument("--first-page", type=int, default=settings.PARSER_FIRST_PAGE)
+    parser.add_argument("--last-page", type=int, default=settings.PARSER_LAST_PAGE)
+    parser.add_argument("--batch-size", type=int, default=settings.PARSER_BATCH_SIZE)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,215 @@
+"""
+Нагрузочный бенчмарк API торгов.
+
+Заполняет тестовую базу данных синтетическими торгами, прогоняет смесь запросов
+к `/trading/last_trading_dates`, `/trading/dynamics` и `/trading/trading_results`
+с фиксированной параллельностью на холодном и прогретом кэше и сохраняет
+пропускную способность и перцентили задержек в JSON.
+
+По умолчанию приложение запускается в процессе бенчмарка (через ASGI-транспорт)
+поверх тестовых PostgreSQL и Redis из `docker-compose.test.yml`. С параметром
+`--base-url` запросы отправляются в уже запущенный сервер.
+
+Запуск:
+
+    make up
+    python -m benchmarks.api_load --rows 1000000 --concurrency 32 --requests 5000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlencode
+
+import httpx
+import redis.asyncio as aioredis
+from benchmarks.results import save_results, summarize
+from benchmarks.seed import describe_database, seed_database, SyntheticDataset
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.redis import RedisBackend
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession, create_async_engine
+
+from configs.config import settings
+from configs.logging_config import logger
+
+ENDPOINT_WEIGHTS = {"last_trading_dates": 0.2, "dynamics": 0.4, "trading_results": 0.4}
+PROJECTION = "date,oil_id,volume,total"
+
+
+def build_requests(dataset: SyntheticDataset, count: int, seed: int = 1) -> list[tuple[str, str]]:
+    """
+    Строит детерминированную смесь запросов с реалистичными фильтрами.
+
+    :param dataset: Описание данных в базе.
+    :param count: Количество запросов.
+    :param seed: Зерно генератора случайных чисел.
+    :return: Список пар (эндпоинт, URL).
+    """
+    rng = random.Random(seed)
+    period = (dataset.last_date - dataset.first_date).days
+    requests = []
+    for endpoint in rng.choices(list(ENDPOINT_WEIGHTS), weights=list(ENDPOINT_WEIGHTS.values()), k=count):
+        params: dict[str, Any] = {}
+        if endpoint == "last_trading_dates":
+            params["limit"] = rng.choice((10, 30, 100))
+        else:
+            if rng.random() < 0.6:
+                params["oil_id"] = rng.choice(dataset.oil_ids)
+            if rng.random() < 0.4:
+                params["delivery_basis_id"] = rng.choice(dataset.delivery_basis_ids)
+            if rng.random() < 0.3:
+                params["delivery_type_id"] = rng.choice(dataset.delivery_type_ids)
+            if rng.random() < 0.3:
+                params["fields"] = PROJECTION
+        if endpoint == "dynamics" and rng.random() < 0.8:
+            start = dataset.first_date + timedelta(days=rng.randint(0, period))
+            params["start_date"] = start.isoformat()
+            params["end_date"] = (start + timedelta(days=rng.randint(30, 365))).isoformat()
+        if endpoint == "trading_results":
+            params["limit"] = rng.choice((10, 50, 100))
+            params["offset"] = rng.choice((0, 0, 0, 10, 50))
+        requests.append((endpoint, f"/trading/{endpoint}?{urlencode(params)}"))
+    return requests
+
+
+async def run_phase(client: httpx.AsyncClient, requests: list[tuple[str, str]], concurrency: int) -> dict[str, Any]:
+    """
+    Выполняет запросы с фиксированной параллельностью.
+
+    :param client: HTTP-клиент.
+    :param requests: Список пар (эндпоинт, URL).
+    :param concurrency: Количество одновременно выполняемых запросов.
+    :return: Метрики по каждому эндпоинту и в целом.
+    """
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    pending = iter(requests)
+
+    async def worker() -> None:
+        for endpoint, url in pending:
+            started = time.perf_counter()
+            try:
+                response = await client.get(url)
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                errors[endpoint] += 1
+                logger.error("Ошибка запроса %s: %s", url, e)
+                continue
+            latencies[endpoint].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall_time = time.perf_counter() - started
+    results = {endpoint: summarize(latencies[endpoint], wall_time, errors[endpoint]) for endpoint in ENDPOINT_WEIGHTS}
+    results["total"] = summarize(
+        [latency for values in latencies.values() for latency in values], wall_time, sum(errors.values())
+    )
+    return results
+
+
+async def clear_cache(redis: aioredis.Redis, prefix: str) -> None:
+    """Удаляет ключи кэша API (холодный старт)."""
+    keys = [key async for key in redis.scan_iter(f"{prefix}:*")]
+    if keys:
+        await redis.delete(*keys)
+
+
+@asynccontextmanager
+async def api_client(args: argparse.Namespace) -> AsyncGenerator[httpx.AsyncClient, None]:
+    """
+    Создает HTTP-клиент к запущенному серверу или к приложению в процессе бенчмарка.
+
+    Во втором случае зависимость `get_db` подменяется сессиями тестовой базы,
+    а fastapi_cache инициализируется тестовым Redis.
+    """
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+            yield client
+        return
+
+    from main import app
+
+    from database.database import get_db
+
+    engine = create_async_engine(args.database_url, pool_size=args.concurrency, max_overflow=0)
+    session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+
+    async def get_benchmark_db() -> AsyncGenerator[AsyncSession, None]:
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = get_benchmark_db
+    redis = aioredis.from_url(args.redis_url)
+    FastAPICache.reset()
+    FastAPICache.init(RedisBackend(redis), prefix=args.cache_prefix)
+    try:
+        transport = httpx.ASGITransport(app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60) as client:
+            yield client
+    finally:
+        app.dependency_overrides.clear()
+        await redis.aclose()
+        await engine.dispose()
+
+
+async def main(args: argparse.Namespace) -> dict[str, Any]:
+    """Заполняет базу (при необходимости), выполняет прогоны и сохраняет результаты."""
+    engine = create_async_engine(args.database_url)
+    try:
+        if args.skip_seed:
+            dataset = await describe_database(engine)
+        else:
+            dataset = await seed_database(engine, args.rows, rows_per_day=args.rows_per_day)
+    finally:
+        await engine.dispose()
+    logger.info("В базе %s строк за период %s - %s", dataset.rows, dataset.first_date, dataset.last_date)
+
+    requests = build_requests(dataset, args.requests)
+    redis = aioredis.from_url(args.redis_url)
+    results = {}
+    try:
+        async with api_client(args) as client:
+            await clear_cache(redis, args.cache_prefix)
+            results["cold"] = await run_phase(client, requests, args.concurrency)
+            results["warm"] = await run_phase(client, requests, args.concurrency)
+    finally:
+        await redis.aclose()
+
+    params = {
+        "rows": dataset.rows,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "mode": "server" if args.base_url else "in-process",
+    }
+    save_results(args.output, "api_load", params, results)
+    for phase, metrics in results.items():
+        for endpoint, summary in metrics.items():
+            logger.info("%4s %-20s %s", phase, endpoint, summary)
+    return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Нагрузочный бенчмарк API торгов")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Количество синтетических строк (1M-50M)")
+    parser.add_argument("--rows-per-day", type=int, default=500, help="Количество строк на торговый день")
+    parser.add_argument("--skip-seed", action="store_true", help="Не перезаполнять базу, использовать текущие данные")
+    parser.add_argument("--requests", type=int, default=5000, help="Количество запросов в каждом прогоне")
+    parser.add_argument("--concurrency", type=int, default=32, help="Количество одновременных запросов")
+    parser.add_argument("--base-url", help="Адрес запущенного сервера (по умолчанию приложение в процессе)")
+    parser.add_argument("--database-url", default=settings.get_test_db_postgres_url())
+    parser.add_argument("--redis-url", default=settings.get_test_redis_url())
+    parser.add_argument("--cache-prefix", default="bench-cache", help="Префикс ключей кэша API")
+    parser.add_argument("--output", type=Path, default=Path("benchmarks/results/api_load.json"))
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
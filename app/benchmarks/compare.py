@@ -0,0 +1,60 @@
+"""
+Сравнение двух файлов результатов бенчмарка (например, между коммитами).
+
+Запуск:
+
+    python -m benchmarks.compare benchmarks/results/base.json benchmarks/results/new.json
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Any
+
+METRICS = ("rps", "p50_ms", "p95_ms", "p99_ms")
+
+
+def _flatten(results: dict[str, Any], prefix: str = "") -> dict[str, dict[str, Any]]:
+    """Разворачивает вложенные результаты в словарь «путь -> метрики»."""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}/{key}" if prefix else key
+        if isinstance(value, dict) and any(metric in value for metric in METRICS):
+            flat[path] = value
+        elif isinstance(value, dict):
+            flat.update(_flatten(value, path))
+    return flat
+
+
+def compare(base: dict[str, Any], new: dict[str, Any]) -> list[str]:
+    """
+    Формирует строки отчета с относительными изменениями метрик.
+
+    :param base: Документ базовых результатов.
+    :param new: Документ новых результатов.
+    :return: Строки отчета.
+    """
+    base_flat, new_flat = _flatten(base["results"]), _flatten(new["results"])
+    lines = [f"{base['benchmark']}: {base.get('commit')} -> {new.get('commit')}"]
+    for path in sorted(base_flat.keys() & new_flat.keys()):
+        changes = []
+        for metric in METRICS:
+            old_value, new_value = base_flat[path].get(metric), new_flat[path].get(metric)
+            if old_value and new_value is not None:
+                changes.append(f"{metric} {old_value} -> {new_value} ({(new_value - old_value) / old_value:+.1%})")
+        lines.append(f"  {path}: " + ", ".join(changes))
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Сравнение результатов бенчмарков")
+    parser.add_argument("base", type=Path)
+    parser.add_argument("new", type=Path)
+    args = parser.parse_args()
+    base = json.loads(args.base.read_text(encoding="utf-8"))
+    new = json.loads(args.new.read_text(encoding="utf-8"))
+    print("\n".join(compare(base, new)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Бенчмарк загрузки бюллетеней.
+
+Поднимает локальную замену spimex.com (`benchmarks.spimex_stub`), прогоняет
+полный конвейер `parser_main.ingest` (страницы -> ссылки -> файлы -> XLSExtractor
+-> запись в БД) в тестовую базу и сохраняет в JSON файлы/сек, строки/сек,
+время по этапам и пиковую память для каждой комбинации параметров
+`MAX_CONCURRENT_REQUESTS`, `MAX_DB_CONCURRENT` и `PARSER_BATCH_SIZE`.
+
+Запуск:
+
+    make up
+    python -m benchmarks.ingestion --files 200 --latency-ms 50 --concurrency 5,15,30 --db-concurrency 2,10 --batch-size 1,10
+"""
+
+import argparse
+import asyncio
+import itertools
+import resource
+import tracemalloc
+from pathlib import Path
+from typing import Any
+
+import parser_main
+from benchmarks.results import save_results
+from benchmarks.spimex_stub import (
+    add_stub_arguments,
+    build_bulletin,
+    start_server,
+    stub_config,
+    StubConfig,
+)
+from services.references import reference_cache
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession, create_async_engine
+
+from configs.config import settings
+from configs.logging_config import logger
+from database.database import BaseModel
+
+
+async def reset_database(engine) -> None:
+    """Пересоздает таблицы перед прогоном."""
+    reference_cache.clear()
+    async with engine.begin() as conn:
+        await conn.run_sync(BaseModel.metadata.drop_all)
+        await conn.run_sync(BaseModel.metadata.create_all)
+
+
+async def run_once(
+    config: StubConfig,
+    base_url: str,
+    concurrency: int,
+    db_concurrency: int,
+    batch_size: int,
+    database_url: str,
+    trace_memory: bool,
+) -> dict[str, Any]:
+    """
+    Выполняет один прогон загрузки в пустую базу.
+
+    :param config: Параметры локального сервера.
+    :param base_url: Адрес локального сервера.
+    :param concurrency: Максимальное число одновременных HTTP-запросов.
+    :param db_concurrency: Максимальное число одновременных записей в БД.
+    :param batch_size: Количество бюллетеней в одной транзакции.
+    :param database_url: Адрес тестовой базы данных.
+    :param trace_memory: Замерять пиковую память Python через tracemalloc.
+    :return: Сводка прогона.
+    """
+    engine = create_async_engine(database_url, pool_size=db_concurrency, max_overflow=0)
+    session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    dates = config.bidding_dates()
+    try:
+        await reset_database(engine)
+        if trace_memory:
+            tracemalloc.start()
+        stats = await parser_main.ingest(
+            base_url=base_url,
+            first_page=1,
+            last_page=config.pages,
+            min_year=dates[-1].year,
+            current_year=dates[0].year,
+            max_concurrent_requests=concurrency,
+            max_db_concurrent=db_concurrency,
+            session_factory=session_factory,
+            batch_size=batch_size,
+        )
+        summary = stats.summary()
+        if trace_memory:
+            summary["peak_traced_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+            tracemalloc.stop()
+        summary["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2)
+    finally:
+        await engine.dispose()
+    summary.update(concurrency=concurrency, db_concurrency=db_concurrency, batch_size=batch_size)
+    return summary
+
+
+async def main(args: argparse.Namespace) -> list[dict[str, Any]]:
+    """Запускает сервер и выполняет прогоны для всех комбинаций параметров."""
+    config = stub_config(args)
+    runner = None
+    if args.stub_url:
+        base_url = args.stub_url
+    else:
+        # Файлы генерируются заранее, чтобы сервер в том же процессе не искажал замеры
+        for bidding_date in config.bidding_dates():
+            build_bulletin(bidding_date, config.rows_per_file, config.seed)
+        runner, base_url = await start_server(config)
+        logger.info("Локальный сервер запущен: %s", base_url)
+
+    runs = []
+    try:
+        for concurrency, db_concurrency, batch_size in itertools.product(
+            args.concurrency, args.db_concurrency, args.batch_size
+        ):
+            summary = await run_once(
+                config, base_url, concurrency, db_concurrency, batch_size, args.database_url, args.tracemalloc
+            )
+            logger.info("Прогон завершен: %s", summary)
+            runs.append(summary)
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+
+    params = {
+        "files": config.files,
+        "files_per_page": config.files_per_page,
+        "rows_per_file": config.rows_per_file,
+        "latency_ms": config.latency_ms,
+        "jitter_ms": config.jitter_ms,
+        "error_rate": config.error_rate,
+    }
+    results = {f"c{run['concurrency']}-db{run['db_concurrency']}-b{run['batch_size']}": run for run in runs}
+    save_results(args.output, "ingestion", params, results)
+    for run in runs:
+        logger.info(
+            "concurrency=%-3s db=%-3s batch=%-3s files/s=%-8s rows/s=%-10s errors=%s",
+            run["concurrency"],
+            run["db_concurrency"],
+            run["batch_size"],
+            run["files_per_s"],
+            run["rows_per_s"],
+            run["errors"],
+        )
+    return runs
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",")]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Бенчмарк загрузки бюллетеней")
+    add_stub_arguments(parser)
+    parser.add_argument("--stub-url", help="Адрес уже запущенного локального сервера")
+    parser.add_argument(
+        "--concurrency",
+        type=_int_list,
+        default=[settings.PARSER_MAX_CONCURRENT_REQUESTS],
+        help="Значения MAX_CONCURRENT_REQUESTS через запятую",
+    )
+    parser.add_argument(
+        "--db-concurrency",
+        type=_int_list,
+        default=[settings.PARSER_MAX_DB_CONCURRENT],
+        help="Значения MAX_DB_CONCURRENT через запятую",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=_int_list,
+        default=[settings.PARSER_BATCH_SIZE],
+        help="Значения PARSER_BATCH_SIZE через запятую",
+    )
+    parser.add_argument("--tracemalloc", action="store_true", help="Замерять пиковую память Python")
+    parser.add_argument("--database-url", default=settings.get_test_db_postgres_url())
+    parser.add_argument("--output", type=Path, default=Path("benchmarks/results/ingestion.json"))
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
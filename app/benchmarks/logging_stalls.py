@@ -0,0 +1,168 @@
+"""
+Бенчмарк задержек цикла событий из-за логирования.
+
+Несколько корутин пишут записи в лог пакетами с паузами (как загрузка
+бюллетеней, которая пишет несколько записей на каждый файл), а отдельная корутина
+каждые `--tick-ms` мс замеряет, на сколько позже срабатывает таймер цикла
+событий. Сравниваются два варианта с одинаковыми обработчиками (файл
+с ротацией и поток вывода, JSON):
+
+- `sync` - обработчики вызываются прямо в цикле событий (прежняя настройка
+  `logging.basicConfig` с `FileHandler` и `StreamHandler`);
+- `queue` - обработчики работают в фоновом потоке (`configs.logging_config.attach_queue`).
+
+`--write-delay-ms` добавляет задержку каждой записи в поток вывода: так
+выглядит медленный диск или заполненный канал вывода контейнера.
+
+Запуск:
+
+    python -m benchmarks.logging_stalls --records 20000 --write-delay-ms 0,1
+"""
+
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from benchmarks.results import save_results, summarize
+
+from configs.config import settings
+from configs.logging_config import (
+    attach_queue,
+    create_handlers,
+    logger,
+    NonBlockingQueueHandler,
+)
+
+
+class SlowStreamHandler(logging.StreamHandler):
+    """Поток вывода с задержкой каждой записи."""
+
+    def __init__(self, stream, delay: float):
+        super().__init__(stream)
+        self.delay = delay
+
+    def emit(self, record: logging.LogRecord) -> None:
+        time.sleep(self.delay)
+        super().emit(record)
+
+
+async def monitor_lag(tick: float, lags: list[float], stop: asyncio.Event) -> None:
+    """Замеряет опоздание таймера цикла событий относительно `tick`."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(tick)
+        lags.append(max(time.perf_counter() - started - tick, 0.0))
+
+
+async def produce(target: logging.Logger, records: int, burst: int, pause: float, calls: list[float]) -> None:
+    """Пишет `records` записей пакетами по `burst` с паузой `pause` секунд между пакетами."""
+    for index in range(records):
+        started = time.perf_counter()
+        target.info("Данные готовы к загрузке в БД для даты %s, строк %s", "2024-01-01", index)
+        calls.append(time.perf_counter() - started)
+        if index % burst == burst - 1:
+            await asyncio.sleep(pause)
+
+
+async def run(mode: str, args: argparse.Namespace, write_delay: float, directory: Path) -> dict[str, Any]:
+    """Прогон одного варианта логирования."""
+    target = logging.getLogger(f"benchmarks.logging_stalls.{mode}.{write_delay}")
+    target.propagate = False
+    target.setLevel(logging.INFO)
+    stream = open(directory / f"{mode}-{write_delay}.out", "w", encoding="utf-8")
+    file_handler, _ = create_handlers(directory / f"{mode}-{write_delay}.log", stream=stream)
+    stream_handler = SlowStreamHandler(stream, write_delay)
+    stream_handler.setFormatter(file_handler.formatter)
+    handlers = [file_handler, stream_handler]
+
+    listener = None
+    if mode == "queue":
+        listener = attach_queue(target, handlers)
+    else:
+        for handler in handlers:
+            target.addHandler(handler)
+
+    lags: list[float] = []
+    calls: list[float] = []
+    stop = asyncio.Event()
+    records, pause = args.records // args.producers, args.pause_ms / 1000
+    started = time.perf_counter()
+    lag_task = asyncio.create_task(monitor_lag(args.tick_ms / 1000, lags, stop))
+    await asyncio.gather(*(produce(target, records, args.burst, pause, calls) for _ in range(args.producers)))
+    wall_time = time.perf_counter() - started
+    stop.set()
+    await lag_task
+
+    dropped = 0
+    if listener is not None:
+        dropped = next(h.dropped for h in target.handlers if isinstance(h, NonBlockingQueueHandler))
+        listener.stop()
+    for handler in handlers:
+        handler.close()
+    stream.close()
+    return {
+        "wall_time_s": round(wall_time, 3),
+        "log_call": summarize(calls, wall_time),
+        "loop_lag": summarize(lags, wall_time),
+        "dropped": dropped,
+    }
+
+
+async def main(args: argparse.Namespace) -> dict[str, Any]:
+    results: dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for write_delay_ms in args.write_delay_ms:
+            for mode in ("sync", "queue"):
+                run_results = await run(mode, args, write_delay_ms / 1000, Path(directory))
+                results[f"{mode}_delay_{write_delay_ms}ms"] = run_results
+                logger.info(
+                    "%-5s задержка записи %s мс: вызов p99 %s мс, опоздание цикла p99 %s мс, max %s мс, "
+                    "время %s с, отброшено %s",
+                    mode,
+                    write_delay_ms,
+                    run_results["log_call"]["p99_ms"],
+                    run_results["loop_lag"]["p99_ms"],
+                    run_results["loop_lag"]["max_ms"],
+                    run_results["wall_time_s"],
+                    run_results["dropped"],
+                )
+    params = {
+        "records": args.records,
+        "producers": args.producers,
+        "burst": args.burst,
+        "pause_ms": args.pause_ms,
+        "tick_ms": args.tick_ms,
+        "write_delay_ms": args.write_delay_ms,
+        "queue_size": settings.LOG_QUEUE_SIZE,
+    }
+    save_results(args.output, "logging_stalls", params, results)
+    return results
+
+
+def _float_list(value: str) -> list[float]:
+    return [float(item) for item in value.split(",")]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Бенчмарк задержек цикла событий из-за логирования")
+    parser.add_argument("--records", type=int, default=20000, help="Количество записей в логе")
+    parser.add_argument("--producers", type=int, default=10, help="Количество пишущих корутин")
+    parser.add_argument("--burst", type=int, default=5, help="Записей в пакете одной корутины")
+    parser.add_argument("--pause-ms", type=float, default=5.0, help="Пауза между пакетами, мс")
+    parser.add_argument("--tick-ms", type=float, default=1.0, help="Период замера опоздания цикла событий, мс")
+    parser.add_argument(
+        "--write-delay-ms",
+        type=_float_list,
+        default=[0.0, 1.0],
+        help="Задержки записи в поток вывода через запятую, мс",
+    )
+    parser.add_argument("--output", type=Path, default=Path("benchmarks/results/logging_stalls.json"))
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
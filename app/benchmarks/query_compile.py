@@ -0,0 +1,196 @@
+"""
+Бенчмарк накладных расходов на компиляцию и подготовку запросов фильтрации.
+
+Сравнивает на случайной смеси из 32 комбинаций фильтров `TradingService.filter`:
+
+- компиляцию: построение `select()` на каждый запрос (с компиляцией без кэша
+  и с расчетом ключа кэша SQLAlchemy) и повторное использование формы запроса
+  (`services.tradings.filter_statement`);
+- выполнение на одном соединении тестовой базы с отключенным и включенным
+  кэшем подготовленных выражений asyncpg (`DB_STATEMENT_CACHE_SIZE`).
+
+Результат - среднее время на запрос в микросекундах и перцентили выполнения.
+
+Запуск:
+
+    make up
+    python -m benchmarks.query_compile --requests 20000
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any
+
+from benchmarks.results import save_results, summarize
+from services.tradings import FILTER_CONDITIONS, filter_statement
+from sqlalchemy import Select, select
+from sqlalchemy.dialects.postgresql.asyncpg import PGDialect_asyncpg
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from configs.config import settings
+from configs.logging_config import logger
+from database.database import BaseModel
+from database.models import SpimexTradingResults
+
+SHAPES = [
+    names
+    for size in range(len(FILTER_CONDITIONS) + 1)
+    for names in itertools.combinations(FILTER_CONDITIONS, size)
+]
+
+
+def random_filters(rng: random.Random) -> dict[str, Any]:
+    """Возвращает фильтры случайной формы со случайными значениями."""
+    start_date = date(2024, 1, 1) + timedelta(days=rng.randint(0, 300))
+    values = {
+        "oil_id": f"A{rng.randint(0, 99):03d}",
+        "delivery_type_id": rng.choice("ABFJW"),
+        "delivery_basis_id": f"{rng.choice('ABCDEFGHIJ')}{rng.randint(0, 9)}{rng.choice('ABCDEFGHIJ')}",
+        "start_date": start_date,
+        "end_date": start_date + timedelta(days=rng.randint(1, 60)),
+    }
+    filters = {name: values[name] for name in rng.choice(SHAPES)}
+    filters.update(limit=rng.choice((10, 50, 100)), offset=rng.choice((0, 10, 100)))
+    return filters
+
+
+def legacy_statement(filters: dict[str, Any]) -> Select:
+    """Строит запрос так, как это делалось до кэширования форм: значения встраиваются в выражение."""
+    model = SpimexTradingResults
+    stmt = select(model)
+    if oil_id := filters.get("oil_id"):
+        stmt = stmt.where(model.oil_id == oil_id)
+    if delivery_type_id := filters.get("delivery_type_id"):
+        stmt = stmt.where(model.delivery_type_id == delivery_type_id)
+    if delivery_basis_id := filters.get("delivery_basis_id"):
+        stmt = stmt.where(model.delivery_basis_id == delivery_basis_id)
+    if start_date := filters.get("start_date"):
+        stmt = stmt.where(model.date >= start_date)
+    if end_date := filters.get("end_date"):
+        stmt = stmt.where(model.date <= end_date)
+    return stmt.limit(filters["limit"]).offset(filters["offset"])
+
+
+def cached_statement(filters: dict[str, Any]) -> tuple[Select, dict[str, Any]]:
+    """Возвращает закэшированную форму запроса и параметры (как `TradingService.filter`)."""
+    names = tuple(name for name in FILTER_CONDITIONS if filters.get(name))
+    params = {name: filters[name] for name in names}
+    params.update(limit=filters["limit"], offset=filters["offset"])
+    return filter_statement(names), params
+
+
+def measure_compile(requests: list[dict[str, Any]]) -> dict[str, float]:
+    """
+    Замеряет подготовку запроса на стороне Python, мкс на запрос.
+
+    - `build_compile` - построение и компиляция без кэша SQLAlchemy;
+    - `build_cache_key` - построение и расчет ключа кэша (так каждый запрос
+      обходился при попадании в кэш скомпилированных запросов);
+    - `cached_shape` - готовая форма запроса, ключ кэша уже рассчитан.
+    """
+    dialect = PGDialect_asyncpg()
+    variants = {
+        "build_compile": lambda filters: legacy_statement(filters).compile(dialect=dialect),
+        "build_cache_key": lambda filters: legacy_statement(filters)._generate_cache_key(),
+        "cached_shape": lambda filters: cached_statement(filters)[0]._generate_cache_key(),
+    }
+    results = {}
+    for name, prepare in variants.items():
+        started = time.perf_counter()
+        for filters in requests:
+            prepare(filters)
+        results[name] = round((time.perf_counter() - started) / len(requests) * 1e6, 2)
+    return results
+
+
+async def measure_execute(database_url: str, requests: list[dict[str, Any]], cache_size: int) -> dict[str, Any]:
+    """
+    Выполняет запросы последовательно на одном соединении.
+
+    :param database_url: Адрес тестовой базы данных.
+    :param requests: Фильтры запросов.
+    :param cache_size: Размер кэша подготовленных выражений asyncpg (0 - без кэша).
+    :return: Сводка по задержкам и среднее время на запрос в микросекундах.
+    """
+    engine = create_async_engine(
+        database_url, pool_size=1, connect_args={"prepared_statement_cache_size": cache_size}
+    )
+    results = {}
+    try:
+        async with engine.connect() as conn:
+            # Прогрев: соединение, кэш скомпилированных запросов SQLAlchemy и типов asyncpg
+            for filters in requests[:100]:
+                await conn.execute(*cached_statement(filters))
+            for name, execute in (
+                ("legacy", lambda filters: conn.execute(legacy_statement(filters))),
+                ("cached_shape", lambda filters: conn.execute(*cached_statement(filters))),
+            ):
+                latencies = []
+                started = time.perf_counter()
+                for filters in requests:
+                    request_started = time.perf_counter()
+                    await execute(filters)
+                    latencies.append(time.perf_counter() - request_started)
+                wall_time = time.perf_counter() - started
+                results[name] = summarize(latencies, wall_time) | {
+                    "mean_us": round(wall_time / len(requests) * 1e6, 2)
+                }
+            raw_connection = await conn.get_raw_connection()
+            statement_cache = raw_connection.dbapi_connection._prepared_statement_cache
+            results["prepared_statements"] = len(statement_cache) if statement_cache is not None else 0
+    finally:
+        await engine.dispose()
+    return results
+
+
+async def main(args: argparse.Namespace) -> dict[str, Any]:
+    rng = random.Random(args.seed)
+    requests = [random_filters(rng) for _ in range(args.requests)]
+    results: dict[str, Any] = {"compile_us": measure_compile(requests)}
+    logger.info("Подготовка запроса, мкс: %s", results["compile_us"])
+
+    engine = create_async_engine(args.database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(BaseModel.metadata.create_all)
+    await engine.dispose()
+    execute_requests = requests[: args.execute_requests]
+    for cache_size in (0, args.statement_cache_size):
+        run = await measure_execute(args.database_url, execute_requests, cache_size)
+        results[f"execute_cache_{cache_size}"] = run
+        logger.info(
+            "prepared_statement_cache_size=%-4s legacy=%s мкс cached_shape=%s мкс подготовлено=%s",
+            cache_size,
+            run["legacy"]["mean_us"],
+            run["cached_shape"]["mean_us"],
+            run["prepared_statements"],
+        )
+
+    params = {
+        "requests": args.requests,
+        "execute_requests": len(execute_requests),
+        "shapes": len(SHAPES),
+        "statement_cache_size": args.statement_cache_size,
+        "seed": args.seed,
+    }
+    save_results(args.output, "query_compile", params, results)
+    return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Бенчмарк компиляции и подготовки запросов фильтрации")
+    parser.add_argument("--requests", type=int, default=20000, help="Количество запросов для замера компиляции")
+    parser.add_argument("--execute-requests", type=int, default=5000, help="Количество запросов к БД")
+    parser.add_argument("--statement-cache-size", type=int, default=settings.DB_STATEMENT_CACHE_SIZE)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", default=settings.get_test_db_postgres_url())
+    parser.add_argument("--output", type=Path, default=Path("benchmarks/results/query_compile.json"))
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,68 @@
+"""
+Общие функции бенчмарков: расчет перцентилей и сохранение результатов в JSON.
+"""
+
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+
+def summarize(latencies: list[float], wall_time: float, errors: int = 0) -> dict[str, Any]:
+    """
+    Считает пропускную способность и перцентили задержек.
+
+    :param latencies: Задержки запросов в секундах.
+    :param wall_time: Общее время прогона в секундах.
+    :param errors: Количество неуспешных запросов.
+    :return: Словарь с метриками (задержки в миллисекундах).
+    """
+    if not latencies:
+        return {"count": 0, "errors": errors, "rps": 0.0}
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / wall_time, 2) if wall_time else 0.0,
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(max(latencies) * 1000, 3),
+    }
+
+
+def git_revision() -> str | None:
+    """Возвращает текущий коммит репозитория (если доступен git)."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(path: Path, name: str, params: dict[str, Any], results: dict[str, Any]) -> dict[str, Any]:
+    """
+    Сохраняет результаты бенчмарка в JSON вместе с метаданными прогона.
+
+    :param path: Путь к файлу результатов.
+    :param name: Название бенчмарка.
+    :param params: Параметры прогона.
+    :param results: Результаты.
+    :return: Сохраненный документ.
+    """
+    document = {
+        "benchmark": name,
+        "commit": git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": params,
+        "results": results,
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(document, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+    return document
@@ -0,0 +1,206 @@
+"""
+Заполнение базы данных синтетическими торгами для бенчмарков.
+
+Данные повторяют форму `SpimexTradingResults`: фиксированный набор инструментов
+(нефтепродукт + базис + тип поставки), из которого на каждый торговый день
+выбирается `rows_per_day` записей. Загрузка идет через COPY частями, поэтому
+объем в десятки миллионов строк не требует хранить все данные в памяти.
+"""
+
+import random
+import string
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from configs.logging_config import logger
+from database.database import BaseModel
+from database.models import DeliveryBasis, ExchangeProduct, SpimexTradingResults
+
+DELIVERY_TYPES = "ABFHJW"
+TRADING_COLUMNS = [
+    "exchange_product_id",
+    "exchange_product_name_id",
+    "oil_id",
+    "delivery_basis_id",
+    "delivery_basis_name_id",
+    "delivery_type_id",
+    "volume",
+    "total",
+    "count",
+    "date",
+    "created_on",
+    "updated_on",
+]
+
+
+@dataclass
+class Instrument:
+    """Синтетический биржевой инструмент."""
+
+    exchange_product_id: str
+    product_name_id: int
+    oil_id: str
+    delivery_basis_id: str
+    basis_name_id: int
+    delivery_type_id: str
+
+
+@dataclass
+class SyntheticDataset:
+    """Описание сгенерированных данных (используется для построения запросов)."""
+
+    rows: int
+    first_date: date
+    last_date: date
+    oil_ids: list[str] = field(default_factory=list)
+    delivery_basis_ids: list[str] = field(default_factory=list)
+    delivery_type_ids: list[str] = field(default_factory=list)
+
+
+def _codes(rng: random.Random, count: int, length: int) -> list[str]:
+    """Генерирует уникальные коды из заглавных букв и цифр."""
+    codes: set[str] = set()
+    while len(codes) < count:
+        codes.add("".join(rng.choices(string.ascii_uppercase + string.digits, k=length)))
+    return sorted(codes)
+
+
+def _trading_days(first_date: date, count: int) -> list[date]:
+    """Возвращает `count` рабочих дней начиная с `first_date`."""
+    days = []
+    day = first_date
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+async def seed_database(
+    engine: AsyncEngine,
+    rows: int,
+    rows_per_day: int = 500,
+    instruments: int = 2000,
+    first_date: date = date(2010, 1, 11),
+    chunk_size: int = 100_000,
+    seed: int = 42,
+) -> SyntheticDataset:
+    """
+    Пересоздает таблицы и заполняет их синтетическими данными.
+
+    :param engine: Асинхронный движок целевой (тестовой) базы данных.
+    :param rows: Общее количество строк торгов.
+    :param rows_per_day: Количество строк на один торговый день.
+    :param instruments: Количество различных инструментов.
+    :param first_date: Дата первого торгового дня.
+    :param chunk_size: Размер части для COPY.
+    :param seed: Зерно генератора случайных чисел.
+    :return: Описание сгенерированных данных.
+    """
+    rng = random.Random(seed)
+    rows_per_day = min(rows_per_day, instruments)
+    oil_ids = _codes(rng, 150, 4)
+    basis_ids = _codes(rng, 200, 3)
+    async with engine.begin() as conn:
+        await conn.run_sync(BaseModel.metadata.drop_all)
+        await conn.run_sync(BaseModel.metadata.create_all)
+
+    combos: set[tuple[str, str, str]] = set()
+    while len(combos) < instruments:
+        combos.add((rng.choice(oil_ids), rng.choice(basis_ids), rng.choice(DELIVERY_TYPES)))
+    basis_name_ids = {basis_id: i for i, basis_id in enumerate(basis_ids, 1)}
+    catalog = [
+        Instrument(f"{oil}{basis}060{kind}", i, oil, basis, basis_name_ids[basis], kind)
+        for i, (oil, basis, kind) in enumerate(sorted(combos), 1)
+    ]
+    days = _trading_days(first_date, -(-rows // rows_per_day))
+    now = datetime.now()
+
+    async with engine.begin() as conn:
+        raw = await conn.get_raw_connection()
+        driver = raw.driver_connection
+        await driver.copy_records_to_table(
+            DeliveryBasis.__tablename__,
+            records=[(i, f"Базис поставки {basis}") for basis, i in basis_name_ids.items()],
+            columns=["id", "name"],
+        )
+        await driver.copy_records_to_table(
+            ExchangeProduct.__tablename__,
+            records=[(item.product_name_id, f"Нефтепродукт {item.exchange_product_id}") for item in catalog],
+            columns=["id", "name"],
+        )
+        chunk = []
+        written = 0
+        for day in days:
+            for item in rng.sample(catalog, min(rows_per_day, rows - written - len(chunk))):
+                volume = rng.randint(1, 5000)
+                chunk.append(
+                    (
+                        item.exchange_product_id,
+                        item.product_name_id,
+                        item.oil_id,
+                        item.delivery_basis_id,
+                        item.basis_name_id,
+                        item.delivery_type_id,
+                        volume,
+                        Decimal(volume * rng.randint(40_000, 90_000)),
+                        rng.randint(1, 20),
+                        day,
+                        now,
+                        now,
+                    )
+                )
+            if len(chunk) >= chunk_size or written + len(chunk) >= rows:
+                await driver.copy_records_to_table(
+                    SpimexTradingResults.__tablename__, records=chunk, columns=TRADING_COLUMNS
+                )
+                written += len(chunk)
+                chunk = []
+                logger.info("Загружено %s из %s строк", written, rows)
+            if written >= rows:
+                break
+        # Идентификаторы справочников заданы явно, поэтому сдвигаем последовательности
+        for model in (DeliveryBasis, ExchangeProduct):
+            table = model.__tablename__
+            await conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), max(id)) FROM {table}"))
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text(f"ANALYZE {SpimexTradingResults.__tablename__}"))
+
+    return SyntheticDataset(
+        rows=rows,
+        first_date=days[0],
+        last_date=days[-1],
+        oil_ids=oil_ids,
+        delivery_basis_ids=basis_ids,
+        delivery_type_ids=list(DELIVERY_TYPES),
+    )
+
+
+async def describe_database(engine: AsyncEngine) -> SyntheticDataset:
+    """
+    Описывает уже заполненную базу данных (для запуска бенчмарков без повторной загрузки).
+
+    :param engine: Асинхронный движок базы данных.
+    :return: Описание данных.
+    """
+    model = SpimexTradingResults
+    async with engine.connect() as conn:
+        rows, first_date, last_date = (
+            await conn.execute(select(func.count(), func.min(model.date), func.max(model.date)))
+        ).one()
+        codes = {}
+        for column in (model.oil_id, model.delivery_basis_id, model.delivery_type_id):
+            codes[column.key] = list((await conn.scalars(select(column).distinct().order_by(column))).all())
+    return SyntheticDataset(
+        rows=rows,
+        first_date=first_date,
+        last_date=last_date,
+        oil_ids=codes["oil_id"],
+        delivery_basis_ids=codes["delivery_basis_id"],
+        delivery_type_ids=codes["delivery_type_id"],
+    )
@@ -0,0 +1,164 @@
+"""
+Бенчмарк фильтрации по снимку торгов в памяти.
+
+Для каждой из 32 комбинаций фильтров `TradingService.filter` (коды
+нефтепродукта, базиса, типа поставки и границы дат) выполняет одинаковые
+запросы тремя способами:
+
+- `postings` - `TradingSnapshot.filter`: пересечение списков вхождений кодов,
+  обрезанных по диапазону дат;
+- `scan` - векторные маски NumPy по закодированным колонкам в диапазоне дат
+  (полный просмотр диапазона, для сравнения);
+- `postgres` - SQL-запрос `TradingService.filter` без кэша API.
+
+Значения фильтров берутся из случайных строк снимка, поэтому запросы
+возвращают непустой результат. Результат - задержки по каждой комбинации.
+
+Запуск:
+
+    make up
+    python -m benchmarks.snapshot --rows 1000000 --queries 50
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+from benchmarks.results import save_results, summarize
+from benchmarks.seed import describe_database, seed_database
+from services.snapshot import FILTER_COLUMNS, TradingSnapshot
+from services.tradings import FILTER_CONDITIONS, TradingService
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from configs.config import settings
+from configs.logging_config import logger
+
+SHAPES = [
+    names
+    for size in range(len(FILTER_CONDITIONS) + 1)
+    for names in itertools.combinations(FILTER_CONDITIONS, size)
+]
+
+
+def build_queries(snapshot: TradingSnapshot, shape: tuple[str, ...], count: int, rng: random.Random) -> list[dict]:
+    """Строит запросы заданной формы по значениям случайных строк снимка."""
+    queries = []
+    for _ in range(count):
+        row = snapshot.filter(offset=rng.randrange(snapshot.columns.size), limit=1)[0]
+        values = {
+            "oil_id": row["oil_id"],
+            "delivery_type_id": row["delivery_type_id"],
+            "delivery_basis_id": row["delivery_basis_id"],
+            "start_date": row["date"] - timedelta(days=rng.randint(0, 365)),
+            "end_date": row["date"] + timedelta(days=rng.randint(0, 60)),
+        }
+        query = {name: values[name] for name in shape}
+        query.update(limit=rng.choice((10, 100)), offset=rng.choice((0, 0, 50)))
+        queries.append(query)
+    return queries
+
+
+def scan_filter(snapshot: TradingSnapshot, **filters: Any) -> list[dict[str, Any]]:
+    """Фильтрация масками по колонкам кодов (без списков вхождений)."""
+    columns = snapshot.columns
+    limit, offset = filters["limit"], filters["offset"]
+    start, stop = snapshot._date_range(columns, filters.get("start_date"), filters.get("end_date"))
+    mask = None
+    for name in FILTER_COLUMNS:
+        if value := filters.get(name):
+            matches = columns.codes[name][start:stop] == columns.lookup[name][value]
+            mask = matches if mask is None else mask & matches
+    if mask is None:
+        positions = np.arange(min(start + offset, stop), min(start + offset + limit, stop))
+    else:
+        positions = np.flatnonzero(mask)[offset : offset + limit] + start
+    return snapshot._rows(columns, positions, None)
+
+
+def measure(queries: list[dict], run: Callable[[dict], Any]) -> dict[str, Any]:
+    """Выполняет запросы в памяти последовательно и считает задержки."""
+    latencies = []
+    started = time.perf_counter()
+    for query in queries:
+        request_started = time.perf_counter()
+        run(query)
+        latencies.append(time.perf_counter() - request_started)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def measure_postgres(session_factory: async_sessionmaker, queries: list[dict]) -> dict[str, Any]:
+    """Выполняет запросы к БД последовательно в одной сессии и считает задержки."""
+    latencies = []
+    started = time.perf_counter()
+    async with session_factory() as session:
+        service = TradingService(session)
+        for query in queries:
+            request_started = time.perf_counter()
+            await TradingService.filter.__wrapped__(service, **query)
+            latencies.append(time.perf_counter() - request_started)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def main(args: argparse.Namespace) -> dict[str, Any]:
+    engine = create_async_engine(args.database_url)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    try:
+        if args.skip_seed:
+            dataset = await describe_database(engine)
+        else:
+            dataset = await seed_database(engine, args.rows, rows_per_day=args.rows_per_day)
+        logger.info("В базе %s строк за период %s - %s", dataset.rows, dataset.first_date, dataset.last_date)
+
+        snapshot = TradingSnapshot()
+        started = time.perf_counter()
+        await snapshot.load(session_factory)
+        load_seconds = round(time.perf_counter() - started, 2)
+
+        rng = random.Random(args.seed)
+        results: dict[str, Any] = {}
+        for shape in SHAPES:
+            queries = build_queries(snapshot, shape, args.queries, rng)
+            # Прогрев: кэши запросов SQLAlchemy и подготовленных выражений asyncpg
+            await measure_postgres(session_factory, queries[:5])
+            run = {
+                "postings": measure(queries, lambda query: snapshot.filter(**query)),
+                "scan": measure(queries, lambda query: scan_filter(snapshot, **query)),
+                "postgres": await measure_postgres(session_factory, queries),
+            }
+            name = "+".join(shape) or "no_filters"
+            results[name] = run
+            logger.info(
+                "%-60s postings p50=%s мс scan p50=%s мс postgres p50=%s мс",
+                name,
+                run["postings"]["p50_ms"],
+                run["scan"]["p50_ms"],
+                run["postgres"]["p50_ms"],
+            )
+    finally:
+        await engine.dispose()
+
+    params = {"rows": dataset.rows, "queries": args.queries, "load_seconds": load_seconds, "seed": args.seed}
+    save_results(args.output, "snapshot", params, results)
+    return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Бенчмарк фильтрации по снимку торгов в памяти")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Количество синтетических строк")
+    parser.add_argument("--rows-per-day", type=int, default=500, help="Количество строк на торговый день")
+    parser.add_argument("--skip-seed", action="store_true", help="Не перезаполнять базу, использовать текущие данные")
+    parser.add_argument("--queries", type=int, default=50, help="Количество запросов на комбинацию фильтров")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", default=settings.get_test_db_postgres_url())
+    parser.add_argument("--output", type=Path, default=Path("benchmarks/results/snapshot.json"))
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
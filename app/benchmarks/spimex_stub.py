@@ -0,0 +1,219 @@
+"""
+Локальная замена сайта spimex.com для бенчмарков загрузки.
+
+Отдает постраничный список бюллетеней в разметке, которую ожидает `Parser`
+(`.accordeon-inner__item`), и сгенерированные файлы с листом `TRADE_SUMMARY`
+в формате, который разбирает `XLSExtractor`. Задержка ответа и доля ошибок
+настраиваются.
+
+Файлы генерируются в формате xlsx (openpyxl): pandas определяет формат по
+содержимому, поэтому `XLSExtractor` читает их так же, как настоящие xls.
+
+Запуск отдельным процессом:
+
+    python -m benchmarks.spimex_stub --port 8081 --files 200 --latency-ms 50
+"""
+
+import argparse
+import asyncio
+import io
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+from functools import lru_cache
+from html import escape
+
+import pandas as pd
+from aiohttp import web
+
+RESULTS_PATH = "/markets/oil_products/trades/results/"
+FILE_PATH = "/upload/reports/oil_xls/"
+HEADER = [
+    "Код Инструмента",
+    "Наименование Инструмента",
+    "Базис поставки",
+    "Объем Договоров в единицах измерения",
+    "Обьем Договоров, руб.",
+    "Изменение рыночной цены к цене предыдущего дня, руб.",
+    "Количество Договоров, шт.",
+]
+
+
+@dataclass(frozen=True)
+class StubConfig:
+    """Параметры локального сервера."""
+
+    files: int = 200
+    files_per_page: int = 10
+    rows_per_file: int = 400
+    last_date: date = date(2024, 12, 30)
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    seed: int = 42
+
+    @property
+    def pages(self) -> int:
+        return -(-self.files // self.files_per_page)
+
+    def bidding_dates(self) -> list[date]:
+        """Даты торгов (рабочие дни) от последней к первой, как на сайте биржи."""
+        dates = []
+        day = self.last_date
+        while len(dates) < self.files:
+            if day.weekday() < 5:
+                dates.append(day)
+            day -= timedelta(days=1)
+        return dates
+
+
+@lru_cache(maxsize=None)
+def build_bulletin(bidding_date: date, rows: int, seed: int = 42) -> bytes:
+    """
+    Генерирует файл бюллетеня за дату `bidding_date`.
+
+    Структура повторяет лист TRADE_SUMMARY: шапка, строка с единицей измерения,
+    заголовок таблицы, строки инструментов и две итоговые строки.
+    """
+    rng = random.Random(f"{seed}:{bidding_date.isoformat()}")
+    sheet: list[list] = [
+        ["Бюллетень по итогам торгов в Секции «Нефтепродукты» АО «СПбМТСБ»"],
+        [f"Дата торгов: {bidding_date:%d.%m.%Y}"],
+        [],
+        ["Единица измерения: Метрическая тонна"],
+        [column.replace(" ", "\n", 1) for column in HEADER],
+    ]
+    total_volume = total_sum = total_count = 0
+    for i in range(rows):
+        oil_id = f"A{i % 100:03d}"
+        basis_id = f"{rng.choice('ABCDEFGHIJ')}{i % 10}{rng.choice('ABCDEFGHIJ')}"
+        kind = rng.choice("ABFFFJW")
+        volume = rng.randint(0, 5000) if i % 5 else 0
+        count = rng.randint(1, 20) if volume else "-"
+        price_sum = volume * rng.randint(40_000, 90_000)
+        sheet.append(
+            [
+                f"{oil_id}{basis_id}060{kind}",
+                f"Нефтепродукт {oil_id} ({basis_id}, {kind})",
+                f"Базис поставки {basis_id}",
+                volume,
+                price_sum,
+                rng.randint(-500, 500),
+                count,
+            ]
+        )
+        if volume:
+            total_volume, total_sum, total_count = total_volume + volume, total_sum + price_sum, total_count + count
+    sheet.append(["Итого:", None, None, total_volume, total_sum, None, total_count])
+    sheet.append(["Итого по секции:", None, None, total_volume, total_sum, None, total_count])
+
+    buffer = io.BytesIO()
+    pd.DataFrame(sheet).to_excel(buffer, sheet_name="TRADE_SUMMARY", header=False, index=False)
+    return buffer.getvalue()
+
+
+def build_page(dates: list[date]) -> str:
+    """Формирует HTML страницы со ссылками на бюллетени."""
+    items = "".join(
+        f"""
+        <div class="accordeon-inner__item">
+          <div class="accordeon-inner__item-inner__title">
+            <a class="link xls" href="{FILE_PATH}oil_xls_{day:%Y%m%d}162000.xls">Скачать</a>
+            <p>Бюллетень по итогам торгов <span>{escape(f"{day:%d.%m.%Y}")}</span></p>
+          </div>
+        </div>"""
+        for day in dates
+    )
+    return f"<html><body><div class='accordeon-inner'>{items}</div></body></html>"
+
+
+def create_app(config: StubConfig) -> web.Application:
+    """Создает приложение aiohttp с маршрутами страницы результатов и файлов."""
+    rng = random.Random(config.seed)
+    dates = config.bidding_dates()
+    known_dates = {f"{day:%Y%m%d}": day for day in dates}
+
+    async def delay() -> None:
+        latency = config.latency_ms + rng.uniform(0, config.jitter_ms)
+        if latency:
+            await asyncio.sleep(latency / 1000)
+
+    def failed() -> bool:
+        return config.error_rate > 0 and rng.random() < config.error_rate
+
+    async def results_page(request: web.Request) -> web.Response:
+        await delay()
+        if failed():
+            raise web.HTTPInternalServerError()
+        try:
+            page = int(request.query.get("page", "page-1").removeprefix("page-"))
+        except ValueError:
+            raise web.HTTPBadRequest()
+        start = (page - 1) * config.files_per_page
+        return web.Response(
+            text=build_page(dates[start : start + config.files_per_page]), content_type="text/html"
+        )
+
+    async def bulletin(request: web.Request) -> web.Response:
+        await delay()
+        if failed():
+            raise web.HTTPInternalServerError()
+        bidding_date = known_dates.get(request.match_info["name"][8:16])
+        if bidding_date is None:
+            raise web.HTTPNotFound()
+        content = build_bulletin(bidding_date, config.rows_per_file, config.seed)
+        return web.Response(body=content, content_type="application/vnd.ms-excel")
+
+    app = web.Application()
+    app.router.add_get(RESULTS_PATH, results_page)
+    app.router.add_get(FILE_PATH + "{name}", bulletin)
+    return app
+
+
+async def start_server(config: StubConfig, host: str = "127.0.0.1", port: int = 0) -> tuple[web.AppRunner, str]:
+    """
+    Запускает сервер в текущем цикле событий.
+
+    :return: Раннер (для остановки через `cleanup()`) и базовый адрес сервера.
+    """
+    runner = web.AppRunner(create_app(config), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{bound_port}"
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    """Добавляет параметры сервера в парсер аргументов командной строки."""
+    parser.add_argument("--files", type=int, default=200, help="Количество бюллетеней")
+    parser.add_argument("--files-per-page", type=int, default=10, help="Количество бюллетеней на странице")
+    parser.add_argument("--rows-per-file", type=int, default=400, help="Количество строк в бюллетене")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Задержка ответа, мс")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Случайная добавка к задержке, мс")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Доля ответов с ошибкой 500")
+
+
+def stub_config(args: argparse.Namespace) -> StubConfig:
+    """Создает конфигурацию сервера из аргументов командной строки."""
+    return StubConfig(
+        files=args.files,
+        files_per_page=args.files_per_page,
+        rows_per_file=args.rows_per_file,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Локальная замена сайта spimex.com")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    add_stub_arguments(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    web.run_app(create_app(stub_config(args)), host=args.host, port=args.port)
@@ -1,3 +1,6 @@
+import os
+import secrets
+from datetime import time
 from pathlib import Path
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -10,11 +13,108 @@ class Settings(BaseSettings):
     DB_PORT: int
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
+    # Реплика для чтения (те же пользователь, пароль и база данных); без нее чтение идет с основного сервера
+    DB_REPLICA_HOST: str | None = None
+    DB_REPLICA_PORT: int | None = None
+
+    # Пул соединений и кэши запросов
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 60
+    # Проверка соединения при каждой выдаче из пула (лишний запрос к БД); альтернатива - DB_POOL_RECYCLE
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = -1  # Пересоздавать соединения старше N секунд (-1 - не пересоздавать)
+    DB_QUERY_CACHE_SIZE: int = 500  # Кэш скомпилированных запросов SQLAlchemy
+    DB_STATEMENT_CACHE_SIZE: int = 100  # Кэш подготовленных выражений asyncpg на соединение
+    # Кэш собранных запросов фильтрации торгов (32 набора фильтров, умноженные на варианты `fields`)
+    FILTER_STATEMENT_CACHE_SIZE: int = 128
+    # Общий лимит соединений всех процессов API с одним сервером БД: делится между WEB_WORKERS
+    DB_CONNECTION_BUDGET: int | None = None
+    DB_POOL_WARMUP: int = 5  # Соединения, открываемые при запуске процесса
+    # Ограничение времени запросов к БД из эндпоинтов торгов (statement_timeout Postgres, мс; 0 - без ограничения)
+    # и значения для отдельных маршрутов, например DB_ROUTE_STATEMENT_TIMEOUTS_MS='{"/trading/batch": 10000}'
+    DB_STATEMENT_TIMEOUT_MS: int = 5000
+    DB_ROUTE_STATEMENT_TIMEOUTS_MS: dict[str, int] = {}
+
+    # Production-сервер (server.py): число процессов по умолчанию равно числу ядер
+    WEB_HOST: str = "0.0.0.0"
+    WEB_PORT: int = 8000
+    WEB_WORKERS: int | None = None
 
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int
     REDIS_DB: int
     CACHE_PREFIX: str = "fastapi-cache"
+    # Ожидаемое время публикации бюллетеня (сброс кэша и заголовков Cache-Control)
+    BULLETIN_PUBLICATION_TIME: time = time(14, 11)
+
+    # Снимок таблицы торгов в памяти процесса для запросов чтения (services/snapshot.py)
+    SNAPSHOT_ENABLED: bool = False
+    SNAPSHOT_REFRESH_INTERVAL: float = 60  # Период проверки версии данных для дочитывания бюллетеней, с
+
+    # События о новых торговых днях (/trading/events): канал Redis, общий для всех процессов API,
+    # размер буфера подключения (при переполнении отбрасываются старые события) и период пустых сообщений
+    EVENTS_CHANNEL: str = "trading:events"
+    EVENTS_BUFFER_SIZE: int = 16
+    EVENTS_HEARTBEAT_INTERVAL: float = 15
+
+    API_MAX_LIMIT: int = 1000  # Максимальное значение limit в запросах торгов
+    BATCH_MAX_QUERIES: int = 50
+    # Допуск запросов торгов к БД (только промахи кэша): одновременные запросы процесса по классам маршрутов
+    # (даты, фильтрация, пакеты) - доли соединений процесса (пул и переполнение, см. get_admission_limits);
+    # остаток остается прочим запросам. Сверх ограничения запросы ждут в очереди класса не дольше
+    # ADMISSION_QUEUE_TIMEOUT секунд, а при переполнении очереди сразу получают 503 с Retry-After
+    ADMISSION_DATES_SHARE: float = 0.15
+    ADMISSION_FILTER_SHARE: float = 0.6
+    ADMISSION_BATCH_SHARE: float = 0.15
+    ADMISSION_QUEUE_SIZE: int = 64
+    ADMISSION_QUEUE_TIMEOUT: float = 5
+    ADMISSION_RETRY_AFTER: int = 1
+
+    # Загрузка бюллетеней с сайта биржи
+    SPIMEX_BASE_URL: str = "https://spimex.com"
+    PARSER_MIN_YEAR: int = 2023
+    PARSER_FIRST_PAGE: int = 1
+    PARSER_LAST_PAGE: int = 55
+    PARSER_MAX_CONCURRENT_REQUESTS: int = 15  # Максимальное число одновременных запросов
+    PARSER_MAX_DB_CONCURRENT: int = 10  # Ограничение для операций с базой данных
+    PARSER_BATCH_SIZE: int = 10  # Количество бюллетеней в одной транзакции записи
+    PARSER_FLUSH_INTERVAL: float = 2.0  # Максимальное ожидание неполного пакета бюллетеней, секунды
+    # Наблюдение за публикацией бюллетеней (watcher.py): опрос первой страницы результатов
+    # начинается за WATCHER_LEAD_MINUTES до BULLETIN_PUBLICATION_TIME, после него интервал
+    # растет в WATCHER_BACKOFF раз от WATCHER_MIN_INTERVAL до WATCHER_MAX_INTERVAL секунд
+    WATCHER_LEAD_MINUTES: int = 5
+    WATCHER_MIN_INTERVAL: float = 5
+    WATCHER_MAX_INTERVAL: float = 600
+    WATCHER_BACKOFF: float = 1.5
+    # Распределенная загрузка через очередь Redis Streams (distributed_ingest.py)
+    INGESTION_STREAM: str = "ingestion:jobs"
+    INGESTION_DEAD_LETTER_STREAM: str = "ingestion:dead"
+    INGESTION_GROUP: str = "ingestion-workers"
+    INGESTION_MAX_RETRIES: int = 3  # Попыток обработки задания до переноса в поток недоставленных
+    INGESTION_CLAIM_IDLE_MS: int = 300_000  # Задания упавшего обработчика передаются другим после простоя
+    # Метрики загрузки в текстовом формате Prometheus (textfile-коллектор или Pushgateway)
+    INGESTION_METRICS_FILE: Path = BASE_DIR / "metrics" / "ingestion.prom"
+    PUSHGATEWAY_URL: str | None = None
+
+    # Доступ к административным эндпоинтам (заголовок X-Admin-Token); без токена они отключены
+    ADMIN_TOKEN: str | None = None
+
+    # Медленные запросы: порог, доля запросов со снятием EXPLAIN ANALYZE и размер буфера
+    SLOW_QUERY_THRESHOLD_MS: float = 500
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = 0.1
+    SLOW_QUERY_LOG_SIZE: int = 100
+
+    # Логирование: записи передаются через очередь в фоновый поток, который пишет их
+    # в консоль и в файл logs/app.log с ротацией (LOG_FILE_MAX_BYTES=0 - без ротации).
+    # Дочерние процессы (обработчики uvicorn, части backfill) пишут в свой файл logs/app-<pid>.log
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = True  # Записи в формате JSON (по одной на строку)
+    LOG_FILE_MAX_BYTES: int = 10 * 1024 * 1024
+    LOG_FILE_BACKUP_COUNT: int = 5
+    LOG_QUEUE_SIZE: int = 10_000  # При переполнении очереди записи INFO и ниже отбрасываются
+    LOG_QUEUE_BLOCK_TIMEOUT: float = 0.1  # Сколько записи WARNING и выше ждут места в очереди, секунды
+    LOG_DROPPED_REPORT_INTERVAL: float = 10  # Период предупреждений об отброшенных записях, секунды
 
     TEST_DB_HOST: str = "localhost"
     TEST_DB_PORT: int = 5433
@@ -29,6 +129,62 @@ class Settings(BaseSettings):
     def get_db_postgres_url(self):
         return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.POSTGRES_DB}"
 
+    def get_web_workers(self) -> int:
+        return self.WEB_WORKERS or os.cpu_count() or 1
+
+    def get_db_pool_limits(self) -> tuple[int, int]:
+        """
+        Возвращает размер пула и допустимое переполнение для одного процесса.
+
+        Если задан `DB_CONNECTION_BUDGET`, на процесс приходится его доля, но пул
+        не больше `DB_POOL_SIZE`: остаток доли идет в переполнение.
+        """
+        if not self.DB_CONNECTION_BUDGET:
+            return self.DB_POOL_SIZE, self.DB_MAX_OVERFLOW
+        per_worker = max(self.DB_CONNECTION_BUDGET // self.get_web_workers(), 1)
+        pool_size = min(self.DB_POOL_SIZE, per_worker)
+        return pool_size, per_worker - pool_size
+
+    def get_admission_limits(self) -> dict[str, int]:
+        """
+        Возвращает ограничения одновременных запросов к БД по классам маршрутов.
+
+        Ограничение класса - его доля соединений процесса (`get_db_pool_limits`),
+        но не меньше одного запроса: допущенный запрос не ждет соединения пула.
+        """
+        connections = sum(self.get_db_pool_limits())
+        shares = {
+            "dates": self.ADMISSION_DATES_SHARE,
+            "filter": self.ADMISSION_FILTER_SHARE,
+            "batch": self.ADMISSION_BATCH_SHARE,
+        }
+        return {route_class: max(int(connections * share), 1) for route_class, share in shares.items()}
+
+    def check_admin_token(self, token: str | None) -> bool:
+        """
+        Проверяет токен администратора из заголовка `X-Admin-Token`.
+
+        Сравнение идет за постоянное время, чтобы по времени ответа нельзя было
+        подобрать токен посимвольно. Строки сравниваются в байтах: заголовок может
+        содержать не ASCII-символы, на которых `compare_digest` для str падает.
+        """
+        if self.ADMIN_TOKEN is None or token is None:
+            return False
+        return secrets.compare_digest(token.encode(), self.ADMIN_TOKEN.encode())
+
+    def get_db_replica_postgres_url(self):
+        port = self.DB_REPLICA_PORT or self.DB_PORT
+        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.DB_REPLICA_HOST}:{port}/{self.POSTGRES_DB}"
+
+    def get_test_db_postgres_url(self):
+        return (
+            f"postgresql+asyncpg://{self.TEST_POSTGRES_USER}:{self.TEST_POSTGRES_PASSWORD}"
+            f"@{self.TEST_DB_HOST}:{self.TEST_DB_PORT}/{self.TEST_POSTGRES_DB}"
+        )
+
+    def get_test_redis_url(self):
+        return f"redis://{self.TEST_REDIS_HOST}:{self.TEST_REDIS_PORT}"
+
     def get_db_sqlite_url(self):
         return "sqlite+aiosqlite:///db.sqlite3"
 
@@ -1,5 +1,32 @@
+"""
+Логирование без блокировки цикла событий.
+
+Обработчики приложения (консоль и файл с ротацией) работают в фоновом потоке
+`QueueListener`: вызов `logger.info(...)` только кладет запись в очередь.
+Сообщение собирается из `%`-шаблона и аргументов при постановке в очередь,
+поэтому записи ниже `LOG_LEVEL` не форматируются вовсе. Если поток записи
+не успевает и очередь заполнена, записи INFO и ниже отбрасываются, а не
+задерживают вызывающий код; записи WARNING и выше ждут места в очереди до
+`LOG_QUEUE_BLOCK_TIMEOUT` секунд. О количестве отброшенных записей раз
+в `LOG_DROPPED_REPORT_INTERVAL` секунд пишется предупреждение.
+
+Ротация одного файла из нескольких процессов небезопасна, поэтому дочерние
+процессы (обработчики uvicorn, части backfill) пишут в свой файл `app-<pid>.log`.
+"""
+
+import atexit
+import copy
+import json
 import logging
+import multiprocessing
+import os
+import queue
 import sys
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import TextIO
 
 from configs.config import settings
 
@@ -8,15 +35,176 @@ LOG_DIR.mkdir(exist_ok=True)
 
 LOG_FILE = LOG_DIR / "app.log"
 
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(module)s: %(message)s"
+
+_exception_formatter = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись в одну строку JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        document = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "process": record.process,
+            "message": record.getMessage(),
+        }
+        exception = record.exc_text or (self.formatException(record.exc_info) if record.exc_info else None)
+        if exception:
+            document["exception"] = exception
+        if record.stack_info:
+            document["stack"] = record.stack_info
+        return json.dumps(document, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Передает записи в очередь фонового потока.
+
+    В отличие от `QueueHandler`, не форматирует запись целиком в вызывающем
+    потоке: в очередь попадают сообщение и текст исключения, а оформление
+    (время, JSON) выполняется обработчиками в фоновом потоке.
+    """
+
+    def __init__(
+        self,
+        log_queue: queue.Queue,
+        block_timeout: float = settings.LOG_QUEUE_BLOCK_TIMEOUT,
+        report_interval: float = settings.LOG_DROPPED_REPORT_INTERVAL,
+    ):
+        """
+        :param log_queue: Очередь записей.
+        :param block_timeout: Сколько записи WARNING и выше ждут места в очереди, секунды.
+        :param report_interval: Период предупреждений об отброшенных записях, секунды.
+        """
+        super().__init__(log_queue)
+        self.block_timeout = block_timeout
+        self.report_interval = report_interval
+        self.dropped = 0
+        self.reported = 0
+        self.reported_at = time.monotonic()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            if record.levelno >= logging.WARNING:
+                self.queue.put(record, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        self._report_dropped()
+
+    def _report_dropped(self) -> None:
+        """Ставит в очередь предупреждение о записях, отброшенных с прошлого предупреждения."""
+        now = time.monotonic()
+        if self.dropped == self.reported or now - self.reported_at < self.report_interval:
+            return
+        record = logging.LogRecord(
+            __name__,
+            logging.WARNING,
+            __file__,
+            0,
+            "Очередь лога переполнена, отброшено записей: %s (всего %s)",
+            (self.dropped - self.reported, self.dropped),
+            None,
+        )
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except queue.Full:
+            return
+        self.reported, self.reported_at = self.dropped, now
+
+
+class LogQueueListener(QueueListener):
+    """Поток записи, который при остановке дописывает всю очередь, даже заполненную."""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+def create_handlers(
+    log_file: Path = LOG_FILE,
+    json_format: bool = settings.LOG_JSON,
+    max_bytes: int = settings.LOG_FILE_MAX_BYTES,
+    backup_count: int = settings.LOG_FILE_BACKUP_COUNT,
+    stream: TextIO = sys.stdout,
+) -> list[logging.Handler]:
+    """
+    Создает обработчики записи в файл с ротацией и в поток вывода.
+
+    :param log_file: Файл лога.
+    :param json_format: Записи в формате JSON вместо текста.
+    :param max_bytes: Размер файла, после которого он ротируется (0 - без ротации).
+    :param backup_count: Количество хранимых старых файлов.
+    :param stream: Поток вывода.
+    """
+    formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    handlers = [
+        RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"),
+        logging.StreamHandler(stream),
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def attach_queue(
+    target: logging.Logger, handlers: list[logging.Handler], queue_size: int = settings.LOG_QUEUE_SIZE
+) -> QueueListener:
+    """
+    Заменяет обработчики логгера очередью и запускает поток записи.
+
+    :param target: Логгер.
+    :param handlers: Обработчики, которые будут работать в фоновом потоке.
+    :param queue_size: Размер очереди записей.
+    :return: Запущенный поток записи (`stop()` дописывает очередь и останавливает его).
+    """
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    for handler in target.handlers[:]:
+        target.removeHandler(handler)
+    target.addHandler(NonBlockingQueueHandler(log_queue))
+    listener = LogQueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def process_log_file(child: bool) -> Path:
+    """
+    Возвращает файл лога процесса.
+
+    :param child: Процесс запущен другим процессом приложения.
+    """
+    return LOG_DIR / f"app-{os.getpid()}.log" if child else LOG_FILE
+
+
+def setup_logging() -> QueueListener:
+    """Настраивает корневой логгер приложения и запускает поток записи."""
+    root = logging.getLogger()
+    root.setLevel(settings.LOG_LEVEL)
+    return attach_queue(root, create_handlers(process_log_file(multiprocessing.parent_process() is not None)))
+
+
+def _restart_listener() -> None:
+    """Поток записи не переживает fork: дочерний процесс запускает свой с новой очередью и своим файлом."""
+    global listener
+    listener = attach_queue(logging.getLogger(), create_handlers(process_log_file(child=True)))
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(module)s: %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_FILE, encoding="utf-8"),
-        logging.StreamHandler(sys.stdout),
-    ],
-)
 
+listener = setup_logging()
+atexit.register(lambda: listener.stop())
+os.register_at_fork(after_in_child=_restart_listener)
 
 logger = logging.getLogger("main_logger")
@@ -1,20 +1,178 @@
-from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncAttrs, create_async_engine
-from sqlalchemy.orm import DeclarativeBase
+import asyncio
+from contextvars import ContextVar
+
+from sqlalchemy import Connection, Engine, event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import (
+    async_sessionmaker,
+    AsyncAttrs,
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+)
+from sqlalchemy.orm import (
+    configure_mappers,
+    DeclarativeBase,
+    Session,
+    SessionTransaction,
+)
+from sqlalchemy.sql.selectable import CompoundSelect, Select
 
 from configs.config import settings
+from configs.logging_config import logger
+from utils.metrics import instrument_engine, InstrumentedQueuePool
+from utils.query_monitor import query_monitor
 
 DATABASE_URL = settings.get_db_postgres_url()
 
-engine = create_async_engine(DATABASE_URL, pool_size=20, max_overflow=10, pool_timeout=60, pool_pre_ping=True)
+
+def create_engine(url: str, name: str) -> AsyncEngine:
+    """
+    Создает движок с параметрами пула из настроек и подключает к нему метрики.
+
+    :param url: Адрес базы данных.
+    :param name: Имя движка в метриках (`primary`, `replica`).
+    :return: Асинхронный движок SQLAlchemy.
+    """
+    pool_size, max_overflow = settings.get_db_pool_limits()
+    engine = create_async_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_logging_name=name,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        query_cache_size=settings.DB_QUERY_CACHE_SIZE,
+        connect_args={"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
+    )
+    instrument_engine(engine, name)
+    query_monitor.instrument(engine)
+    return engine
+
+
+engine = create_engine(DATABASE_URL, "primary")
+replica_engine = (
+    create_engine(settings.get_db_replica_postgres_url(), "replica") if settings.DB_REPLICA_HOST else engine
+)
 
 
 class BaseModel(AsyncAttrs, DeclarativeBase):
     __abstract__ = True
 
 
-AsyncSessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
+class RoutingSession(Session):
+    """
+    Сессия, направляющая чтение на реплику, а запись на основной сервер.
+
+    На реплике выполняются только SELECT-запросы (кроме `SELECT ... FOR UPDATE`).
+    Все остальное идет на основной сервер: INSERT/UPDATE/DELETE, flush ORM-объектов
+    и массовые операции ORM, которые запрашивают соединение без выражения.
+    """
+
+    def __init__(self, primary: Engine, replica: Engine, **kwargs):
+        super().__init__(**kwargs)
+        self.primary = primary
+        self.replica = replica
+
+    def get_bind(self, mapper=None, clause=None, **kwargs) -> Engine:
+        if (
+            not self._flushing
+            and isinstance(clause, (Select, CompoundSelect))
+            and getattr(clause, "_for_update_arg", None) is None
+        ):
+            return self.replica
+        return self.primary
+
+
+# Ограничение времени запросов к БД (мс) для текущего HTTP-запроса, задается маршрутом
+# (`api.cancellation.CancellableRoute`); вне запросов API время не ограничивается
+statement_timeout: ContextVar[int | None] = ContextVar("statement_timeout", default=None)
+
+
+@event.listens_for(RoutingSession, "after_begin")
+def apply_statement_timeout(session: Session, transaction: SessionTransaction, connection: Connection) -> None:
+    """Устанавливает `statement_timeout` текущего запроса на время транзакции (`SET LOCAL`)."""
+    timeout = statement_timeout.get()
+    if timeout:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout)}")
+
+
+AsyncSessionLocal = async_sessionmaker(
+    sync_session_class=RoutingSession,
+    primary=engine.sync_engine,
+    replica=replica_engine.sync_engine,
+    expire_on_commit=False,
+    autoflush=False,
+)
+# Сессии только основного сервера: для чтения сразу после записи (реплика может отставать)
+PrimarySessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
+
+
+class LazySession:
+    """
+    Сессия, создаваемая при первом обращении.
+
+    Проксирует атрибуты `AsyncSession`, создавая ее через `session_factory`
+    только когда сервис действительно выполняет запрос. Запросы, обслуженные
+    из кэша, не создают сессию и не обращаются к пулу соединений.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession]):
+        self._session_factory = session_factory
+        self._session: AsyncSession | None = None
+
+    @property
+    def started(self) -> bool:
+        """Была ли создана сессия."""
+        return self._session is not None
+
+    def __getattr__(self, name: str):
+        if self._session is None:
+            self._session = self._session_factory()
+        return getattr(self._session, name)
+
+    async def close(self) -> None:
+        """Закрывает сессию, если она была создана."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+async def warm_up(connections: int = settings.DB_POOL_WARMUP) -> None:
+    """
+    Подготавливает ORM и пулы соединений до приема запросов.
+
+    Настраивает мапперы моделей и открывает по `connections` соединений
+    в пулах основного сервера и реплики, чтобы первые запросы не тратили время
+    на установку соединений. Недоступность БД не мешает запуску: соединения
+    будут открыты при первых запросах.
+
+    :param connections: Количество соединений на движок (не больше размера пула).
+    """
+    configure_mappers()
+
+    async def connect(engine: AsyncEngine) -> None:
+        async with engine.connect() as conn:
+            await conn.exec_driver_sql("SELECT 1")
+
+    engines = {engine, replica_engine}
+    count = min(connections, settings.get_db_pool_limits()[0])
+    # Соединения запрашиваются одновременно, поэтому в пуле открывается `count` разных соединений.
+    # Дожидаемся всех попыток: при недоступной БД ошибки остальных не теряются в незавершенных задачах
+    results = await asyncio.gather(*(connect(bind) for bind in engines for _ in range(count)), return_exceptions=True)
+    errors = [result for result in results if isinstance(result, BaseException)]
+    for error in errors:
+        if not isinstance(error, (OSError, SQLAlchemyError)):
+            raise error
+    if errors:
+        logger.warning("Не удалось прогреть пул соединений (%s из %s): %s", len(errors), len(results), errors[0])
 
 
 async def get_db():
-    async with AsyncSessionLocal() as db:
+    db = LazySession(AsyncSessionLocal)
+    try:
         yield db
+    finally:
+        await db.close()
@@ -1,20 +1,36 @@
 import datetime as dt
 from decimal import Decimal
 
-from sqlalchemy import Date, func, Numeric, String
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Date, ForeignKey, func, Numeric, select, String
+from sqlalchemy.orm import Mapped, mapped_column, query_expression
 
 from database.database import BaseModel
 
 
+class ExchangeProduct(BaseModel):
+    """Справочник названий биржевых инструментов."""
+
+    __tablename__ = "exchange_products"
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(String(250), unique=True)
+
+
+class DeliveryBasis(BaseModel):
+    """Справочник названий базисов поставки."""
+
+    __tablename__ = "delivery_bases"
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(String(250), unique=True)
+
+
 class SpimexTradingResults(BaseModel):
     __tablename__ = "spimex_trading_results"
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     exchange_product_id: Mapped[str] = mapped_column(String(20))
-    exchange_product_name: Mapped[str] = mapped_column(String(250))
+    exchange_product_name_id: Mapped[int] = mapped_column(ForeignKey("exchange_products.id"))
     oil_id: Mapped[str] = mapped_column(String(4), index=True)
     delivery_basis_id: Mapped[str] = mapped_column(String(4), index=True)
-    delivery_basis_name: Mapped[str] = mapped_column(String(250))
+    delivery_basis_name_id: Mapped[int] = mapped_column(ForeignKey("delivery_bases.id"))
     delivery_type_id: Mapped[str] = mapped_column(String(4), index=True)
     volume: Mapped[int]
     total: Mapped[Decimal] = mapped_column(Numeric(20, 2))
@@ -22,3 +38,22 @@ class SpimexTradingResults(BaseModel):
     date: Mapped[dt.date] = mapped_column(Date, index=True)
     created_on: Mapped[dt.datetime] = mapped_column(server_default=func.now(), default=dt.datetime.now)
     updated_on: Mapped[dt.datetime] = mapped_column(server_default=func.now(), onupdate=dt.datetime.now)
+
+    # Названия хранятся в справочниках и подставляются при чтении. Запросы чтения
+    # торгов (`build_filter_statement`) берут их соединением со справочниками через
+    # `with_expression`, остальные - коррелированным подзапросом по умолчанию
+    exchange_product_name: Mapped[str] = query_expression(
+        select(ExchangeProduct.name).where(ExchangeProduct.id == exchange_product_name_id).scalar_subquery()
+    )
+    delivery_basis_name: Mapped[str] = query_expression(
+        select(DeliveryBasis.name).where(DeliveryBasis.id == delivery_basis_name_id).scalar_subquery()
+    )
+
+
+class BackfillCheckpoint(BaseModel):
+    """Бюллетени, загруженные командой исторической загрузки (`backfill.py`)."""
+
+    __tablename__ = "backfill_checkpoints"
+    date: Mapped[dt.date] = mapped_column(Date, primary_key=True)
+    rows: Mapped[int]
+    loaded_on: Mapped[dt.datetime] = mapped_column(server_default=func.now())
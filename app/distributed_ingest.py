@@ -0,0 +1,183 @@
+"""
+Распределенная загрузка бюллетеней через очередь Redis Streams.
+
+Координатор обходит страницы результатов торгов и добавляет ссылки на
+бюллетени в поток заданий. Обработчики (в любом количестве процессов
+и контейнеров) читают задания через группу потребителей, скачивают и разбирают
+файлы, записывают пакет бюллетеней в БД (`BulletinWriter`) и подтверждают
+задания только после commit. Неудачные задания повторяются, после
+`INGESTION_MAX_RETRIES` попыток переносятся в поток недоставленных.
+Запись бюллетеня заменяет строки за его дату, поэтому задание, выполненное
+повторно (обработчик упал после commit, но до подтверждения), не дублирует данные.
+
+Запуск:
+
+    python distributed_ingest.py coordinator
+    python distributed_ingest.py worker --consumer worker-1
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+from datetime import datetime
+
+from aiohttp import ClientSession, TCPConnector
+from parser_main import process_page, refresh_derived_data
+from services.bulletin_writer import BulletinWriter
+from services.ingestion_queue import IngestionJob, IngestionQueue
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from configs.config import settings
+from configs.logging_config import logger
+from database.database import AsyncSessionLocal
+from exceptions import XLSExtractorError
+from parsers.scraper import fetch_file
+from utils.file_utils import XLSExtractor
+from utils.ingestion_stats import IngestionStats
+from utils.redis_client import get_redis
+
+
+async def coordinate(
+    queue: IngestionQueue,
+    base_url: str = settings.SPIMEX_BASE_URL,
+    first_page: int = settings.PARSER_FIRST_PAGE,
+    last_page: int = settings.PARSER_LAST_PAGE,
+    min_year: int = settings.PARSER_MIN_YEAR,
+    current_year: int = datetime.now().year,
+) -> int:
+    """
+    Добавляет в очередь задания на загрузку бюллетеней со страниц `first_page`..`last_page`.
+
+    :return: Количество добавленных заданий.
+    """
+    stats = IngestionStats()
+    published = 0
+    await queue.create_group()
+    async with ClientSession() as session:
+        for page in range(first_page, last_page + 1):
+            file_links, reached_boundary = await process_page(session, page, stats, base_url, min_year, current_year)
+            for link, bidding_date in file_links:
+                await queue.publish(base_url + link, bidding_date)
+                published += 1
+            if reached_boundary:
+                break
+    logger.info("В очередь добавлено %s заданий со страниц %s-%s", published, first_page, page)
+    return published
+
+
+async def download_job(session: ClientSession, job: IngestionJob, stats: IngestionStats) -> list[dict] | str:
+    """
+    Скачивает и разбирает файл бюллетеня.
+
+    :return: Строки бюллетеня или описание ошибки.
+    """
+    try:
+        with stats.stage("file"):
+            byte_file = await fetch_file(session, job.url)
+        if byte_file is None:
+            return f"Файл {job.url} не загружен"
+        with stats.stage("extract"):
+            return XLSExtractor(byte_file, job.bidding_date).get_data()
+    except XLSExtractorError as e:
+        return str(e)
+    except Exception as e:
+        logger.error("Неизвестная ошибка при загрузке данных: %s", e, exc_info=True)
+        return f"Неизвестная ошибка: {e}"
+
+
+async def work(
+    queue: IngestionQueue,
+    consumer: str,
+    session_factory: async_sessionmaker = AsyncSessionLocal,
+    batch_size: int = settings.PARSER_BATCH_SIZE,
+    max_concurrent_requests: int = settings.PARSER_MAX_CONCURRENT_REQUESTS,
+    block_ms: int = 5000,
+    exit_when_empty: bool = False,
+    refresh: bool = True,
+) -> IngestionStats:
+    """
+    Обрабатывает задания из очереди.
+
+    Задания читаются пакетами по `batch_size`, файлы пакета скачиваются
+    параллельно и записываются в БД одной транзакцией. Задание подтверждается
+    после commit, поэтому при падении обработчика оно будет обработано другим.
+
+    :param queue: Очередь заданий.
+    :param consumer: Имя обработчика в группе потребителей.
+    :param session_factory: Фабрика сессий БД.
+    :param batch_size: Количество заданий в пакете (бюллетеней в одной транзакции).
+    :param max_concurrent_requests: Максимальное число одновременных HTTP-запросов.
+    :param block_ms: Время ожидания новых заданий, мс.
+    :param exit_when_empty: Завершить работу, когда очередь опустеет.
+    :param refresh: Обновлять справочники кодов и версию данных, когда очередь опустеет.
+    :return: Статистика загрузки.
+    """
+    stats = IngestionStats()
+    writer = BulletinWriter(session_factory, stats, batch_size=batch_size, max_concurrent=1, replace=True)
+    written_since_refresh = False
+    await queue.create_group()
+    async with ClientSession(connector=TCPConnector(limit=max_concurrent_requests)) as session:
+        while True:
+            jobs = await queue.read(consumer, batch_size, block_ms)
+            if not jobs:
+                if refresh and written_since_refresh:
+                    await refresh_derived_data()
+                    written_since_refresh = False
+                if exit_when_empty:
+                    break
+                continue
+
+            results = await asyncio.gather(*(download_job(session, job, stats) for job in jobs))
+            bulletins = {}
+            for job, result in zip(jobs, results):
+                if isinstance(result, str):
+                    stats.errors += 1
+                    await fail(queue, job, result)
+                else:
+                    bulletins[job] = (job.bidding_date, result)
+            written = await writer.write(list(bulletins.values())) if bulletins else []
+            written_ids = {id(bulletin) for bulletin in written}
+            for job, bulletin in bulletins.items():
+                if id(bulletin) in written_ids:
+                    await queue.ack(job)
+                else:
+                    await fail(queue, job, "Ошибка при сохранении данных в БД")
+            written_since_refresh = written_since_refresh or bool(written)
+    stats.finish()
+    return stats
+
+
+async def fail(queue: IngestionQueue, job: IngestionJob, error: str) -> None:
+    """Возвращает задание в очередь (или в поток недоставленных) с записью в лог."""
+    if await queue.fail(job, error):
+        logger.error("Задание %s (%s) перенесено в поток недоставленных: %s", job.url, job.bidding_date, error)
+    else:
+        logger.warning("Задание %s (%s) будет повторено: %s", job.url, job.bidding_date, error)
+
+
+async def main(args: argparse.Namespace) -> None:
+    redis = await get_redis()
+    queue = IngestionQueue(redis)
+    try:
+        if args.role == "coordinator":
+            await coordinate(queue)
+        else:
+            stats = await work(queue, args.consumer, batch_size=args.batch_size)
+            logger.info("Статистика загрузки: %s", stats.summary())
+    finally:
+        await redis.aclose()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Распределенная загрузка бюллетеней через Redis Streams")
+    parser.add_argument("role", choices=("coordinator", "worker"))
+    parser.add_argument(
+        "--consumer", default=f"{socket.gethostname()}-{os.getpid()}", help="Имя обработчика в группе потребителей"
+    )
+    parser.add_argument("--batch-size", type=int, default=settings.PARSER_BATCH_SIZE)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
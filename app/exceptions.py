@@ -8,3 +8,12 @@ class XLSExtractorError(Exception):
     """Ошибка при обработке XLS-файла"""
 
     pass
+
+
+class Overloaded(Exception):
+    """Запрос к БД отклонен контролем допуска: очередь класса маршрутов переполнена."""
+
+    def __init__(self, route_class: str, retry_after: int):
+        super().__init__(f"Очередь запросов к БД ({route_class}) переполнена")
+        self.route_class = route_class
+        self.retry_after = retry_after
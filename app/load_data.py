@@ -3,10 +3,10 @@ import json
 from datetime import datetime
 from pathlib import Path
 
-from sqlalchemy import insert
+from parser_main import refresh_derived_data
+from services.tradings import TradingService
 
 from database.database import AsyncSessionLocal
-from database.models import SpimexTradingResults
 
 filepath = Path(__file__).parent / "fixtures.json"
 
@@ -15,12 +15,11 @@ async def load_fixtures(filepath):
     async with AsyncSessionLocal() as session:
         with open(filepath, encoding="utf-8") as file:
             json_file = json.load(file)
-            for row in json_file:
-                date = row.pop("date")
-                date = datetime.strptime(date, "%Y-%m-%d").date()
-                query = insert(SpimexTradingResults).values(**row, date=date)
-                await session.execute(query)
-            await session.commit()
+        for row in json_file:
+            row["date"] = datetime.strptime(row["date"], "%Y-%m-%d").date()
+        await TradingService(session).mass_create_trading(json_file)
+        await session.commit()
+    await refresh_derived_data()
 
 
 if __name__ == "__main__":
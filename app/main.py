@@ -1,8 +1,21 @@
-from contextlib import asynccontextmanager
+import asyncio
+import os
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
+from fastapi_cache import FastAPICache
+from prometheus_client import multiprocess
+from services.data_version import DataVersionService
+from services.events import trading_events
+from services.snapshot import trading_snapshot
 
+from api.middleware import PrometheusMiddleware
+from api.routers.admin import router as admin_router
+from api.routers.metrics import router as metrics_router
 from api.routers.tradings import router as trading_router
+from configs.config import settings
+from configs.logging_config import logger
+from database.database import PrimarySessionLocal, warm_up
 from utils.redis_client import init_redis
 
 
@@ -11,18 +24,49 @@ async def lifespan(app: FastAPI):
     """
     Контекстный менеджер для управления жизненным циклом приложения.
 
-    Инициализирует подключение к Redis при запуске приложения
-    и закрывает его при завершении работы.
+    Инициализирует подключение к Redis, подписку на события о новых торговых днях,
+    мапперы ORM и пул соединений с БД при запуске приложения и закрывает
+    подключение к Redis при завершении работы.
+    Если включен снимок торгов (`SNAPSHOT_ENABLED`), загружает его и запускает
+    фоновое дочитывание новых бюллетеней.
 
     :param app: Экземпляр FastAPI.
     """
 
     redis_client = await init_redis()
+    await trading_events.start(redis_client)
+    await warm_up()
+    snapshot_task = None
+    if settings.SNAPSHOT_ENABLED:
+        version_service = DataVersionService(FastAPICache.get_backend(), FastAPICache.get_prefix())
+        try:
+            trading_snapshot.version = await version_service.get()
+            await trading_snapshot.load(PrimarySessionLocal)
+        except Exception as e:
+            # Без снимка запросы чтения выполняются в БД; загрузку повторит фоновая задача
+            logger.error("Не удалось загрузить снимок торгов: %s", e)
+            trading_snapshot.version = None
+        snapshot_task = asyncio.create_task(
+            trading_snapshot.watch(
+                PrimarySessionLocal, version_service, settings.SNAPSHOT_REFRESH_INTERVAL, trading_events
+            )
+        )
     yield
+    if snapshot_task is not None:
+        snapshot_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await snapshot_task
+    await trading_events.stop()
     await redis_client.close()
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # Значения пулов завершенного процесса не должны попадать в сумму живых процессов
+        multiprocess.mark_process_dead(os.getpid())
 
 
 app = FastAPI(title="Spimex Trading API", lifespan=lifespan)
+app.add_middleware(PrometheusMiddleware)
 
 
 app.include_router(trading_router, prefix="/trading", tags=["Trading"])
+app.include_router(metrics_router, tags=["Metrics"])
+app.include_router(admin_router, prefix="/admin", tags=["Admin"])
@@ -0,0 +1,86 @@
+"""Add reference tables for exchange product and delivery basis names
+
+Revision ID: 9c1d4e7a2b5f
+Revises: 72e7725c3bec
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c1d4e7a2b5f'
+down_revision: Union[str, None] = '72e7725c3bec'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('exchange_products',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(length=250), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('delivery_bases',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(length=250), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.execute(
+        'INSERT INTO exchange_products (name) '
+        'SELECT DISTINCT exchange_product_name FROM spimex_trading_results'
+    )
+    op.execute(
+        'INSERT INTO delivery_bases (name) '
+        'SELECT DISTINCT delivery_basis_name FROM spimex_trading_results'
+    )
+    op.add_column('spimex_trading_results', sa.Column('exchange_product_name_id', sa.Integer(), nullable=True))
+    op.add_column('spimex_trading_results', sa.Column('delivery_basis_name_id', sa.Integer(), nullable=True))
+    op.execute(
+        'UPDATE spimex_trading_results AS t '
+        'SET exchange_product_name_id = p.id, delivery_basis_name_id = b.id '
+        'FROM exchange_products AS p, delivery_bases AS b '
+        'WHERE p.name = t.exchange_product_name AND b.name = t.delivery_basis_name'
+    )
+    op.alter_column('spimex_trading_results', 'exchange_product_name_id', nullable=False)
+    op.alter_column('spimex_trading_results', 'delivery_basis_name_id', nullable=False)
+    op.create_foreign_key(
+        op.f('spimex_trading_results_exchange_product_name_id_fkey'), 'spimex_trading_results',
+        'exchange_products', ['exchange_product_name_id'], ['id']
+    )
+    op.create_foreign_key(
+        op.f('spimex_trading_results_delivery_basis_name_id_fkey'), 'spimex_trading_results',
+        'delivery_bases', ['delivery_basis_name_id'], ['id']
+    )
+    op.drop_column('spimex_trading_results', 'exchange_product_name')
+    op.drop_column('spimex_trading_results', 'delivery_basis_name')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('spimex_trading_results', sa.Column('delivery_basis_name', sa.String(length=250), nullable=True))
+    op.add_column('spimex_trading_results', sa.Column('exchange_product_name', sa.String(length=250), nullable=True))
+    op.execute(
+        'UPDATE spimex_trading_results AS t '
+        'SET exchange_product_name = p.name, delivery_basis_name = b.name '
+        'FROM exchange_products AS p, delivery_bases AS b '
+        'WHERE p.id = t.exchange_product_name_id AND b.id = t.delivery_basis_name_id'
+    )
+    op.alter_column('spimex_trading_results', 'exchange_product_name', nullable=False)
+    op.alter_column('spimex_trading_results', 'delivery_basis_name', nullable=False)
+    op.drop_constraint(
+        op.f('spimex_trading_results_delivery_basis_name_id_fkey'), 'spimex_trading_results', type_='foreignkey'
+    )
+    op.drop_constraint(
+        op.f('spimex_trading_results_exchange_product_name_id_fkey'), 'spimex_trading_results', type_='foreignkey'
+    )
+    op.drop_column('spimex_trading_results', 'delivery_basis_name_id')
+    op.drop_column('spimex_trading_results', 'exchange_product_name_id')
+    op.drop_table('delivery_bases')
+    op.drop_table('exchange_products')
@@ -3,89 +3,215 @@ import time
 from datetime import date, datetime
 
 from aiohttp import ClientSession, TCPConnector
-from services.tradings import TradingService
-from sqlalchemy.exc import SQLAlchemyError
-
+from fastapi_cache import FastAPICache
+from services.bulletin_writer import BulletinWriter
+from services.catalog import CatalogService
+from services.data_version import DataVersionService
+from services.events import TradingEventBroker
+from sqlalchemy import distinct, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from configs.config import settings
 from configs.logging_config import logger
-from database.database import AsyncSessionLocal
+from database.database import AsyncSessionLocal, PrimarySessionLocal
+from database.models import SpimexTradingResults
 from exceptions import XLSExtractorError
 from parsers.parser import Parser
 from parsers.scraper import fetch_file, fetch_page
+from schemas.tradings import TradingDayEvent
 from utils.file_utils import XLSExtractor
+from utils.ingestion_stats import IngestionStats
+from utils.metrics import write_ingestion_metrics
+from utils.redis_client import init_redis
 
-BASE_URL = "https://spimex.com"
-PAGE_URL = BASE_URL + "/markets/oil_products/trades/results/"
+BASE_URL = settings.SPIMEX_BASE_URL
+RESULTS_PATH = "/markets/oil_products/trades/results/"
 CURRENT_YEAR = datetime.now().year
-MIN_YEAR = 2023
-FIRST_PAGE = 1
-LAST_PAGE = 55
-MAX_CONCURRENT_REQUESTS = 15  # Максимальное число одновременных запросов
-MAX_DB_CONCURRENT = 10  # Ограничение для операций с базой данных
-
-
-async def download_data(session: ClientSession, url: str, bidding_date: date, semaphore: asyncio.Semaphore) -> None:
-    """Скачивает файл, обрабатывает его и сохраняет данные в БД"""
+MIN_YEAR = settings.PARSER_MIN_YEAR
+FIRST_PAGE = settings.PARSER_FIRST_PAGE
+LAST_PAGE = settings.PARSER_LAST_PAGE
+MAX_CONCURRENT_REQUESTS = settings.PARSER_MAX_CONCURRENT_REQUESTS  # Максимальное число одновременных запросов
+MAX_DB_CONCURRENT = settings.PARSER_MAX_DB_CONCURRENT  # Ограничение для операций с базой данных
+BATCH_SIZE = settings.PARSER_BATCH_SIZE  # Количество бюллетеней в одной транзакции
+FLUSH_INTERVAL = settings.PARSER_FLUSH_INTERVAL  # Максимальное ожидание неполного пакета
+
+
+async def download_data(
+    session: ClientSession,
+    url: str,
+    bidding_date: date,
+    writer: BulletinWriter,
+    stats: IngestionStats,
+) -> None:
+    """Скачивает файл, обрабатывает его и передает данные на запись в БД"""
     try:
-        byte_file = await fetch_file(session, url)
+        with stats.stage("file"):
+            byte_file = await fetch_file(session, url)
+        if byte_file is None:
+            stats.errors += 1
+            return
 
         # Создаем класс извлекающий нужные данные из файла xls
-        xls_extractor = XLSExtractor(byte_file, bidding_date)
-        data = xls_extractor.get_data()
-        logger.info(f"Данные готовы к загрузке в БД для даты {bidding_date}")
-        # Сохраняем данные в БД
-        async with semaphore:
-            async with AsyncSessionLocal() as db:
-                service = TradingService(db)
-                await service.mass_create_trading(data)
-            logger.info(f"Данные загружены в БД с торгами {bidding_date}")
+        with stats.stage("extract"):
+            xls_extractor = XLSExtractor(byte_file, bidding_date)
+            data = xls_extractor.get_data()
+        logger.info("Данные готовы к загрузке в БД для даты %s", bidding_date)
+        # Сохраняем данные в БД (пакетами, см. BulletinWriter)
+        await writer.add(bidding_date, data)
     except XLSExtractorError as e:
+        stats.errors += 1
         logger.error(e, exc_info=True)
-    except SQLAlchemyError as e:
-        logger.error(f"Ошибка при сохранении данных б БД: {e}", exc_info=True)
     except Exception as e:
-        logger.error(f"Неизвестная ошибка при загрузке данных: {e}", exc_info=True)
-
-
-async def process_page(session: ClientSession, page: int, semaphore: asyncio.Semaphore):
-    """Обрабатывает одну страницу: парсит ссылки и загружает файлы"""
-    page_html = await fetch_page(session, PAGE_URL, params={"page": f"page-{page}"})
+        stats.errors += 1
+        logger.error("Неизвестная ошибка при загрузке данных: %s", e, exc_info=True)
+
+
+async def process_page(
+    session: ClientSession,
+    page: int,
+    stats: IngestionStats,
+    base_url: str = BASE_URL,
+    min_year: int = MIN_YEAR,
+    current_year: int = CURRENT_YEAR,
+) -> tuple[list[tuple[str, date]], bool]:
+    """
+    Загружает страницу результатов торгов и извлекает ссылки на бюллетени.
+
+    :return: Ссылки на файлы с датами торгов и признак того, что следующие
+        страницы загружать не нужно (достигнута граница `min_year` или страница пуста).
+    """
+    with stats.stage("page"):
+        page_html = await fetch_page(session, base_url + RESULTS_PATH, params={"page": f"page-{page}"})
     if page_html is None:
-        logger.error(f"Пропускаем страницу {page}, так как HTML не был загружен")
-        return
-    logger.info(f"Страница {page} получена.")
+        stats.errors += 1
+        logger.error("Пропускаем страницу %s, так как HTML не был загружен", page)
+        return [], False
+    stats.pages += 1
+    logger.info("Страница %s получена.", page)
 
     # Создаем класс Parser и извлекаем ссылки на файлы и даты торгов
-    parser = Parser(page_html, MIN_YEAR, CURRENT_YEAR)
-    file_links: list[tuple[str, date]] = parser.extract_file_links()
-
-    # Создаем задачи для скачивания файлов и сохранения в БД
+    with stats.stage("parse"):
+        parser = Parser(page_html, min_year, current_year)
+        file_links: list[tuple[str, date]] = parser.extract_file_links()
+    return file_links, parser.reached_boundary
+
+
+async def ingest(
+    base_url: str = BASE_URL,
+    first_page: int = FIRST_PAGE,
+    last_page: int = LAST_PAGE,
+    min_year: int = MIN_YEAR,
+    current_year: int = CURRENT_YEAR,
+    max_concurrent_requests: int = MAX_CONCURRENT_REQUESTS,
+    max_db_concurrent: int = MAX_DB_CONCURRENT,
+    session_factory: async_sessionmaker = AsyncSessionLocal,
+    batch_size: int = BATCH_SIZE,
+    flush_interval: float = FLUSH_INTERVAL,
+) -> IngestionStats:
+    """
+    Загружает бюллетени со страниц `first_page`..`last_page` в БД.
+
+    Страницы запрашиваются по порядку (от новых бюллетеней к старым), и обход
+    останавливается на странице, где встретилась дата раньше `min_year`.
+    Файлы найденных бюллетеней скачиваются параллельно с обходом страниц,
+    разобранные бюллетени записываются в БД пакетами (`BulletinWriter`).
+
+    :param base_url: Адрес сайта биржи (или его локальной замены).
+    :param first_page: Первая страница результатов торгов.
+    :param last_page: Последняя страница результатов торгов.
+    :param min_year: Минимальный год торгов.
+    :param current_year: Максимальный год торгов.
+    :param max_concurrent_requests: Максимальное число одновременных HTTP-запросов.
+    :param max_db_concurrent: Максимальное число одновременных записей в БД.
+    :param session_factory: Фабрика сессий БД.
+    :param batch_size: Количество бюллетеней в одной транзакции.
+    :param flush_interval: Максимальное ожидание неполного пакета в секундах.
+    :return: Статистика загрузки.
+    """
     tasks = []
-    for link, bidding_date in file_links:
-        tasks.append(asyncio.create_task(download_data(session, BASE_URL + link, bidding_date, semaphore)))
-    await asyncio.gather(*tasks)
-    logger.info(f"Страница {page} загружена")
+    stats = IngestionStats()
+    connector = TCPConnector(limit=max_concurrent_requests)
+    writer = BulletinWriter(session_factory, stats, batch_size, flush_interval, max_db_concurrent)
+
+    async with ClientSession(connector=connector) as session, writer:
+        try:
+            # В цикле проходимся по страницам со ссылками на файлы
+            for page in range(first_page, last_page + 1):
+                file_links, reached_boundary = await process_page(
+                    session, page, stats, base_url, min_year, current_year
+                )
+                # Создаем задачи для скачивания файлов и сохранения в БД
+                for link, bidding_date in file_links:
+                    tasks.append(
+                        asyncio.create_task(download_data(session, base_url + link, bidding_date, writer, stats))
+                    )
+                if reached_boundary:
+                    logger.info("Обход страниц остановлен на странице %s", page)
+                    break
+        except Exception as e:
+            logger.error("Неизвестная ошибка: %s", e)
+        await asyncio.gather(*tasks)
+    logger.info("Загрузка завершена")
+    stats.finish()
+    return stats
+
+
+async def refresh_derived_data() -> None:
+    """
+    Очищает кэш API, пересчитывает справочники кодов и обновляет версию данных после загрузки.
+
+    Кэш очищается явно: ключи живут до ожидаемого времени публикации бюллетеня,
+    и ответы, закэшированные между этим временем и фактической загрузкой,
+    иначе отдавались бы без новых данных до следующего дня. Если загружен
+    бюллетень за новый торговый день, о нем публикуется событие (`/trading/events`).
+    """
+    redis_client = await init_redis()
+    try:
+        backend, prefix = FastAPICache.get_backend(), FastAPICache.get_prefix()
+        version_service = DataVersionService(backend, prefix)
+        previous_version = await version_service.get()
+        await FastAPICache.clear()
+        logger.info("Кэш API очищен")
+        event = None
+        model = SpimexTradingResults
+        async with PrimarySessionLocal() as db:
+            await CatalogService(db, backend, prefix).refresh()
+            last_date = await db.scalar(select(func.max(model.date)))
+            if last_date is not None and (previous_version is None or last_date > previous_version.last_date):
+                rows, instruments = (
+                    await db.execute(
+                        select(func.count(), func.count(distinct(model.exchange_product_id))).where(
+                            model.date == last_date
+                        )
+                    )
+                ).one()
+                event = TradingDayEvent(date=last_date, rows=rows, instruments=instruments)
+        logger.info("Справочники кодов обновлены")
+        if last_date is not None:
+            version = await version_service.update(last_date)
+            logger.info("Версия данных обновлена: %s (%s)", version.last_date, version.updated_at)
+        if event is not None:
+            await TradingEventBroker.publish(redis_client, event)
+            logger.info("Опубликовано событие о новом торговом дне: %s", event.model_dump_json())
+    finally:
+        await redis_client.close()
 
 
 async def main():
     """Главный модуль"""
-    tasks = []
-    semaphore_db = asyncio.Semaphore(MAX_DB_CONCURRENT)
-    connector = TCPConnector(limit=MAX_CONCURRENT_REQUESTS)
-
-    # В цикле проходимся по страницам со ссылка на файлы
-    async with ClientSession(connector=connector) as session:
-        for page in range(FIRST_PAGE, LAST_PAGE + 1):
-            tasks.append(asyncio.create_task(process_page(session, page, semaphore_db)))
-
-        try:
-            await asyncio.gather(*tasks)
-            logger.info("Загрузка завершена")
-        except Exception as e:
-            logger.error(f"Неизвестная ошибка: {e}")
+    stats = await ingest()
+    logger.info("Статистика загрузки: %s", stats.summary())
+    try:
+        await asyncio.to_thread(
+            write_ingestion_metrics, stats, settings.INGESTION_METRICS_FILE, settings.PUSHGATEWAY_URL
+        )
+    except OSError as e:
+        logger.error("Не удалось сохранить метрики загрузки: %s", e)
+    await refresh_derived_data()
 
 
 if __name__ == "__main__":
     start_time = time.perf_counter()
     asyncio.run(main())
     end_time = time.perf_counter()
-    logger.info(f"Время выполнения: {end_time - start_time}")
+    logger.info("Время выполнения: %s", end_time - start_time)
@@ -1,61 +1,83 @@
 import re
 from datetime import date
 
-from bs4 import BeautifulSoup
-from bs4.element import Tag
+from lxml import etree, html
 
 from configs.logging_config import logger
 
+DATE_PATTERN = re.compile(r"(\d{2})\.(\d{2})\.(\d{4})")
+# Выражения компилируются один раз: страница результатов разбирается за один проход lxml,
+# а поиск идет только по элементам аккордеона с бюллетенями
+ITEMS_XPATH = etree.XPath("//div[contains(concat(' ', normalize-space(@class), ' '), ' accordeon-inner__item ')]")
+LINK_XPATH = etree.XPath(
+    ".//a[contains(concat(' ', normalize-space(@class), ' '), ' link ')"
+    " and contains(concat(' ', normalize-space(@class), ' '), ' xls ')]/@href"
+)
+DATE_XPATH = etree.XPath(
+    "string(.//*[contains(concat(' ', normalize-space(@class), ' '), ' accordeon-inner__item-inner__title ')]//span)"
+)
+
 
 class Parser:
-    """Парсер страницы с бюллетенями торгов"""
+    """
+    Парсер страницы с бюллетенями торгов.
+
+    Бюллетени на сайте биржи идут от новых к старым, поэтому первая дата раньше
+    `min_year` означает, что на следующих страницах подходящих бюллетеней нет:
+    в этом случае (как и для страницы без бюллетеней) выставляется
+    `reached_boundary`, и загрузка следующих страниц не нужна.
+    """
 
     def __init__(self, content: str, min_year: int, current_year: int):
-        self.soup = BeautifulSoup(content, "html.parser")
+        self.content = content
         self.min_year = min_year
         self.current_year = current_year
+        self.reached_boundary = False
 
     def extract_file_links(self) -> list[tuple[str, date]]:
         """Извлечение ссылок на файл и дату торгов"""
         file_links = []
-        for item in self.soup.select(".accordeon-inner__item"):
+        try:
+            items = ITEMS_XPATH(html.fromstring(self.content))
+        except etree.ParserError as e:
+            logger.error("Ошибка при разборе страницы: %s", e)
+            items = []
+        if not items:
+            self.reached_boundary = True
+        for item in items:
             try:
-                link = self._get_link_to_file(item)
-                if not link:
+                file_url = self._get_link_to_file(item)
+                if not file_url:
                     continue
                 bidding_date = self._get_bidding_date(item)
                 if not bidding_date:
                     continue
-                if not self._check_year(bidding_date):
-                    logger.info(f"Дата {bidding_date} вне диапазона [{self.min_year}, {self.current_year}].")
-                    break  # Прерываем цикл, если условие не выполняется
-                file_url = link["href"]
-                if file_url:
-                    file_links.append((file_url, bidding_date))
+                if bidding_date.year < self.min_year:
+                    logger.info("Дата %s раньше %s года, дальнейшие страницы не нужны.", bidding_date, self.min_year)
+                    self.reached_boundary = True
+                    break
+                if bidding_date.year > self.current_year:
+                    logger.info("Дата %s позже %s года.", bidding_date, self.current_year)
+                    continue
+                file_links.append((file_url, bidding_date))
             except Exception as e:
-                logger.error(f"Ошибка при обработке элемента: {e}", exc_info=True)
-        logger.info(f"Найдено {len(file_links)} ссылок")
+                logger.error("Ошибка при обработке элемента: %s", e, exc_info=True)
+        logger.info("Найдено %s ссылок", len(file_links))
         return file_links
 
-    def _get_link_to_file(self, tag: Tag) -> str:
+    def _get_link_to_file(self, item: html.HtmlElement) -> str | None:
         """Получение ссылки на файл"""
-        return tag.select_one("a.link.xls")
+        links = LINK_XPATH(item)
+        return links[0] if links else None
 
-    def _get_bidding_date(self, tag: Tag) -> date | None:
+    def _get_bidding_date(self, item: html.HtmlElement) -> date | None:
         """Получение даты торгов"""
+        match = DATE_PATTERN.search(DATE_XPATH(item))
+        if not match:
+            return None
+        day, month, year = match.groups()
         try:
-            date_span = tag.select_one(".accordeon-inner__item-inner__title span")
-            if not date_span:
-                return None
-            date_text = date_span.text.strip()
-            match = re.search(r"(\d{2})\.(\d{2})\.(\d{4})", date_text)
-            if match:
-                day, month, year = match.groups()
             return date(int(year), int(month), int(day))
-        except Exception as e:
-            logger.error(f"Ошибка при разборе даты: {e}", exc_info=True)
+        except ValueError as e:
+            logger.error("Ошибка при разборе даты: %s", e)
             return None
-
-    def _check_year(self, bidding_date: date) -> bool:
-        """Проверка даты торгов на соответствие заданному периоду"""
-        return self.min_year <= bidding_date.year <= self.current_year
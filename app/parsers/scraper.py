@@ -10,10 +10,10 @@ async def fetch_page(session: aiohttp.ClientSession, url: str, params=None) -> s
     try:
         async with session.get(url, params=params) as response:
             response.raise_for_status()
-            logger.info(f"Страница {response.url} загружена")
+            logger.info("Страница %s загружена", response.url)
             return await response.text()
     except aiohttp.ClientResponseError as e:
-        logger.error(f"Ошибка при получении страницы {params['page']}: {e.status}")
+        logger.error("Ошибка при получении страницы %s: %s", params["page"], e.status)
         return None
 
 
@@ -22,8 +22,8 @@ async def fetch_file(session: aiohttp.ClientSession, url: str) -> io.BytesIO | N
     try:
         async with session.get(url, raise_for_status=True) as response:
             response.raise_for_status()
-            logger.info(f"Файл {url} загружен на диск")
+            logger.info("Файл %s загружен на диск", url)
             return io.BytesIO(await response.read())
     except aiohttp.ClientResponseError as e:
-        logger.error(f"Ошибка при скачивание страницы файла: {e}")
+        logger.error("Ошибка при скачивание страницы файла: %s", e)
         return None
@@ -0,0 +1,22 @@
+import datetime as dt
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class SlowQuery(BaseModel):
+    """
+    Модель медленного запроса к БД.
+
+    :param statement: Текст SQL-запроса.
+    :param parameters: Параметры запроса.
+    :param duration_ms: Длительность выполнения в миллисекундах.
+    :param executed_at: Время выполнения.
+    :param plan: План `EXPLAIN (ANALYZE, BUFFERS)`, если он был снят.
+    """
+
+    statement: str
+    parameters: Any
+    duration_ms: float
+    executed_at: dt.datetime
+    plan: str | None = None
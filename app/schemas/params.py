@@ -1,6 +1,9 @@
 from datetime import date
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
+
+from configs.config import settings
+from schemas.tradings import Trading
 
 
 class LimitOffset(BaseModel):
@@ -8,11 +11,11 @@ class LimitOffset(BaseModel):
     Модель для пагинации с параметрами `offset` и `limit`.
 
     :param offset: Смещение для запроса, по умолчанию 0.
-    :param limit: Количество элементов на странице, по умолчанию 10.
+    :param limit: Количество элементов на странице, по умолчанию 10 (не больше `API_MAX_LIMIT`).
     """
 
-    offset: int = 0
-    limit: int = 10
+    offset: int = Field(0, ge=0)
+    limit: int = Field(10, ge=1, le=settings.API_MAX_LIMIT)
 
 
 class TradingParams(BaseModel):
@@ -29,7 +32,37 @@ class TradingParams(BaseModel):
     delivery_basis_id: str | None = Field(None, min_length=3, max_length=3)
 
 
-class DynamicParams(TradingParams):
+class FieldsParams(BaseModel):
+    """
+    Модель выбора возвращаемых полей (проекции).
+
+    Поля можно передавать как повторяющимся параметром (`fields=date&fields=oil_id`),
+    так и через запятую (`fields=date,oil_id`).
+
+    :param fields: Список полей модели `Trading`, которые нужно вернуть (по умолчанию все поля).
+    """
+
+    fields: list[str] | None = None
+
+    @field_validator("fields")
+    @classmethod
+    def validate_fields(cls, value: list[str] | None) -> list[str] | None:
+        """
+        Проверяет, что запрошенные поля есть в модели `Trading`, и приводит их
+        к порядку объявления в модели без повторов.
+        """
+        if value is None:
+            return None
+        requested = {field.strip() for item in value for field in item.split(",") if field.strip()}
+        if not requested:
+            raise ValueError("Необходимо указать хотя бы одно поле")
+        unknown = requested - Trading.model_fields.keys()
+        if unknown:
+            raise ValueError(f"Неизвестные поля: {', '.join(sorted(unknown))}")
+        return [field for field in Trading.model_fields if field in requested]
+
+
+class DynamicParams(TradingParams, FieldsParams):
     """
     Расширенная модель фильтрации с дополнительными параметрами дат.
 
@@ -41,10 +74,31 @@ class DynamicParams(TradingParams):
     end_date: date | None = None
 
 
-class LastParams(TradingParams, LimitOffset):
+class LastParams(TradingParams, LimitOffset, FieldsParams):
     """
     Модель для получения последних записей с фильтрацией по торговым параметрам
     и поддержкой пагинации.
     """
 
     pass
+
+
+class BatchQueryParams(DynamicParams, LimitOffset):
+    """
+    Параметры одного запроса в пакете.
+
+    Объединяет параметры `DynamicParams` и `LastParams`, поэтому в пакете можно
+    передавать запросы обоих эндпоинтов.
+    """
+
+    pass
+
+
+class BatchParams(BaseModel):
+    """
+    Модель пакета запросов фильтрации торгов.
+
+    :param queries: Список запросов (не более `BATCH_MAX_QUERIES`).
+    """
+
+    queries: list[BatchQueryParams] = Field(min_length=1, max_length=settings.BATCH_MAX_QUERIES)
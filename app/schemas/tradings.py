@@ -1,3 +1,4 @@
+import datetime as dt
 from datetime import date
 from decimal import Decimal
 
@@ -42,3 +43,68 @@ class Trading(BaseModel):
     total: Decimal
     count: int
     date: date
+
+
+class PartialTrading(BaseModel):
+    """
+    Модель торговых данных с выбранным набором полей (проекция).
+
+    Содержит те же поля, что и `Trading`, но каждое из них необязательно:
+    в ответ попадают только поля, запрошенные параметром `fields`.
+    """
+
+    id: int | None = None
+    exchange_product_id: str | None = None
+    exchange_product_name: str | None = None
+    oil_id: str | None = None
+    delivery_basis_id: str | None = None
+    delivery_basis_name: str | None = None
+    delivery_type_id: str | None = None
+    volume: int | None = None
+    total: Decimal | None = None
+    count: int | None = None
+    date: dt.date | None = None
+
+
+class CatalogItem(BaseModel):
+    """
+    Модель элемента справочника кодов (нефтепродуктов, базисов или типов поставки).
+
+    :param code: Код (oil_id, delivery_basis_id или delivery_type_id).
+    :param name: Название, если оно есть в данных биржи (только для базисов поставки).
+    :param first_date: Дата первых торгов с этим кодом.
+    :param last_date: Дата последних торгов с этим кодом.
+    :param count: Количество записей о торгах с этим кодом.
+    """
+
+    code: str
+    name: str | None = None
+    first_date: dt.date
+    last_date: dt.date
+    count: int
+
+
+class DataVersion(BaseModel):
+    """
+    Модель версии данных, которая меняется после каждой загрузки бюллетеней.
+
+    :param last_date: Дата последнего загруженного бюллетеня.
+    :param updated_at: Время загрузки (UTC).
+    """
+
+    last_date: dt.date
+    updated_at: dt.datetime
+
+
+class TradingDayEvent(BaseModel):
+    """
+    Событие о загрузке бюллетеня за новый торговый день (поток `/trading/events`).
+
+    :param date: Дата торгов.
+    :param rows: Количество записей о торгах за эту дату.
+    :param instruments: Количество биржевых инструментов за эту дату.
+    """
+
+    date: dt.date
+    rows: int
+    instruments: int
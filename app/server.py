@@ -0,0 +1,53 @@
+"""
+Запуск API в production-режиме.
+
+Поднимает несколько процессов uvicorn (`WEB_WORKERS`, по умолчанию по числу
+ядер) с циклом событий uvloop и HTTP-парсером httptools. Каждый процесс
+получает свою долю соединений с БД из `DB_CONNECTION_BUDGET`, а метрики
+Prometheus собираются из всех процессов через `PROMETHEUS_MULTIPROC_DIR`.
+
+Запуск:
+
+    python server.py
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+import uvicorn
+
+from configs.config import settings
+
+
+def prepare_multiprocess_metrics() -> None:
+    """Создает (или очищает от прошлого запуска) каталог метрик процессов."""
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory is None:
+        directory = os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-")
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    for file in path.glob("*.db"):
+        file.unlink()
+
+
+def main() -> None:
+    workers = settings.get_web_workers()
+    # Процессы читают переменные окружения при запуске: число процессов нужно
+    # для деления DB_CONNECTION_BUDGET, каталог - для общих метрик
+    os.environ["WEB_WORKERS"] = str(workers)
+    if workers > 1:
+        prepare_multiprocess_metrics()
+    uvicorn.run(
+        "main:app",
+        host=settings.WEB_HOST,
+        port=settings.WEB_PORT,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import asyncio
+from types import TracebackType
+
+from configs.config import settings
+from configs.logging_config import logger
+from exceptions import Overloaded
+from utils.metrics import ADMISSION_QUEUED, ADMISSION_REJECTED
+
+
+class AdmissionLimiter:
+    """
+    Контроль допуска запросов к БД для класса маршрутов.
+
+    Одновременно выполняется не больше `concurrency` запросов, остальные ждут
+    в очереди не больше `queue_size` запросов и не дольше `queue_timeout` секунд.
+    Запрос сверх очереди или не дождавшийся места отклоняется сразу (`Overloaded`,
+    ответ 503 с Retry-After): при перегрузке запросы не копятся в ожидании
+    соединения пула, и задержка обслуженных запросов остается предсказуемой.
+
+    Используется как асинхронный контекстный менеджер вокруг обращения к БД
+    (место освобождается после возврата соединения в пул), поэтому ответы
+    из кэша и снимка в памяти его не занимают.
+    """
+
+    def __init__(
+        self,
+        route_class: str,
+        concurrency: int,
+        queue_size: int = settings.ADMISSION_QUEUE_SIZE,
+        queue_timeout: float = settings.ADMISSION_QUEUE_TIMEOUT,
+        retry_after: int = settings.ADMISSION_RETRY_AFTER,
+    ):
+        """
+        :param route_class: Класс маршрутов (метка в метриках и логах).
+        :param concurrency: Максимальное число одновременных запросов к БД.
+        :param queue_size: Максимальное число ожидающих запросов.
+        :param queue_timeout: Максимальное время ожидания в очереди, секунды.
+        :param retry_after: Значение заголовка Retry-After отклоненных запросов, секунды.
+        """
+        self.route_class = route_class
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.waiting = 0
+
+    async def __aenter__(self) -> "AdmissionLimiter":
+        if not self.semaphore.locked():
+            # Свободное место занимается без переключения задач
+            await self.semaphore.acquire()
+            return self
+        if self.waiting >= self.queue_size:
+            raise self._reject("queue_full")
+        self.waiting += 1
+        ADMISSION_QUEUED.labels(self.route_class).inc()
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await self.semaphore.acquire()
+        except TimeoutError:
+            raise self._reject("timeout") from None
+        finally:
+            self.waiting -= 1
+            ADMISSION_QUEUED.labels(self.route_class).dec()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.semaphore.release()
+
+    def _reject(self, reason: str) -> Overloaded:
+        """Учитывает отклоненный запрос и возвращает исключение для него."""
+        ADMISSION_REJECTED.labels(self.route_class, reason).inc()
+        logger.info("Запрос к БД (%s) отклонен контролем допуска: %s", self.route_class, reason)
+        return Overloaded(self.route_class, self.retry_after)
+
+
+# Ограничения процесса по классам маршрутов торгов, общие для всех запросов
+admission_limiters = {
+    route_class: AdmissionLimiter(route_class, concurrency)
+    for route_class, concurrency in settings.get_admission_limits().items()
+}
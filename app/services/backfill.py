@@ -0,0 +1,50 @@
+from datetime import date
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import BackfillCheckpoint, SpimexTradingResults
+
+
+class BackfillService:
+    """
+    Сервис контрольных точек исторической загрузки.
+
+    Дата бюллетеня отмечается загруженной в той же транзакции, что и его строки,
+    поэтому прерванная загрузка при повторном запуске продолжается с
+    незагруженных бюллетеней без дублирования данных. Бюллетени, загруженные
+    без контрольных точек (ежедневной загрузкой), определяются по строкам торгов.
+    """
+
+    def __init__(self, session: AsyncSession):
+        """
+        Инициализирует сервис с переданной сессией.
+
+        :param session: Асинхронная сессия SQLAlchemy.
+        """
+        self.session = session
+
+    async def loaded_dates(self, start_date: date, end_date: date) -> set[date]:
+        """
+        Возвращает даты уже загруженных бюллетеней: из контрольных точек
+        и из таблицы торгов (по индексу на дате).
+
+        :param start_date: Начальная дата диапазона.
+        :param end_date: Конечная дата диапазона.
+        :return: Множество дат.
+        """
+        stmt = select(BackfillCheckpoint.date).where(BackfillCheckpoint.date.between(start_date, end_date))
+        stmt = stmt.union(
+            select(SpimexTradingResults.date).where(SpimexTradingResults.date.between(start_date, end_date))
+        )
+        result = await self.session.scalars(stmt)
+        return set(result.all())
+
+    async def mark_loaded(self, bidding_date: date, rows: int) -> None:
+        """
+        Отмечает бюллетень загруженным (в текущей транзакции).
+
+        :param bidding_date: Дата торгов.
+        :param rows: Количество загруженных строк.
+        """
+        await self.session.execute(insert(BackfillCheckpoint).values(date=bidding_date, rows=rows))
@@ -0,0 +1,181 @@
+import asyncio
+import time
+from contextlib import suppress
+from datetime import date
+from types import TracebackType
+
+from services.backfill import BackfillService
+from services.references import reference_cache
+from services.tradings import TradingService
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from configs.config import settings
+from configs.logging_config import logger
+from database.models import DeliveryBasis, ExchangeProduct
+from utils.ingestion_stats import IngestionStats
+
+Bulletin = tuple[date, list[dict]]
+# Первый ключ рекомендательных блокировок дат бюллетеней (второй - порядковый номер даты)
+DATE_LOCK_KEY = func.hashtext("spimex_trading_results")
+
+
+class BulletinWriter:
+    """
+    Пакетная запись бюллетеней в БД.
+
+    Разобранные бюллетени копятся в пакет, который записывается одной
+    транзакцией с явным commit, когда в нем набирается `batch_size`
+    бюллетеней или самый старый из них ждет дольше `flush_interval` секунд.
+    Каждый бюллетень пишется в своей точке сохранения (SAVEPOINT): ошибка
+    в одном файле откатывает только его, остальные бюллетени пакета сохраняются.
+
+    Используется как асинхронный контекстный менеджер: при выходе
+    записываются оставшиеся бюллетени.
+
+    С `checkpoint=True` дата каждого бюллетеня отмечается в контрольных
+    точках исторической загрузки в той же точке сохранения (см. `BackfillService`).
+
+    С `replace=True` строки за дату бюллетеня удаляются перед вставкой в той же
+    точке сохранения, поэтому повторная запись бюллетеня не дублирует данные.
+    Даты пакета блокируются до конца транзакции (`pg_advisory_xact_lock`):
+    пакеты с общей датой записываются по очереди, и второй удаляет строки первого.
+    Снимок торгов в памяти перечитывает перезаписанные даты целиком (см. `TradingSnapshot`).
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        stats: IngestionStats,
+        batch_size: int = settings.PARSER_BATCH_SIZE,
+        flush_interval: float = settings.PARSER_FLUSH_INTERVAL,
+        max_concurrent: int = settings.PARSER_MAX_DB_CONCURRENT,
+        checkpoint: bool = False,
+        replace: bool = False,
+    ):
+        """
+        :param session_factory: Фабрика сессий БД.
+        :param stats: Статистика загрузки (файлы, строки и ошибки записи).
+        :param batch_size: Количество бюллетеней в одной транзакции.
+        :param flush_interval: Максимальное время ожидания неполного пакета в секундах.
+        :param max_concurrent: Максимальное число одновременно записываемых пакетов.
+        :param checkpoint: Отмечать загруженные бюллетени в контрольных точках.
+        :param replace: Заменять строки за дату бюллетеня, а не добавлять к ним.
+        """
+        self.session_factory = session_factory
+        self.stats = stats
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = flush_interval
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.checkpoint = checkpoint
+        self.replace = replace
+        self.pending: list[Bulletin] = []
+        self.pending_since = 0.0
+        self.flushes: set[asyncio.Task] = set()
+        self.timer: asyncio.Task | None = None
+
+    async def __aenter__(self) -> "BulletinWriter":
+        self.timer = asyncio.create_task(self._flush_periodically())
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.timer.cancel()
+        # Таймер дожидается отмены: иначе задача переживет писателя и будет уничтожена незавершенной
+        with suppress(asyncio.CancelledError):
+            await self.timer
+        await self.flush()
+        await asyncio.gather(*self.flushes)
+
+    async def add(self, bidding_date: date, data: list[dict]) -> None:
+        """
+        Добавляет бюллетень в пакет.
+
+        Заполненный пакет записывается сразу, и вызывающий ждет окончания
+        записи: так скачивание файлов не обгоняет запись в БД.
+
+        :param bidding_date: Дата торгов.
+        :param data: Строки бюллетеня для `TradingService.mass_create_trading`.
+        """
+        if not self.pending:
+            self.pending_since = time.monotonic()
+        self.pending.append((bidding_date, data))
+        if len(self.pending) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Записывает накопленные бюллетени."""
+        batch, self.pending = self.pending, []
+        if batch:
+            await self.write(batch)
+
+    async def write(self, batch: list[Bulletin]) -> list[Bulletin]:
+        """
+        Записывает пакет бюллетеней одной транзакцией (без накопления).
+
+        :param batch: Бюллетени: даты торгов и строки.
+        :return: Записанные бюллетени (без откатившихся точек сохранения).
+        """
+        with self.stats.stage("db_wait"):
+            await self.semaphore.acquire()
+        try:
+            with self.stats.stage("db"):
+                return await self._write(batch)
+        finally:
+            self.semaphore.release()
+
+    async def _write(self, batch: list[Bulletin]) -> list[Bulletin]:
+        """Записывает пакет одной транзакцией, каждый бюллетень - в своей точке сохранения."""
+        written, failed = [], 0
+        try:
+            async with self.session_factory() as db:
+                # Справочники пополняются на отдельном соединении: заполняем их до начала
+                # транзакции, иначе пакет держал бы два соединения пула одновременно
+                rows = [row for _, data in batch for row in data]
+                await reference_cache.resolve(db, ExchangeProduct, {row["exchange_product_name"] for row in rows})
+                await reference_cache.resolve(db, DeliveryBasis, {row["delivery_basis_name"] for row in rows})
+                service = TradingService(db)
+                backfill_service = BackfillService(db)
+                if self.replace:
+                    # Даты блокируются по возрастанию, чтобы пакеты с общими датами не взаимоблокировались
+                    for bidding_date in sorted({day for day, _ in batch}):
+                        await db.execute(select(func.pg_advisory_xact_lock(DATE_LOCK_KEY, bidding_date.toordinal())))
+                for bulletin in batch:
+                    bidding_date, data = bulletin
+                    try:
+                        async with db.begin_nested():
+                            if self.replace:
+                                await service.delete_by_date(bidding_date)
+                            await service.mass_create_trading(data)
+                            if self.checkpoint:
+                                await backfill_service.mark_loaded(bidding_date, len(data))
+                    except SQLAlchemyError as e:
+                        failed += 1
+                        logger.error("Ошибка при сохранении торгов %s в БД: %s", bidding_date, e, exc_info=True)
+                    else:
+                        written.append(bulletin)
+                await db.commit()
+        except Exception as e:
+            self.stats.errors += len(batch)
+            logger.error("Ошибка при сохранении пакета из %s бюллетеней в БД: %s", len(batch), e, exc_info=True)
+            return []
+        self.stats.errors += failed
+        self.stats.files += len(written)
+        self.stats.rows += sum(len(data) for _, data in written)
+        if written:
+            logger.info("Данные загружены в БД с торгами %s", ", ".join(str(day) for day, _ in written))
+        return written
+
+    async def _flush_periodically(self) -> None:
+        """Записывает неполный пакет, если он ждет дольше `flush_interval`."""
+        while True:
+            await asyncio.sleep(self.flush_interval / 2)
+            if self.pending and time.monotonic() - self.pending_since >= self.flush_interval:
+                task = asyncio.create_task(self.flush())
+                self.flushes.add(task)
+                task.add_done_callback(self.flushes.discard)
@@ -0,0 +1,78 @@
+from fastapi_cache.types import Backend
+from pydantic import TypeAdapter
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import DeliveryBasis, SpimexTradingResults
+from schemas.tradings import CatalogItem
+
+
+class CatalogService:
+    """
+    Сервис справочников кодов: нефтепродуктов, базисов и типов поставки.
+
+    Справочники рассчитываются один раз после загрузки бюллетеней и хранятся
+    в бэкенде кэша без срока жизни в виде готового JSON.
+    """
+
+    model = SpimexTradingResults
+    # Название справочника -> (колонка с кодом, колонка с названием)
+    catalogs = {
+        "oils": (SpimexTradingResults.oil_id, None),
+        "bases": (SpimexTradingResults.delivery_basis_id, DeliveryBasis.name),
+        "delivery_types": (SpimexTradingResults.delivery_type_id, None),
+    }
+    adapter = TypeAdapter(list[CatalogItem])
+
+    def __init__(self, session: AsyncSession, backend: Backend, prefix: str):
+        """
+        Инициализирует сервис.
+
+        :param session: Асинхронная сессия SQLAlchemy (используется только при расчете справочников).
+        :param backend: Бэкенд кэша fastapi_cache.
+        :param prefix: Префикс ключей кэша.
+        """
+        self.session = session
+        self.backend = backend
+        self.prefix = prefix
+
+    async def get(self, catalog: str) -> bytes:
+        """
+        Возвращает справочник в виде JSON.
+
+        Если справочника нет в кэше, он рассчитывается и сохраняется.
+
+        :param catalog: Название справочника (ключ `catalogs`).
+        :return: JSON-представление списка `CatalogItem`.
+        """
+        payload = await self.backend.get(self._key(catalog))
+        if payload is None:
+            payload = await self._build(catalog)
+            await self.backend.set(self._key(catalog), payload)
+        return payload.encode() if isinstance(payload, str) else payload
+
+    async def refresh(self) -> None:
+        """Пересчитывает все справочники и обновляет их в кэше."""
+        for catalog in self.catalogs:
+            await self.backend.set(self._key(catalog), await self._build(catalog))
+
+    async def _build(self, catalog: str) -> bytes:
+        """Рассчитывает справочник одним агрегирующим запросом."""
+        code, name = self.catalogs[catalog]
+        stmt = select(
+            code.label("code"),
+            func.min(self.model.date).label("first_date"),
+            func.max(self.model.date).label("last_date"),
+            func.count().label("count"),
+        )
+        if name is not None:
+            stmt = stmt.add_columns(func.max(name).label("name")).join(
+                DeliveryBasis, DeliveryBasis.id == self.model.delivery_basis_name_id
+            )
+        stmt = stmt.group_by(code).order_by(code)
+        results = await self.session.execute(stmt)
+        return self.adapter.dump_json(self.adapter.validate_python(results.mappings().all()))
+
+    def _key(self, catalog: str) -> str:
+        """Ключ справочника в кэше."""
+        return f"{self.prefix}:catalog:{catalog}"
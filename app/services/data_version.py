@@ -0,0 +1,46 @@
+from datetime import date, datetime, timezone
+
+from fastapi_cache.types import Backend
+
+from schemas.tradings import DataVersion
+
+
+class DataVersionService:
+    """
+    Сервис версии данных.
+
+    Версия обновляется после загрузки бюллетеней и используется для условных
+    HTTP-ответов (ETag/Last-Modified) без обращения к базе данных.
+    """
+
+    def __init__(self, backend: Backend, prefix: str):
+        """
+        Инициализирует сервис.
+
+        :param backend: Бэкенд кэша fastapi_cache.
+        :param prefix: Префикс ключей кэша.
+        """
+        self.backend = backend
+        self.key = f"{prefix}:data_version"
+
+    async def get(self) -> DataVersion | None:
+        """
+        Возвращает текущую версию данных.
+
+        :return: Версия данных или None, если данные еще не загружались.
+        """
+        payload = await self.backend.get(self.key)
+        if payload is None:
+            return None
+        return DataVersion.model_validate_json(payload)
+
+    async def update(self, last_date: date) -> DataVersion:
+        """
+        Сохраняет новую версию данных.
+
+        :param last_date: Дата последнего загруженного бюллетеня.
+        :return: Новая версия данных.
+        """
+        version = DataVersion(last_date=last_date, updated_at=datetime.now(timezone.utc).replace(microsecond=0))
+        await self.backend.set(self.key, version.model_dump_json().encode())
+        return version
@@ -0,0 +1,140 @@
+import asyncio
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager, suppress
+
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+from configs.config import settings
+from configs.logging_config import logger
+from schemas.tradings import TradingDayEvent
+from utils.metrics import EVENT_SUBSCRIBERS, EVENTS_DROPPED
+
+RECONNECT_DELAY = 1.0
+
+
+class TradingEventBroker:
+    """
+    Рассылка событий о новых торговых днях подключенным клиентам.
+
+    Загрузка бюллетеней публикует событие в канал Redis (`publish`), каждый
+    процесс API держит одну подписку на канал и раздает события локальным
+    подключениям. У каждого подключения свой буфер на `buffer_size` событий:
+    если клиент не успевает читать, старые события отбрасываются, и в буфере
+    остаются последние.
+    """
+
+    def __init__(self, channel: str = settings.EVENTS_CHANNEL, buffer_size: int = settings.EVENTS_BUFFER_SIZE):
+        """
+        :param channel: Канал Redis.
+        :param buffer_size: Размер буфера событий одного подключения.
+        """
+        self.channel = channel
+        self.buffer_size = buffer_size
+        self.subscribers: set[asyncio.Queue[str]] = set()
+        self.listeners: set[asyncio.Event] = set()
+        self.task: asyncio.Task | None = None
+
+    async def start(self, redis: aioredis.Redis) -> None:
+        """
+        Подписывается на канал событий.
+
+        :param redis: Клиент Redis (для подписки берется отдельное соединение).
+        """
+        self.task = asyncio.create_task(self._listen(redis))
+
+    async def stop(self) -> None:
+        """Отменяет подписку на канал событий."""
+        if self.task is not None:
+            self.task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+
+    @staticmethod
+    async def publish(redis: aioredis.Redis, event: TradingDayEvent, channel: str = settings.EVENTS_CHANNEL) -> int:
+        """
+        Публикует событие для всех процессов API.
+
+        :param redis: Клиент Redis.
+        :param event: Событие.
+        :param channel: Канал Redis.
+        :return: Количество процессов, получивших событие.
+        """
+        return await redis.publish(channel, event.model_dump_json())
+
+    def broadcast(self, payload: str) -> None:
+        """
+        Раздает событие локальным подключениям.
+
+        :param payload: Событие в JSON.
+        """
+        for listener in self.listeners:
+            listener.set()
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+                EVENTS_DROPPED.inc()
+            queue.put_nowait(payload)
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[asyncio.Queue[str]]:
+        """Регистрирует подключение и возвращает его буфер событий."""
+        queue: asyncio.Queue[str] = asyncio.Queue(maxsize=self.buffer_size)
+        self.subscribers.add(queue)
+        EVENT_SUBSCRIBERS.inc()
+        try:
+            yield queue
+        finally:
+            self.subscribers.discard(queue)
+            EVENT_SUBSCRIBERS.dec()
+
+    @contextmanager
+    def notifications(self) -> Iterator[asyncio.Event]:
+        """
+        Регистрирует флаг, который устанавливается при каждом событии.
+
+        Для внутренних потребителей, которым нужен сам факт события, а не его
+        содержимое (например, снимок торгов): в отличие от `subscribe`, не
+        учитывается в подключениях к потоку событий.
+        """
+        listener = asyncio.Event()
+        self.listeners.add(listener)
+        try:
+            yield listener
+        finally:
+            self.listeners.discard(listener)
+
+    async def stream(self, heartbeat: float = settings.EVENTS_HEARTBEAT_INTERVAL) -> AsyncIterator[str]:
+        """
+        Поток событий в формате Server-Sent Events.
+
+        Пока событий нет, каждые `heartbeat` секунд отправляется комментарий:
+        так прокси не закрывают соединение по простою, а разрыв замечается.
+
+        :param heartbeat: Период пустых сообщений в секундах.
+        """
+        async with self.subscribe() as queue:
+            yield f"retry: {int(heartbeat * 1000)}\n\n"
+            while True:
+                try:
+                    payload = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except TimeoutError:
+                    yield ": ping\n\n"
+                else:
+                    yield f"event: trading_day\ndata: {payload}\n\n"
+
+    async def _listen(self, redis: aioredis.Redis) -> None:
+        """Читает события из канала Redis, переподключаясь при ошибках."""
+        while True:
+            try:
+                async with redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        self.broadcast(message["data"].decode())
+            except RedisError as e:
+                logger.error("Подписка на события прервана: %s", e)
+                await asyncio.sleep(RECONNECT_DELAY)
+
+
+trading_events = TradingEventBroker()
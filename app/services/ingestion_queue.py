@@ -0,0 +1,170 @@
+from dataclasses import dataclass, replace
+from datetime import date
+
+import redis.asyncio as aioredis
+from redis.exceptions import ResponseError
+
+from configs.config import settings
+from configs.logging_config import logger
+
+
+@dataclass(frozen=True)
+class IngestionJob:
+    """Задание на загрузку бюллетеня."""
+
+    message_id: str
+    url: str
+    bidding_date: date
+    attempts: int = 0
+
+
+class IngestionQueue:
+    """
+    Очередь заданий загрузки бюллетеней на Redis Streams.
+
+    Координатор добавляет задания в поток, обработчики читают их через группу
+    потребителей: каждое задание получает один обработчик, и оно остается
+    в списке ожидающих подтверждения, пока обработчик не вызовет `ack`.
+    Задания упавшего обработчика передаются другим после `claim_idle_ms`
+    простоя, каждая незавершенная выдача считается попыткой. Неудачное задание
+    возвращается в поток с увеличенным счетчиком попыток, после `max_retries`
+    попыток - переносится в поток недоставленных.
+    """
+
+    def __init__(
+        self,
+        redis: aioredis.Redis,
+        stream: str = settings.INGESTION_STREAM,
+        group: str = settings.INGESTION_GROUP,
+        dead_letter_stream: str = settings.INGESTION_DEAD_LETTER_STREAM,
+        max_retries: int = settings.INGESTION_MAX_RETRIES,
+        claim_idle_ms: int = settings.INGESTION_CLAIM_IDLE_MS,
+    ):
+        """
+        :param redis: Клиент Redis.
+        :param stream: Поток заданий.
+        :param group: Группа потребителей.
+        :param dead_letter_stream: Поток недоставленных заданий.
+        :param max_retries: Количество попыток обработки задания.
+        :param claim_idle_ms: Простой задания (мс), после которого его может забрать другой обработчик.
+        """
+        self.redis = redis
+        self.stream = stream
+        self.group = group
+        self.dead_letter_stream = dead_letter_stream
+        self.max_retries = max_retries
+        self.claim_idle_ms = claim_idle_ms
+
+    async def create_group(self) -> None:
+        """Создает поток и группу потребителей, если их еще нет."""
+        try:
+            await self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def publish(self, url: str, bidding_date: date, attempts: int = 0) -> str:
+        """
+        Добавляет задание в поток.
+
+        :param url: Ссылка на файл бюллетеня.
+        :param bidding_date: Дата торгов.
+        :param attempts: Количество уже выполненных попыток.
+        :return: Идентификатор сообщения.
+        """
+        message_id = await self.redis.xadd(
+            self.stream, {"url": url, "date": bidding_date.isoformat(), "attempts": attempts}
+        )
+        return message_id.decode()
+
+    async def read(self, consumer: str, count: int, block_ms: int) -> list[IngestionJob]:
+        """
+        Получает задания для обработчика.
+
+        Сначала забираются задания, зависшие у других обработчиков, затем
+        читаются новые (с ожиданием до `block_ms` мс).
+
+        :param consumer: Имя обработчика в группе.
+        :param count: Максимальное количество заданий.
+        :param block_ms: Время ожидания новых заданий, мс.
+        :return: Задания.
+        """
+        _, claimed, *_ = await self.redis.xautoclaim(
+            self.stream, self.group, consumer, self.claim_idle_ms, start_id="0-0", count=count
+        )
+        jobs = await self._reclaimed([self._job(message_id, fields) for message_id, fields in claimed if fields])
+        if not jobs:
+            response = await self.redis.xreadgroup(self.group, consumer, {self.stream: ">"}, count=count, block=block_ms)
+            jobs = [self._job(*message) for _, stream_messages in response for message in stream_messages]
+        return jobs
+
+    async def _reclaimed(self, jobs: list[IngestionJob]) -> list[IngestionJob]:
+        """
+        Учитывает попытки заданий, забранных у других обработчиков.
+
+        Прошлые выдачи задания, не завершенные ни `ack`, ни `fail`, считаются
+        неудачными попытками (число выдач ведет сам Redis). Иначе задание, на котором
+        падает обработчик, передавалось бы по кругу бесконечно: после `max_retries`
+        попыток оно переносится в поток недоставленных.
+
+        :param jobs: Забранные задания.
+        :return: Задания, у которых еще остались попытки.
+        """
+        if not jobs:
+            return []
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for job in jobs:
+                pipe.xpending_range(self.stream, self.group, min=job.message_id, max=job.message_id, count=1)
+            pending = await pipe.execute()
+        alive = []
+        for job, entries in zip(jobs, pending):
+            deliveries = entries[0]["times_delivered"] if entries else 1
+            job = replace(job, attempts=job.attempts + deliveries - 1)
+            if job.attempts < self.max_retries:
+                alive.append(job)
+                continue
+            error = "Обработчик не завершил задание"
+            await self._requeue(job, job.attempts, error)
+            logger.error("Задание %s (%s) перенесено в поток недоставленных: %s", job.url, job.bidding_date, error)
+        return alive
+
+    async def ack(self, job: IngestionJob) -> None:
+        """Подтверждает обработку задания."""
+        await self.redis.xack(self.stream, self.group, job.message_id)
+
+    async def fail(self, job: IngestionJob, error: str) -> bool:
+        """
+        Возвращает неудачное задание в поток или переносит его в поток недоставленных.
+
+        :param job: Задание.
+        :param error: Описание ошибки.
+        :return: True, если задание перенесено в поток недоставленных.
+        """
+        return await self._requeue(job, job.attempts + 1, error)
+
+    async def _requeue(self, job: IngestionJob, attempts: int, error: str) -> bool:
+        """Подтверждает задание, добавляя его в поток заново или в поток недоставленных."""
+        dead = attempts >= self.max_retries
+        fields = {"url": job.url, "date": job.bidding_date.isoformat(), "attempts": attempts}
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if dead:
+                pipe.xadd(self.dead_letter_stream, fields | {"error": error})
+            else:
+                pipe.xadd(self.stream, fields)
+            pipe.xack(self.stream, self.group, job.message_id)
+            await pipe.execute()
+        return dead
+
+    async def pending(self) -> int:
+        """Количество заданий, выданных обработчикам и не подтвержденных."""
+        info = await self.redis.xpending(self.stream, self.group)
+        return info["pending"]
+
+    @staticmethod
+    def _job(message_id: bytes, fields: dict[bytes, bytes]) -> IngestionJob:
+        return IngestionJob(
+            message_id=message_id.decode(),
+            url=fields[b"url"].decode(),
+            bidding_date=date.fromisoformat(fields[b"date"].decode()),
+            attempts=int(fields.get(b"attempts", 0)),
+        )
@@ -0,0 +1,56 @@
+from collections.abc import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from database.models import DeliveryBasis, ExchangeProduct
+
+ReferenceModel = type[ExchangeProduct] | type[DeliveryBasis]
+
+
+class ReferenceCache:
+    """
+    Процессный кэш справочников для словарного кодирования названий.
+
+    Хранит соответствие «название -> идентификатор» для каждого справочника.
+    Справочники только пополняются, поэтому записи кэша не устаревают.
+    """
+
+    def __init__(self):
+        self._ids: dict[ReferenceModel, dict[str, int]] = {}
+
+    def clear(self) -> None:
+        """Очищает кэш (например, после пересоздания таблиц)."""
+        self._ids.clear()
+
+    async def resolve(self, session: AsyncSession, model: ReferenceModel, names: Iterable[str]) -> dict[str, int]:
+        """
+        Возвращает идентификаторы названий из справочника `model`.
+
+        Названия, которых нет в кэше, добавляются в справочник в отдельной
+        транзакции: так идентификаторы в кэше остаются действительными, даже если
+        транзакция с торгами будет отменена.
+
+        :param session: Асинхронная сессия SQLAlchemy (используется ее движок для записи).
+        :param model: Модель справочника.
+        :param names: Названия, для которых нужны идентификаторы.
+        :return: Словарь «название -> идентификатор» (содержит как минимум запрошенные названия).
+        """
+        ids = self._ids.setdefault(model, {})
+        missing = {name for name in names if name not in ids}
+        if missing:
+            # Движок для записи: при маршрутизации чтения на реплику это основной сервер
+            bind = AsyncEngine(session.get_bind(clause=insert(model)))
+            async with bind.begin() as conn:
+                await conn.execute(
+                    insert(model).values([{"name": name} for name in missing]).on_conflict_do_nothing(
+                        index_elements=[model.name]
+                    )
+                )
+                rows = await conn.execute(select(model.name, model.id).where(model.name.in_(missing)))
+                ids.update(rows.tuples().all())
+        return ids
+
+
+reference_cache = ReferenceCache()
@@ -0,0 +1,399 @@
+import asyncio
+import time
+from contextlib import nullcontext, suppress
+from dataclasses import dataclass, replace
+from datetime import date
+from decimal import Decimal
+from typing import Any
+
+import numpy as np
+from services.data_version import DataVersionService
+from services.events import TradingEventBroker
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from configs.logging_config import logger
+from database.models import DeliveryBasis, ExchangeProduct, SpimexTradingResults
+from schemas.tradings import DataVersion
+
+# Колонки с кодами, которые кодируются словарем (значение -> номер)
+CODE_COLUMNS = ("exchange_product_id", "oil_id", "delivery_basis_id", "delivery_type_id")
+# Колонки названий: номер - идентификатор записи справочника
+NAME_COLUMNS = {"exchange_product_name": ExchangeProduct, "delivery_basis_name": DeliveryBasis}
+NUMBER_COLUMNS = ("id", "volume", "count")
+FILTER_COLUMNS = ("oil_id", "delivery_type_id", "delivery_basis_id")
+LOAD_BATCH_SIZE = 50_000
+# Начальный размер части списка при пересечении (удваивается, пока не набрано offset + limit строк)
+INTERSECT_CHUNK_SIZE = 1024
+
+
+@dataclass(frozen=True)
+class SnapshotColumns:
+    """
+    Неизменяемый набор колонок снимка.
+
+    Строки отсортированы по `(date desc, id desc)` - в том же порядке, что
+    возвращает SQL-запрос `TradingService.filter`. Даты хранятся как
+    отрицательные порядковые номера, чтобы массив шел по возрастанию и
+    диапазон дат находился двоичным поиском.
+
+    Для колонок фильтров построены списки вхождений: для каждого кода -
+    отсортированный массив номеров строк с этим кодом (номер кода - индекс
+    в списке). Порядок номеров строк совпадает с порядком дат.
+
+    `date_stats` - признаки загруженных строк по датам (порядковый номер даты ->
+    количество строк и максимальный `id`), по ним находятся измененные даты.
+    """
+
+    size: int
+    neg_dates: np.ndarray
+    numbers: dict[str, np.ndarray]
+    total_cents: np.ndarray
+    codes: dict[str, np.ndarray]
+    dictionaries: dict[str, list[str]]
+    lookup: dict[str, dict[str, int]]
+    names: dict[str, dict[int, str]]
+    postings: dict[str, list[np.ndarray]]
+    dates: np.ndarray
+    date_stats: dict[int, tuple[int, int]]
+
+
+class TradingSnapshot:
+    """
+    Колоночный снимок таблицы торгов в памяти процесса.
+
+    Отвечает на запросы `TradingService.filter` и `TradingService.get_last_dates`
+    без обращения к БД: диапазон дат - двоичный поиск по отсортированной колонке,
+    фильтры по кодам - пересечение списков вхождений кодов, обрезанных по диапазону дат.
+    Результаты совпадают с SQL-запросами (те же значения, типы и порядок строк).
+
+    После каждой загрузки бюллетеней (смены версии данных) снимок сравнивает
+    с БД количество строк и максимальный `id` по каждой дате и перечитывает
+    только изменившиеся даты. Так в снимок попадают и строки, зафиксированные
+    позже строк с большим `id` (последовательность выдает номера до commit),
+    и даты, перезаписанные загрузкой с заменой (`BulletinWriter(replace=True)`).
+    Новые колонки строятся в отдельном потоке, не останавливая цикл событий,
+    и заменяют прежние одним присваиванием: читающие запросы всегда видят
+    целостный снимок.
+    """
+
+    def __init__(self):
+        self.columns: SnapshotColumns | None = None
+        self.version: DataVersion | None = None
+        # Загрузки выполняются по очереди: каждая достраивает снимок, полученный предыдущей
+        self._load_lock = asyncio.Lock()
+
+    @property
+    def ready(self) -> bool:
+        """Загружен ли снимок."""
+        return self.columns is not None
+
+    async def load(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        """
+        Загружает новые строки таблицы торгов и справочники названий.
+
+        При первом вызове загружается вся таблица, при последующих - строки
+        дат, изменившихся после предыдущей загрузки.
+
+        :param session_factory: Фабрика сессий БД (основной сервер: реплика может отставать).
+        """
+        async with self._load_lock:
+            await self._load(session_factory)
+
+    async def _load(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        """Перечитывает изменившиеся даты и заменяет текущий снимок новым."""
+        started = time.perf_counter()
+        current = self.columns
+        model = SpimexTradingResults
+        stmt = select(
+            model.id,
+            model.exchange_product_id,
+            model.exchange_product_name_id,
+            model.oil_id,
+            model.delivery_basis_id,
+            model.delivery_basis_name_id,
+            model.delivery_type_id,
+            model.volume,
+            model.total,
+            model.count,
+            model.date,
+        ).execution_options(yield_per=LOAD_BATCH_SIZE)
+        async with session_factory() as session:
+            names = {
+                column: dict((await session.execute(select(reference.id, reference.name))).tuples().all())
+                for column, reference in NAME_COLUMNS.items()
+            }
+            stale = set()
+            if current is not None:
+                stats = await session.execute(select(model.date, func.count(), func.max(model.id)).group_by(model.date))
+                stats = {day.toordinal(): (count, max_id) for day, count, max_id in stats.tuples()}
+                # Измененные и новые даты, а также даты, строк которых больше нет
+                stale = {
+                    day
+                    for day in stats.keys() | current.date_stats.keys()
+                    if stats.get(day) != current.date_stats.get(day)
+                }
+                stmt = stmt.where(model.date.in_([date.fromordinal(day) for day in stale]))
+            rows = []
+            if current is None or stale:
+                result = await session.stream(stmt)
+                rows = [row async for partition in result.partitions() for row in partition]
+        if current is not None and not stale:
+            columns = self._with_names(current, names)
+        else:
+            # Сборка колонок на всей таблице занимает секунды, поэтому выполняется вне цикла событий
+            columns = await asyncio.to_thread(self._build, current, rows, names, stale)
+        self.columns = columns
+        logger.info(
+            "Снимок торгов обновлен: перечитано дат %s (%s строк), всего %s строк за %.2f с",
+            len(stale) if current is not None else len(columns.date_stats),
+            len(rows),
+            columns.size,
+            time.perf_counter() - started,
+        )
+
+    async def watch(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        version_service: DataVersionService,
+        interval: float,
+        events: TradingEventBroker | None = None,
+    ) -> None:
+        """
+        Дочитывает новые бюллетени при смене версии данных.
+
+        Версия проверяется раз в `interval` секунд и сразу после события о новом
+        торговом дне: событие публикуется уже после смены версии. Пока снимок
+        не догнал версию, запросы чтения выполняются в БД (см. `api.dependencies.snapshot`).
+
+        :param session_factory: Фабрика сессий БД.
+        :param version_service: Сервис версии данных (обновляется после загрузки бюллетеней).
+        :param interval: Период проверки версии в секундах.
+        :param events: Рассылка событий о новых торговых днях.
+        """
+        with events.notifications() if events is not None else nullcontext(asyncio.Event()) as notified:
+            while True:
+                # Событие во время загрузки запускает еще одну проверку версии
+                notified.clear()
+                try:
+                    version = await version_service.get()
+                    if version != self.version or not self.ready:
+                        await self.load(session_factory)
+                        self.version = version
+                except Exception as e:
+                    logger.error("Не удалось обновить снимок торгов: %s", e)
+                with suppress(TimeoutError):
+                    await asyncio.wait_for(notified.wait(), timeout=interval)
+
+    def filter(self, **filters: Any) -> list[dict[str, Any]]:
+        """
+        Фильтрует торговые результаты (параметры и результат - как у `TradingService.filter`).
+
+        :param filters: Словарь с фильтрами (
+            oil_id, delivery_type_id, delivery_basis_id, start_date, end_date, limit, offset, fields
+        ).
+        :return: Список записей в виде словарей.
+        """
+        columns = self.columns
+        limit = int(filters.get("limit", 10))
+        offset = int(filters.get("offset", 0))
+        start, stop = self._date_range(columns, filters.get("start_date"), filters.get("end_date"))
+        postings = []
+        for name in FILTER_COLUMNS:
+            if value := filters.get(name):
+                code = columns.lookup[name].get(value)
+                if code is None:
+                    return []
+                rows = columns.postings[name][code]
+                bounds = np.searchsorted(rows, np.array([start, stop], dtype=rows.dtype))
+                postings.append(rows[bounds[0] : bounds[1]])
+        if not postings:
+            positions = np.arange(min(start + offset, stop), min(start + offset + limit, stop))
+        else:
+            positions = self._intersect(postings, offset + limit)[offset:]
+        return self._rows(columns, positions, filters.get("fields"))
+
+    def get_last_dates(self, offset: int = 0, limit: int = 10) -> list[date]:
+        """
+        Возвращает последние даты торгов (как `TradingService.get_last_dates`).
+
+        :param offset: Смещение в выборке.
+        :param limit: Количество дат.
+        :return: Список дат от новых к старым.
+        """
+        return [date.fromordinal(day) for day in self.columns.dates[offset : offset + limit].tolist()]
+
+    @staticmethod
+    def _intersect(postings: list[np.ndarray], needed: int) -> np.ndarray:
+        """
+        Пересекает отсортированные списки номеров строк.
+
+        Перебирается самый короткий список частями растущего размера, вхождение
+        в остальные списки проверяется двоичным поиском. Перебор останавливается,
+        как только набрано `needed` строк, поэтому первые страницы выдачи не
+        требуют пересечения списков целиком.
+
+        :param postings: Списки номеров строк (по возрастанию).
+        :param needed: Сколько первых общих номеров нужно (offset + limit).
+        :return: Не более `needed` общих номеров строк по возрастанию.
+        """
+        base, *others = sorted(postings, key=len)
+        if not others or not len(base):
+            return base[:needed]
+        if any(not len(other) for other in others):
+            return base[:0]
+        found = []
+        total = 0
+        chunk_start, chunk_size = 0, max(needed, INTERSECT_CHUNK_SIZE)
+        while chunk_start < len(base) and total < needed:
+            rows = base[chunk_start : chunk_start + chunk_size]
+            for other in others:
+                index = np.minimum(np.searchsorted(other, rows), len(other) - 1)
+                rows = rows[other[index] == rows]
+            found.append(rows)
+            total += len(rows)
+            chunk_start += chunk_size
+            chunk_size *= 2
+        return np.concatenate(found)[:needed]
+
+    @staticmethod
+    def _date_range(columns: SnapshotColumns, start_date: date | None, end_date: date | None) -> tuple[int, int]:
+        """Возвращает границы строк с датами в диапазоне [start_date, end_date]."""
+        # Значение приводится к типу колонки: иначе NumPy копирует колонку для сравнения
+        start, stop = 0, columns.size
+        if end_date:
+            start = int(np.searchsorted(columns.neg_dates, np.int32(-end_date.toordinal()), side="left"))
+        if start_date:
+            stop = int(np.searchsorted(columns.neg_dates, np.int32(-start_date.toordinal()), side="right"))
+        return start, max(start, stop)
+
+    @staticmethod
+    def _rows(columns: SnapshotColumns, positions: np.ndarray, fields: list[str] | None) -> list[dict[str, Any]]:
+        """Собирает словари строк из колонок (значения - типы Python, как в ответе БД)."""
+        fields = fields or [
+            "id",
+            "exchange_product_id",
+            "exchange_product_name",
+            "oil_id",
+            "delivery_basis_id",
+            "delivery_basis_name",
+            "delivery_type_id",
+            "volume",
+            "total",
+            "count",
+            "date",
+        ]
+        values = {}
+        for field in fields:
+            if field in NUMBER_COLUMNS:
+                values[field] = columns.numbers[field][positions].tolist()
+            elif field == "total":
+                values[field] = [Decimal(cents).scaleb(-2) for cents in columns.total_cents[positions].tolist()]
+            elif field == "date":
+                values[field] = [date.fromordinal(-day) for day in columns.neg_dates[positions].tolist()]
+            elif field in NAME_COLUMNS:
+                names = columns.names[field]
+                values[field] = [names.get(code) for code in columns.codes[field][positions].tolist()]
+            else:
+                dictionary = columns.dictionaries[field]
+                values[field] = [dictionary[code] for code in columns.codes[field][positions].tolist()]
+        return [dict(zip(fields, row)) for row in zip(*(values[field] for field in fields))]
+
+    @staticmethod
+    def _with_names(columns: SnapshotColumns, names: dict[str, dict[int, str]]) -> SnapshotColumns:
+        """Возвращает снимок с обновленными справочниками названий."""
+        return replace(columns, names=names)
+
+    @staticmethod
+    def _build(
+        current: SnapshotColumns | None, rows: list, names: dict[str, dict[int, str]], stale: set[int] = frozenset()
+    ) -> SnapshotColumns:
+        """
+        Строит колонки из строк БД, заменяя ими в текущем снимке строки дат `stale`.
+
+        Словари кодов только пополняются, поэтому номера кодов текущего снимка
+        остаются действительными.
+
+        :param current: Текущий снимок (None при первой загрузке).
+        :param rows: Строки БД за даты `stale` (при первой загрузке - вся таблица).
+        :param names: Справочники названий.
+        :param stale: Порядковые номера перечитанных дат.
+        """
+        dictionaries = {name: list(current.dictionaries[name]) if current else [] for name in CODE_COLUMNS}
+        lookup = {name: dict(current.lookup[name]) if current else {} for name in CODE_COLUMNS}
+        (
+            ids,
+            exchange_product_ids,
+            exchange_product_name_ids,
+            oil_ids,
+            delivery_basis_ids,
+            delivery_basis_name_ids,
+            delivery_type_ids,
+            volumes,
+            totals,
+            counts,
+            dates,
+        ) = zip(*rows) if rows else ([],) * 11
+
+        def encode(name: str, values) -> np.ndarray:
+            mapping, dictionary = lookup[name], dictionaries[name]
+            codes = []
+            for value in values:
+                code = mapping.get(value)
+                if code is None:
+                    code = mapping[value] = len(dictionary)
+                    dictionary.append(value)
+                codes.append(code)
+            return np.array(codes, dtype=np.int32)
+
+        new = {
+            "neg_dates": np.array([-day.toordinal() for day in dates], dtype=np.int32),
+            "total_cents": np.array([int(total.scaleb(2)) for total in totals], dtype=np.int64),
+            "id": np.array(ids, dtype=np.int64),
+            "volume": np.array(volumes, dtype=np.int64),
+            "count": np.array(counts, dtype=np.int64),
+            "exchange_product_id": encode("exchange_product_id", exchange_product_ids),
+            "oil_id": encode("oil_id", oil_ids),
+            "delivery_basis_id": encode("delivery_basis_id", delivery_basis_ids),
+            "delivery_type_id": encode("delivery_type_id", delivery_type_ids),
+            "exchange_product_name": np.array(exchange_product_name_ids, dtype=np.int32),
+            "delivery_basis_name": np.array(delivery_basis_name_ids, dtype=np.int32),
+        }
+        # Признаки дат считаются по загруженным строкам: если дата изменилась во время
+        # загрузки, признаки разойдутся с БД, и при следующей загрузке она будет перечитана
+        days, inverse = np.unique(new["neg_dates"], return_inverse=True)
+        max_ids = np.zeros(len(days), dtype=np.int64)
+        np.maximum.at(max_ids, inverse, new["id"])
+        date_stats = dict(zip((-days).tolist(), zip(np.bincount(inverse).tolist(), max_ids.tolist())))
+        if current is not None:
+            kept = ~np.isin(current.neg_dates, -np.array(list(stale), dtype=np.int32))
+            old = {"neg_dates": current.neg_dates, "total_cents": current.total_cents}
+            old.update(current.numbers)
+            old.update(current.codes)
+            new = {name: np.concatenate([old[name][kept], array]) for name, array in new.items()}
+            date_stats = {day: stat for day, stat in current.date_stats.items() if day not in stale} | date_stats
+        # Порядок (date desc, id desc): ключи lexsort перечисляются от младшего к старшему
+        order = np.lexsort((-new["id"], new["neg_dates"]))
+        new = {name: array[order] for name, array in new.items()}
+        postings = {}
+        for name in FILTER_COLUMNS:
+            # Устойчивая сортировка по коду сохраняет порядок строк внутри каждого кода
+            rows = np.argsort(new[name], kind="stable").astype(np.int32)
+            counts = np.bincount(new[name], minlength=len(dictionaries[name]))
+            postings[name] = np.split(rows, np.cumsum(counts)[:-1])
+        return SnapshotColumns(
+            size=len(order),
+            neg_dates=new["neg_dates"],
+            numbers={name: new[name] for name in NUMBER_COLUMNS},
+            total_cents=new["total_cents"],
+            codes={name: new[name] for name in (*CODE_COLUMNS, *NAME_COLUMNS)},
+            dictionaries=dictionaries,
+            lookup=lookup,
+            names=names,
+            postings=postings,
+            dates=-np.unique(new["neg_dates"]),
+            date_stats=date_stats,
+        )
+
+
+trading_snapshot = TradingSnapshot()
@@ -1,12 +1,81 @@
+import asyncio
+from collections.abc import AsyncIterator, Callable, Mapping
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
 from datetime import date
+from functools import lru_cache
 from typing import Any
 
 from fastapi_cache.decorator import cache
-from sqlalchemy import insert, select
-from sqlalchemy.ext.asyncio import AsyncSession
+from services.admission import admission_limiters
+from services.references import reference_cache
+from services.snapshot import TradingSnapshot
+from sqlalchemy import bindparam, ColumnElement, delete, insert, Integer, Select, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+from sqlalchemy.orm import with_expression
 
-from database.models import SpimexTradingResults
-from utils.redis_client import get_expiries
+from configs.config import settings
+from database.models import DeliveryBasis, ExchangeProduct, SpimexTradingResults
+from utils.profiling import profile_stage
+from utils.redis_client import get_expiries, service_key_builder
+
+# Условия фильтрации с именованными параметрами. Набор переданных фильтров
+# определяет форму запроса (не больше 32 вариантов без учета `fields`)
+FILTER_CONDITIONS: dict[str, Callable[[type[SpimexTradingResults]], ColumnElement[bool]]] = {
+    "oil_id": lambda model: model.oil_id == bindparam("oil_id"),
+    "delivery_type_id": lambda model: model.delivery_type_id == bindparam("delivery_type_id"),
+    "delivery_basis_id": lambda model: model.delivery_basis_id == bindparam("delivery_basis_id"),
+    "start_date": lambda model: model.date >= bindparam("start_date"),
+    "end_date": lambda model: model.date <= bindparam("end_date"),
+}
+
+# Названия из справочников: поле результата -> (справочник, внешний ключ)
+REFERENCE_NAMES = {
+    "exchange_product_name": (ExchangeProduct, SpimexTradingResults.exchange_product_name_id),
+    "delivery_basis_name": (DeliveryBasis, SpimexTradingResults.delivery_basis_name_id),
+}
+
+
+def build_filter_statement(filter_names: tuple[str, ...], fields: tuple[str, ...] | None = None) -> Select:
+    """
+    Строит запрос фильтрации торговых результатов.
+
+    Значения фильтров, `limit` и `offset` передаются параметрами при выполнении,
+    поэтому для одной формы запроса SQL не меняется: SQLAlchemy берет
+    скомпилированный запрос из кэша, а asyncpg - подготовленное выражение.
+
+    :param filter_names: Имена переданных фильтров (ключи `FILTER_CONDITIONS`).
+    :param fields: Выбираемые колонки (по умолчанию вся модель).
+    :return: Запрос с параметрами фильтров, `limit` и `offset`.
+    """
+    model = SpimexTradingResults
+    if fields:
+        columns = [
+            REFERENCE_NAMES[field][0].name.label(field) if field in REFERENCE_NAMES else getattr(model, field)
+            for field in fields
+        ]
+        stmt = select(*columns)
+        names = [field for field in fields if field in REFERENCE_NAMES]
+    else:
+        stmt = select(model).options(
+            *[with_expression(getattr(model, field), reference.name) for field, (reference, _) in REFERENCE_NAMES.items()]
+        )
+        names = list(REFERENCE_NAMES)
+    # Названия берутся соединением со справочниками, а не подзапросом на каждую строку
+    for field in names:
+        reference, foreign_key = REFERENCE_NAMES[field]
+        stmt = stmt.join(reference, reference.id == foreign_key)
+    # Отдельное условие на каждый фильтр вместо `:param IS NULL OR ...`: так
+    # планировщик видит конкретные предикаты и может использовать индексы
+    for name in filter_names:
+        stmt = stmt.where(FILTER_CONDITIONS[name](model))
+    # Порядок строк однозначен (новые торги первыми), как и в снимке `TradingSnapshot`
+    stmt = stmt.order_by(model.date.desc(), model.id.desc())
+    return stmt.limit(bindparam("limit", type_=Integer)).offset(bindparam("offset", type_=Integer))
+
+
+# Запрос собирается один раз на форму: повторное использование объекта избавляет
+# от построения выражения и расчета ключа кэша SQLAlchemy на каждый запрос
+filter_statement = lru_cache(maxsize=settings.FILTER_STATEMENT_CACHE_SIZE)(build_filter_statement)
 
 
 class TradingService:
@@ -14,16 +83,50 @@ class TradingService:
     Сервис для работы с торговыми результатами.
     """
 
-    def __init__(self, session: AsyncSession):
+    def __init__(
+        self,
+        session: AsyncSession,
+        snapshot: TradingSnapshot | None = None,
+        limiters: Mapping[str, AbstractAsyncContextManager] | None = None,
+    ):
         """
         Инициализирует сервис с асинхронной сессией базы данных.
 
         :param session: Асинхронная сессия SQLAlchemy.
+        :param snapshot: Снимок торгов в памяти; если он загружен, чтение идет из него, а не из БД.
+        :param limiters: Ограничения запросов к БД по классам маршрутов (`dates`, `filter`),
+            например `AdmissionLimiter`; ответы из кэша и снимка их не занимают.
         """
         self.session = session
         self.model = SpimexTradingResults
+        self.snapshot = snapshot
+        self.limiters = limiters or {}
+
+    @property
+    def use_snapshot(self) -> bool:
+        """Отвечать на запросы чтения из снимка в памяти."""
+        return self.snapshot is not None and self.snapshot.ready
 
-    @cache(expire=get_expiries())
+    @asynccontextmanager
+    async def admitted(self, route_class: str) -> AsyncIterator[None]:
+        """
+        Выполняет запрос к БД с ограничением класса маршрутов.
+
+        Сессия закрывается до освобождения места: иначе соединение оставалось бы
+        занятым до конца запроса, и допущенных запросов было бы больше, чем
+        соединений в пуле. Загруженные объекты остаются доступны после закрытия.
+        """
+        limiter = self.limiters.get(route_class)
+        if limiter is None:
+            yield
+            return
+        async with limiter:
+            try:
+                yield
+            finally:
+                await self.session.close()
+
+    @cache(expire=get_expiries(), key_builder=service_key_builder, namespace="TradingService.get_last_dates")
     async def get_last_dates(self, offset: int = 0, limit: int = 10) -> list[date]:
         """
         Получает последние доступные даты торгов.
@@ -32,40 +135,125 @@ class TradingService:
         :param limit: Количество записей в выборке (по умолчанию 10).
         :return: Список последних дат торгов.
         """
+        if self.use_snapshot:
+            return self.snapshot.get_last_dates(offset, limit)
         stmt = select(self.model.date).distinct().order_by(self.model.date.desc()).offset(offset).limit(limit)
-        results = await self.session.scalars(stmt)
-        return results.all()
+        async with self.admitted("dates"):
+            results = await self.session.scalars(stmt)
+            with profile_stage("orm"):
+                return results.all()
 
-    @cache(expire=get_expiries())
-    async def filter(self, **filters: dict[str, Any]) -> list[SpimexTradingResults]:
+    @cache(expire=get_expiries(), key_builder=service_key_builder, namespace="TradingService.filter")
+    async def filter(self, **filters: dict[str, Any]) -> list[SpimexTradingResults] | list[dict[str, Any]]:
         """
         Фильтрует торговые результаты на основе переданных параметров.
 
+        Если передан параметр `fields`, из базы данных выбираются только указанные
+        колонки, а результат возвращается в виде списка словарей. Из снимка
+        в памяти записи также возвращаются словарями.
+
         :param filters: Словарь с фильтрами (
-            oil_id, delivery_type_id, delivery_basis_id, start_date, end_date, limit, offset
+            oil_id, delivery_type_id, delivery_basis_id, start_date, end_date, limit, offset, fields
         ).
         :return: Список отфильтрованных записей.
         """
-        stmt = select(self.model)
-        if oil_id := filters.get("oil_id"):
-            stmt = stmt.where(self.model.oil_id == oil_id)
-        if delivery_type_id := filters.get("delivery_type_id"):
-            stmt = stmt.where(self.model.delivery_type_id == delivery_type_id)
-        if delivery_basis_id := filters.get("delivery_basis_id"):
-            stmt = stmt.where(self.model.delivery_basis_id == delivery_basis_id)
-        if start_date := filters.get("start_date"):
-            stmt = stmt.where(self.model.date >= start_date)
-        if end_date := filters.get("end_date"):
-            stmt = stmt.where(self.model.date <= end_date)
-        limit = filters.get("limit", 10)
-        offset = filters.get("offset", 0)
-        results = await self.session.scalars(stmt.limit(limit).offset(offset))
-        return results.all()
+        if self.use_snapshot:
+            return self.snapshot.filter(**filters)
+        fields = filters.get("fields")
+        filter_names = tuple(name for name in FILTER_CONDITIONS if filters.get(name))
+        stmt = filter_statement(filter_names, tuple(fields) if fields else None)
+        params = {name: filters[name] for name in filter_names}
+        params.update(limit=int(filters.get("limit", 10)), offset=int(filters.get("offset", 0)))
+        async with self.admitted("filter"):
+            if fields:
+                results = await self.session.execute(stmt, params)
+                with profile_stage("orm"):
+                    return [dict(row) for row in results.mappings()]
+            results = await self.session.scalars(stmt, params)
+            with profile_stage("orm"):
+                return results.all()
+
+    async def delete_by_date(self, bidding_date: date) -> None:
+        """
+        Удаляет торговые результаты за дату (в текущей транзакции).
+
+        :param bidding_date: Дата торгов.
+        """
+        await self.session.execute(delete(SpimexTradingResults).where(SpimexTradingResults.date == bidding_date))
 
     async def mass_create_trading(self, data: list[dict]) -> None:
         """
         Массово создает записи в таблице торговых результатов.
 
+        Названия инструментов и базисов поставки заменяются идентификаторами
+        из справочников (см. `ReferenceCache`).
+
         :param data: Список словарей с данными для вставки.
         """
-        await self.session.execute(insert(SpimexTradingResults), data)
+        products = await reference_cache.resolve(
+            self.session, ExchangeProduct, {row["exchange_product_name"] for row in data}
+        )
+        bases = await reference_cache.resolve(self.session, DeliveryBasis, {row["delivery_basis_name"] for row in data})
+        rows = []
+        for row in data:
+            row = row.copy()
+            row["exchange_product_name_id"] = products[row.pop("exchange_product_name")]
+            row["delivery_basis_name_id"] = bases[row.pop("delivery_basis_name")]
+            rows.append(row)
+        await self.session.execute(insert(SpimexTradingResults), rows)
+
+
+class TradingBatchService:
+    """
+    Сервис для выполнения пакета запросов фильтрации за один HTTP-запрос.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        snapshot: TradingSnapshot | None = None,
+        limiter: AbstractAsyncContextManager = admission_limiters["batch"],
+    ):
+        """
+        Инициализирует сервис фабрикой сессий и ограничением параллельности.
+
+        :param session_factory: Фабрика асинхронных сессий SQLAlchemy.
+        :param snapshot: Снимок торгов в памяти (см. `TradingService`).
+        :param limiter: Ограничение одновременных запросов к БД, общее для всех
+            пакетов процесса (по умолчанию допуск класса `batch`, `ADMISSION_BATCH_SHARE`).
+        """
+        self.session_factory = session_factory
+        self.snapshot = snapshot
+        self.limiter = limiter
+
+    async def filter_many(
+        self, queries: list[dict[str, Any]]
+    ) -> list[list[SpimexTradingResults] | list[dict[str, Any]]]:
+        """
+        Выполняет несколько запросов фильтрации параллельно.
+
+        Каждый запрос сначала проверяется в кэше `TradingService.filter`
+        без ожидания ограничения, а промахи выполняются в отдельных сессиях,
+        число одновременных запросов которых ограничено.
+
+        Если один из запросов завершился ошибкой (например, не допущен к БД
+        при перегрузке), остальные отменяются.
+
+        :param queries: Список словарей с фильтрами (см. `TradingService.filter`).
+        :return: Список результатов в порядке переданных запросов.
+        """
+        tasks = [asyncio.ensure_future(self._filter(filters)) for filters in queries]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            # Ответ на пакет уже не нужен: остальные запросы не должны занимать очередь допуска и соединения
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    async def _filter(self, filters: dict[str, Any]) -> list[SpimexTradingResults] | list[dict[str, Any]]:
+        """Выполняет один запрос пакета в собственной сессии."""
+        # Сессия получает соединение из пула только при первом запросе, то есть уже после допуска
+        async with self.session_factory() as session:
+            return await TradingService(session, self.snapshot, {"filter": self.limiter}).filter(**filters)
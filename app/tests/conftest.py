@@ -1,3 +1,4 @@
+import asyncio
 from collections.abc import AsyncGenerator, Generator
 from datetime import date
 from typing import Any
@@ -9,38 +10,47 @@ import redis.asyncio as aioredis
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from fastapi_cache import FastAPICache
-from fastapi_cache.backends.redis import RedisBackend
 from httpx import ASGITransport, AsyncClient
-from services.tradings import TradingService
-from sqlalchemy import insert
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from services.catalog import CatalogService
+from services.data_version import DataVersionService
+from services.references import reference_cache
+from services.tradings import TradingBatchService, TradingService
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
-from api.dependencies import trading_service
+from api.dependencies import (
+    catalog_service,
+    data_version_service,
+    trading_batch_service,
+    trading_service,
+)
 from api.routers.tradings import router
 from configs.config import settings
 from database.database import BaseModel
-from database.models import SpimexTradingResults
+from utils.redis_client import InstrumentedRedisBackend
 
 
 @pytest_asyncio.fixture
 async def test_redis_cache() -> AsyncGenerator[aioredis.Redis, None]:
     """Инициализирует fastapi_cache перед тестами"""
-    redis = await aioredis.from_url(f"redis://{settings.TEST_REDIS_HOST}:{settings.TEST_REDIS_PORT}", encoding="utf8")
-    FastAPICache.init(RedisBackend(redis), prefix="test-cache")
+    redis = await aioredis.from_url(settings.get_test_redis_url(), encoding="utf8")
+    # FastAPICache.init игнорирует повторные вызовы, а клиент Redis привязан к циклу событий теста
+    FastAPICache.reset()
+    FastAPICache.init(InstrumentedRedisBackend(redis, "test-cache"), prefix="test-cache")
     yield redis
     await redis.flushdb()
+    await redis.aclose()
 
 
 @pytest_asyncio.fixture
 async def test_database_engine() -> AsyncGenerator:
     """Заполняет тестовую базу данных начальными данными перед тестами."""
-    database_url = (
-        f"postgresql+asyncpg://{settings.TEST_POSTGRES_USER}:{settings.TEST_POSTGRES_PASSWORD}"
-        f"@{settings.TEST_DB_HOST}:{settings.TEST_DB_PORT}/{settings.TEST_POSTGRES_DB}"
-    )
-    test_engine = create_async_engine(database_url, future=True, echo=True)
+    test_engine = create_async_engine(settings.get_test_db_postgres_url(), future=True, echo=True)
+    # Таблицы справочников пересоздаются, поэтому кэшированные идентификаторы недействительны
+    reference_cache.clear()
     async with test_engine.begin() as conn:
+        # База может содержать данные бенчмарков (benchmarks/), поэтому начинаем с чистых таблиц
+        await conn.run_sync(BaseModel.metadata.drop_all)
         await conn.run_sync(BaseModel.metadata.create_all)
     yield test_engine
     async with test_engine.begin() as conn:
@@ -51,7 +61,7 @@ async def test_database_engine() -> AsyncGenerator:
 async def populate_test_database(session: AsyncSession, trading_data: list[dict[str, Any]]) -> None:
     """Создает и удаляет тестовую базу данных перед и после тестов."""
 
-    await session.execute(insert(SpimexTradingResults), trading_data)
+    await TradingService(session).mass_create_trading(trading_data)
     await session.commit()
 
 
@@ -62,6 +72,12 @@ async def session(test_database_engine) -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+@pytest_asyncio.fixture
+async def session_factory(test_database_engine) -> async_sessionmaker[AsyncSession]:
+    """Фабрика сессий тестовой базы данных (для сервисов, открывающих сессии сами)."""
+    return async_sessionmaker(bind=test_database_engine, class_=AsyncSession)
+
+
 @pytest_asyncio.fixture
 async def mock_session() -> AsyncMock:
     """Создает мок-сессию для тестирования зависимостей, использующих БД."""
@@ -83,16 +99,33 @@ def test_app() -> Generator[FastAPI, None, None]:
 
 
 @pytest.fixture
-def client(test_app: FastAPI) -> Generator[TestClient, None, None]:
+def mock_data_version_service(test_app: FastAPI) -> AsyncMock:
+    """Фикстура для подмены сервиса версии данных мок-объектом (по умолчанию данные не загружались)."""
+    mock_service = AsyncMock(spec=DataVersionService)
+    mock_service.get.return_value = None
+    test_app.dependency_overrides[data_version_service] = lambda: mock_service
+    return mock_service
+
+
+@pytest.fixture
+def client(test_app: FastAPI, mock_data_version_service: AsyncMock) -> Generator[TestClient, None, None]:
     """Фикстура, создающая синхронный тестовый клиент."""
     with TestClient(test_app) as client:
         yield client
 
 
 @pytest_asyncio.fixture
-async def async_client(test_app: FastAPI, session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
+async def async_client(
+    test_app: FastAPI, session: AsyncSession, session_factory: async_sessionmaker[AsyncSession]
+) -> AsyncGenerator[AsyncClient, None]:
     """Фикстура, создающая асинхронный тестовый клиент"""
     test_app.dependency_overrides[trading_service] = lambda: TradingService(session)
+    test_app.dependency_overrides[trading_batch_service] = lambda: TradingBatchService(
+        session_factory, limiter=asyncio.Semaphore(2)
+    )
+    test_app.dependency_overrides[catalog_service] = lambda: CatalogService(
+        session, FastAPICache.get_backend(), FastAPICache.get_prefix()
+    )
     async with AsyncClient(transport=ASGITransport(test_app), base_url="http://test") as c:
         yield c
 
@@ -106,6 +139,24 @@ def mock_trading_service(test_app: FastAPI) -> Generator[AsyncMock, None, None]:
     test_app.dependency_overrides.clear()
 
 
+@pytest.fixture
+def mock_trading_batch_service(test_app: FastAPI) -> Generator[AsyncMock, None, None]:
+    """Фикстура для подмены сервиса пакетных запросов мок-объектом."""
+    mock_service = AsyncMock(spec=TradingBatchService)
+    test_app.dependency_overrides[trading_batch_service] = lambda: mock_service
+    yield mock_service
+    test_app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def mock_catalog_service(test_app: FastAPI) -> Generator[AsyncMock, None, None]:
+    """Фикстура для подмены сервиса справочников мок-объектом."""
+    mock_service = AsyncMock(spec=CatalogService)
+    test_app.dependency_overrides[catalog_service] = lambda: mock_service
+    yield mock_service
+    test_app.dependency_overrides.clear()
+
+
 @pytest.fixture
 def trading_data() -> list[dict[str, Any]]:
     """Тестовые данные о торгах без уникального идентификатора."""
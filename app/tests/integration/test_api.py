@@ -3,7 +3,17 @@ from datetime import date
 from typing import Any
 
 import pytest
+from fastapi import FastAPI
+from fastapi_cache import FastAPICache
 from httpx import AsyncClient
+from services.admission import AdmissionLimiter
+from services.data_version import DataVersionService
+from services.tradings import TradingBatchService, TradingService
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from api.dependencies import trading_batch_service, trading_service
+from configs.config import settings
+from utils.query_monitor import query_monitor
 
 
 @pytest.mark.usefixtures("test_redis_cache", "test_database_engine", "populate_test_database")
@@ -100,3 +110,128 @@ class TestAPI:
         response = await async_client.get(f"/trading/trading_results?{field}={non_existent_data}")
         assert response.status_code == 200
         assert len(response.json()) == 0
+
+    @pytest.mark.parametrize("url", ("/trading/trading_results", "/trading/dynamics"))
+    async def test_fields_projection(self, async_client: AsyncClient, url: str):
+        """Тестирует выборку только запрошенных полей"""
+        response = await async_client.get(f"{url}?fields=date,oil_id,volume,total")
+        assert response.status_code == 200
+        assert len(response.json()) == 3
+        assert all(obj.keys() == {"date", "oil_id", "volume", "total"} for obj in response.json())
+
+    async def test_batch_results(self, async_client: AsyncClient, trading_data: list[dict[str, Any]]):
+        """Тестирует выполнение нескольких запросов фильтрации за один запрос"""
+        queries = [{"oil_id": obj["oil_id"]} for obj in trading_data] + [{"start_date": "2024-08-08", "limit": 1}]
+        response = await async_client.post("/trading/batch", json={"queries": queries})
+        assert response.status_code == 200
+        results = response.json()
+        assert len(results) == len(queries)
+        for obj, result in zip(trading_data, results):
+            assert len(result) == 1
+            assert result[0]["oil_id"] == obj["oil_id"]
+        assert len(results[-1]) == 1
+
+    async def test_admission_overload(
+        self,
+        async_client: AsyncClient,
+        test_app: FastAPI,
+        session: AsyncSession,
+        session_factory: async_sessionmaker[AsyncSession],
+    ):
+        """При переполненной очереди допуска промах кэша получает 503 с Retry-After, а ответ из кэша - нет"""
+        limiter = AdmissionLimiter("test", concurrency=1, queue_size=0, retry_after=7)
+        test_app.dependency_overrides[trading_service] = lambda: TradingService(session, limiters={"filter": limiter})
+        test_app.dependency_overrides[trading_batch_service] = lambda: TradingBatchService(
+            session_factory, limiter=limiter
+        )
+        cached = await async_client.get("/trading/dynamics", params={"oil_id": "A100"})
+        assert cached.status_code == 200
+        # Все места заняты, ждать негде
+        async with limiter:
+            response = await async_client.get("/trading/dynamics", params={"oil_id": "A592"})
+            assert response.status_code == 503
+            assert response.headers["Retry-After"] == "7"
+            response = await async_client.post(
+                "/trading/batch", json={"queries": [{"oil_id": "A100"}, {"oil_id": "A592"}]}
+            )
+            assert response.status_code == 503
+            response = await async_client.get("/trading/dynamics", params={"oil_id": "A100"})
+            assert response.status_code == 200
+            assert [row["id"] for row in response.json()] == [row["id"] for row in cached.json()]
+        response = await async_client.get("/trading/dynamics", params={"oil_id": "A592"})
+        assert response.status_code == 200
+
+    @pytest.mark.parametrize(
+        "catalog, field, name_field",
+        (
+            ("oils", "oil_id", None),
+            ("bases", "delivery_basis_id", "delivery_basis_name"),
+            ("delivery_types", "delivery_type_id", None),
+        ),
+    )
+    async def test_catalog(
+        self,
+        async_client: AsyncClient,
+        trading_data: list[dict[str, Any]],
+        catalog: str,
+        field: str,
+        name_field: str | None,
+    ):
+        """Тестирует справочники кодов: коды, названия, даты первых/последних торгов и количество записей"""
+        response = await async_client.get(f"/trading/catalog/{catalog}")
+        assert response.status_code == 200
+        items = {item["code"]: item for item in response.json()}
+        assert items.keys() == {obj[field] for obj in trading_data}
+        for obj in trading_data:
+            item = items[obj[field]]
+            assert item["name"] == (obj[name_field] if name_field else None)
+            assert item["first_date"] <= obj["date"].isoformat() <= item["last_date"]
+            assert item["count"] >= 1
+
+        response = await async_client.get(
+            f"/trading/catalog/{catalog}", headers={"If-None-Match": response.headers["ETag"]}
+        )
+        assert response.status_code == 304
+
+    async def test_conditional_response_by_data_version(self, async_client: AsyncClient):
+        """Тестирует ответ 304 до загрузки нового бюллетеня и 200 после обновления версии данных"""
+        version_service = DataVersionService(FastAPICache.get_backend(), FastAPICache.get_prefix())
+        response = await async_client.get("/trading/trading_results")
+        assert "ETag" not in response.headers
+
+        await version_service.update(date(2024, 8, 9))
+        response = await async_client.get("/trading/trading_results")
+        etag = response.headers["ETag"]
+        response = await async_client.get("/trading/trading_results", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+        await version_service.update(date(2024, 8, 12))
+        response = await async_client.get("/trading/trading_results", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert len(response.json()) == 3
+
+    async def test_request_profiling(self, async_client: AsyncClient, test_database_engine, monkeypatch):
+        """Тестирует профилирование запроса по флагу с токеном администратора"""
+        monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+        query_monitor.instrument(test_database_engine)
+
+        response = await async_client.get("/trading/dynamics", headers={"X-Profile": "1"})
+        assert "Server-Timing" not in response.headers
+
+        response = await async_client.get(
+            "/trading/dynamics?profile=1&oil_id=A100", headers={"X-Admin-Token": "secret"}
+        )
+        assert response.status_code == 200
+        stages = dict(item.split(";dur=") for item in response.headers["Server-Timing"].split(", "))
+        assert {"dependencies", "cache", "db", "orm", "endpoint", "serialization", "total"} <= set(stages)
+        assert all(float(duration) >= 0 for duration in stages.values())
+
+        response = await async_client.get("/trading/dynamics?oil_id=A100", headers={"X-Admin-Token": "secret"})
+        assert "Server-Timing" not in response.headers
+
+        # Токен с не ASCII-символами - неверный токен, а не ошибка сервера
+        response = await async_client.get(
+            "/trading/dynamics?oil_id=A100", headers={"X-Profile": "1", "X-Admin-Token": "секрет".encode()}
+        )
+        assert response.status_code == 200
+        assert "Server-Timing" not in response.headers
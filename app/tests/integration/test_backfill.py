@@ -0,0 +1,109 @@
+from collections.abc import AsyncGenerator
+from datetime import date
+from typing import Any
+
+import backfill
+import pytest
+import pytest_asyncio
+from benchmarks.spimex_stub import start_server, StubConfig
+from services.backfill import BackfillService
+from services.tradings import TradingService
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from configs.config import settings
+from database.models import BackfillCheckpoint, SpimexTradingResults
+
+
+@pytest.fixture
+def stub_config() -> StubConfig:
+    return StubConfig(files=12, files_per_page=4, rows_per_file=10, last_date=date(2024, 1, 31))
+
+
+@pytest_asyncio.fixture
+async def stub_url(stub_config: StubConfig) -> AsyncGenerator[str, None]:
+    """Запускает локальную замену spimex.com"""
+    runner, base_url = await start_server(stub_config)
+    yield base_url
+    await runner.cleanup()
+
+
+def test_split_shards():
+    """Части непрерывны по датам и отличаются по размеру не больше чем на один бюллетень"""
+    bulletins = [(f"/file{day}", date(2024, 1, day)) for day in range(31, 21, -1)]
+    shards = backfill.split_shards(bulletins, 3)
+    assert [len(shard) for shard in shards] == [4, 3, 3]
+    assert [bulletin for shard in shards for bulletin in shard] == bulletins
+    assert backfill.split_shards(bulletins[:2], 4) == [bulletins[:1], bulletins[1:2]]
+
+
+class TestBackfill:
+    """Тестирование исторической загрузки в несколько процессов"""
+
+    async def run(self, stub_url: str, stub_config: StubConfig, start_date: date, end_date: date) -> dict:
+        return await backfill.backfill(
+            start_date,
+            end_date,
+            workers=2,
+            base_url=stub_url,
+            database_url=settings.get_test_db_postgres_url(),
+            last_page=stub_config.pages,
+            batch_size=2,
+        )
+
+    async def test_backfill_date_range(
+        self, stub_url: str, stub_config: StubConfig, session_factory: async_sessionmaker[AsyncSession]
+    ):
+        """Загружаются только бюллетени из диапазона дат, каждый отмечен в контрольных точках"""
+        start_date, end_date = date(2024, 1, 10), date(2024, 1, 25)
+        expected = {day for day in stub_config.bidding_dates() if start_date <= day <= end_date}
+        summary = await self.run(stub_url, stub_config, start_date, end_date)
+        async with session_factory() as session:
+            loaded_dates = set((await session.scalars(select(SpimexTradingResults.date).distinct())).all())
+            checkpoints = await BackfillService(session).loaded_dates(start_date, end_date)
+        assert summary["workers"] == 2
+        assert summary["files"] == len(expected)
+        assert summary["errors"] == 0
+        assert loaded_dates == checkpoints == expected
+
+    async def test_backfill_resumes(
+        self, stub_url: str, stub_config: StubConfig, session_factory: async_sessionmaker[AsyncSession]
+    ):
+        """Повторный запуск пропускает бюллетени из контрольных точек и не дублирует строки"""
+        start_date, end_date = date(2024, 1, 1), date(2024, 1, 31)
+        async with session_factory() as session:
+            session.add(BackfillCheckpoint(date=date(2024, 1, 31), rows=0))
+            await session.commit()
+        first = await self.run(stub_url, stub_config, start_date, end_date)
+        second = await self.run(stub_url, stub_config, start_date, end_date)
+        async with session_factory() as session:
+            rows = await session.scalar(select(func.count()).select_from(SpimexTradingResults))
+            loaded_dates = set((await session.scalars(select(SpimexTradingResults.date).distinct())).all())
+        assert first["skipped"] == 1
+        assert first["files"] == first["bulletins"] - 1 == len(stub_config.bidding_dates()) - 1
+        assert second["skipped"] == second["bulletins"]
+        assert second["files"] == 0
+        assert rows == first["rows"]
+        assert date(2024, 1, 31) not in loaded_dates
+
+    async def test_backfill_skips_dates_loaded_without_checkpoints(
+        self,
+        stub_url: str,
+        stub_config: StubConfig,
+        session_factory: async_sessionmaker[AsyncSession],
+        trading_data: list[dict[str, Any]],
+    ):
+        """Даты, уже загруженные ежедневной загрузкой (без контрольных точек), пропускаются"""
+        start_date, end_date = date(2024, 1, 1), date(2024, 1, 31)
+        loaded_date = max(stub_config.bidding_dates())
+        async with session_factory() as session:
+            await TradingService(session).mass_create_trading([row | {"date": loaded_date} for row in trading_data])
+            await session.commit()
+            assert await BackfillService(session).loaded_dates(start_date, end_date) == {loaded_date}
+        summary = await self.run(stub_url, stub_config, start_date, end_date)
+        async with session_factory() as session:
+            rows = await session.scalar(
+                select(func.count()).select_from(SpimexTradingResults).where(SpimexTradingResults.date == loaded_date)
+            )
+        assert summary["skipped"] == 1
+        assert rows == len(trading_data)
@@ -0,0 +1,67 @@
+import asyncio
+from datetime import date
+from typing import Any
+
+from services.bulletin_writer import BulletinWriter
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from database.models import SpimexTradingResults
+from utils.ingestion_stats import IngestionStats
+
+
+async def count_rows(session_factory: async_sessionmaker[AsyncSession]) -> int:
+    async with session_factory() as session:
+        return await session.scalar(select(func.count()).select_from(SpimexTradingResults))
+
+
+class TestBulletinWriter:
+    """Тестирование пакетной записи бюллетеней"""
+
+    async def test_batch_committed(
+        self, session_factory: async_sessionmaker[AsyncSession], trading_data: list[dict[str, Any]]
+    ):
+        """Полный пакет записывается и фиксируется сразу, остаток - при выходе"""
+        stats = IngestionStats()
+        async with BulletinWriter(session_factory, stats, batch_size=2, flush_interval=60) as writer:
+            await writer.add(date(2024, 8, 7), trading_data[:1])
+            await writer.add(date(2024, 8, 8), trading_data[1:2])
+            assert await count_rows(session_factory) == 2
+            await writer.add(date(2024, 8, 9), trading_data[2:])
+        assert await count_rows(session_factory) == len(trading_data)
+        assert (stats.files, stats.rows, stats.errors) == (3, len(trading_data), 0)
+
+    async def test_bad_bulletin_rolled_back_alone(
+        self, session_factory: async_sessionmaker[AsyncSession], trading_data: list[dict[str, Any]]
+    ):
+        """Ошибка в одном бюллетене откатывает только его точку сохранения"""
+        bad_data = [trading_data[0] | {"oil_id": "TOO_LONG"}]
+        stats = IngestionStats()
+        async with BulletinWriter(session_factory, stats, batch_size=3, flush_interval=60) as writer:
+            await writer.add(date(2024, 8, 7), trading_data[:1])
+            await writer.add(date(2024, 8, 7), bad_data)
+            await writer.add(date(2024, 8, 8), trading_data[1:])
+        assert await count_rows(session_factory) == len(trading_data)
+        assert (stats.files, stats.rows, stats.errors) == (2, len(trading_data), 1)
+
+    async def test_partial_batch_flushed_by_interval(
+        self, session_factory: async_sessionmaker[AsyncSession], trading_data: list[dict[str, Any]]
+    ):
+        """Неполный пакет записывается по истечении интервала"""
+        stats = IngestionStats()
+        async with BulletinWriter(session_factory, stats, batch_size=100, flush_interval=0.1) as writer:
+            await writer.add(date(2024, 8, 7), trading_data)
+            await asyncio.sleep(0.3)
+            assert await count_rows(session_factory) == len(trading_data)
+        assert stats.files == 1
+        assert writer.timer.cancelled()
+
+    async def test_replace_does_not_duplicate(
+        self, session_factory: async_sessionmaker[AsyncSession], trading_data: list[dict[str, Any]]
+    ):
+        """Повторная запись бюллетеня с replace=True заменяет строки за его дату"""
+        bulletin = (date(2024, 8, 7), [row | {"date": date(2024, 8, 7)} for row in trading_data])
+        writer = BulletinWriter(session_factory, IngestionStats(), replace=True)
+        await asyncio.gather(writer.write([bulletin]), writer.write([bulletin]))
+        assert await writer.write([bulletin]) == [bulletin]
+        assert await count_rows(session_factory) == len(trading_data)
@@ -0,0 +1,111 @@
+import asyncio
+from collections.abc import AsyncGenerator, Callable
+from typing import Annotated
+
+import pytest
+import pytest_asyncio
+from fastapi import APIRouter, Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import (
+    async_sessionmaker,
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+)
+
+from api.cancellation import CancellableRoute, CLIENT_CLOSED_REQUEST
+from configs.config import settings
+from database.database import RoutingSession
+
+ACTIVE_SLEEPS = text(
+    "SELECT count(*) FROM pg_stat_activity "
+    "WHERE state = 'active' AND query LIKE '%pg_sleep%' AND pid <> pg_backend_pid()"
+)
+
+
+async def wait_active_sleeps(engine: AsyncEngine, condition: Callable[[int], bool]) -> None:
+    """Ждет, пока число выполняемых `pg_sleep` удовлетворит условию"""
+    for _ in range(100):
+        # Статистика pg_stat_activity фиксируется на время транзакции, поэтому каждая проверка - новое соединение
+        async with engine.connect() as conn:
+            if condition(await conn.scalar(ACTIVE_SLEEPS)):
+                return
+        await asyncio.sleep(0.05)
+    pytest.fail("Не дождались ожидаемого числа запросов pg_sleep")
+
+
+@pytest_asyncio.fixture
+async def engine() -> AsyncGenerator[AsyncEngine, None]:
+    engine = create_async_engine(settings.get_test_db_postgres_url())
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def app(engine: AsyncEngine) -> FastAPI:
+    """Приложение с маршрутом, выполняющим `pg_sleep` в сессии API (RoutingSession)"""
+    session_factory = async_sessionmaker(
+        sync_session_class=RoutingSession, primary=engine.sync_engine, replica=engine.sync_engine
+    )
+
+    async def get_session() -> AsyncGenerator[AsyncSession, None]:
+        async with session_factory() as session:
+            yield session
+
+    router = APIRouter(route_class=CancellableRoute)
+
+    @router.get("/sleep")
+    async def sleep(session: Annotated[AsyncSession, Depends(get_session)], seconds: float) -> dict:
+        await session.execute(select(func.pg_sleep(seconds)))
+        return {"slept": seconds}
+
+    app = FastAPI()
+    app.include_router(router, prefix="/test")
+    return app
+
+
+async def test_statement_timeout_returns_504(app: FastAPI, monkeypatch: pytest.MonkeyPatch):
+    """Запрос дольше statement_timeout маршрута прерывается сервером БД и получает 504"""
+    monkeypatch.setattr(settings, "DB_ROUTE_STATEMENT_TIMEOUTS_MS", {"/test/sleep": 100})
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        assert (await client.get("/test/sleep", params={"seconds": 0.01})).status_code == 200
+        response = await client.get("/test/sleep", params={"seconds": 5})
+    assert response.status_code == 504
+
+
+async def test_disconnect_cancels_query(app: FastAPI, engine: AsyncEngine):
+    """Разрыв соединения клиентом отменяет выполняемый запрос к БД"""
+    disconnected = asyncio.Event()
+    messages = []
+
+    async def receive() -> dict:
+        if not messages:
+            messages.append("request")
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict) -> None:
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/test/sleep",
+        "raw_path": b"/test/sleep",
+        "query_string": b"seconds=30",
+        "headers": [],
+        "server": ("test", 80),
+        "client": ("test", 1234),
+        "root_path": "",
+    }
+    request = asyncio.create_task(app(scope, receive, send))
+    await wait_active_sleeps(engine, lambda count: count == 1)
+    disconnected.set()
+    await asyncio.wait_for(request, timeout=5)
+    assert messages[1]["status"] == CLIENT_CLOSED_REQUEST
+    await wait_active_sleeps(engine, lambda count: count == 0)
@@ -0,0 +1,135 @@
+import asyncio
+from collections.abc import AsyncGenerator
+from datetime import date
+
+import distributed_ingest
+import pytest_asyncio
+import redis.asyncio as aioredis
+from benchmarks.spimex_stub import start_server, StubConfig
+from services.ingestion_queue import IngestionQueue
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from configs.config import settings
+from database.models import SpimexTradingResults
+
+STUB_CONFIG = StubConfig(files=8, files_per_page=3, rows_per_file=10)
+
+
+@pytest_asyncio.fixture
+async def redis() -> AsyncGenerator[aioredis.Redis, None]:
+    redis = aioredis.from_url(settings.get_test_redis_url())
+    yield redis
+    await redis.delete("test-ingestion:jobs", "test-ingestion:dead")
+    await redis.aclose()
+
+
+@pytest_asyncio.fixture
+async def queue(redis: aioredis.Redis) -> IngestionQueue:
+    return IngestionQueue(
+        redis, stream="test-ingestion:jobs", group="workers", dead_letter_stream="test-ingestion:dead", max_retries=2
+    )
+
+
+@pytest_asyncio.fixture
+async def stub_url() -> AsyncGenerator[str, None]:
+    """Запускает локальную замену spimex.com"""
+    runner, base_url = await start_server(STUB_CONFIG)
+    yield base_url
+    await runner.cleanup()
+
+
+async def work(queue: IngestionQueue, consumer: str, session_factory: async_sessionmaker[AsyncSession]):
+    return await distributed_ingest.work(
+        queue, consumer, session_factory, batch_size=2, block_ms=100, exit_when_empty=True, refresh=False
+    )
+
+
+class TestDistributedIngest:
+    """Тестирование загрузки через очередь Redis Streams"""
+
+    async def test_workers_load_all_jobs(
+        self, queue: IngestionQueue, stub_url: str, session_factory: async_sessionmaker[AsyncSession]
+    ):
+        """Задания координатора распределяются между обработчиками и подтверждаются"""
+        dates = STUB_CONFIG.bidding_dates()
+        published = await distributed_ingest.coordinate(
+            queue, stub_url, last_page=STUB_CONFIG.pages, min_year=dates[-1].year, current_year=dates[0].year
+        )
+        first, second = await asyncio.gather(
+            work(queue, "worker-1", session_factory), work(queue, "worker-2", session_factory)
+        )
+        async with session_factory() as session:
+            loaded = (
+                await session.execute(
+                    select(SpimexTradingResults.date, func.count()).group_by(SpimexTradingResults.date)
+                )
+            ).all()
+        assert published == STUB_CONFIG.files
+        assert first.files > 0 and second.files > 0
+        assert first.files + second.files == STUB_CONFIG.files
+        assert {day for day, _ in loaded} == set(dates)
+        assert all(count == first.rows // first.files for _, count in loaded)
+        assert await queue.pending() == 0
+
+    async def test_repeated_job_does_not_duplicate_rows(
+        self, queue: IngestionQueue, stub_url: str, session_factory: async_sessionmaker[AsyncSession]
+    ):
+        """Задание, выполненное повторно после commit, заменяет строки за дату и подтверждается"""
+        dates = STUB_CONFIG.bidding_dates()
+        await distributed_ingest.coordinate(
+            queue, stub_url, last_page=1, min_year=dates[-1].year, current_year=dates[0].year
+        )
+        [(_, job), *_] = await queue.redis.xrange(queue.stream)
+        url, bidding_date = job[b"url"].decode(), date.fromisoformat(job[b"date"].decode())
+        first = await work(queue, "worker-1", session_factory)
+        await queue.publish(url, bidding_date)
+        second = await work(queue, "worker-1", session_factory)
+        async with session_factory() as session:
+            rows = await session.scalar(
+                select(func.count()).select_from(SpimexTradingResults).where(SpimexTradingResults.date == bidding_date)
+            )
+        assert second.files == 1 and second.errors == 0
+        assert rows == first.rows // first.files
+        assert await queue.pending() == 0
+        assert await queue.redis.xlen(queue.dead_letter_stream) == 0
+
+    async def test_failed_job_moved_to_dead_letter_stream(
+        self, queue: IngestionQueue, stub_url: str, session_factory: async_sessionmaker[AsyncSession]
+    ):
+        """После исчерпания попыток задание переносится в поток недоставленных"""
+        await queue.create_group()
+        await queue.publish(f"{stub_url}/missing.xls", date(2024, 1, 10))
+        stats = await work(queue, "worker-1", session_factory)
+        dead = await queue.redis.xrange(queue.dead_letter_stream)
+        assert stats.errors == queue.max_retries
+        assert len(dead) == 1
+        assert dead[0][1][b"attempts"] == str(queue.max_retries).encode()
+        assert await queue.pending() == 0
+        assert await queue.redis.xlen(queue.stream) == queue.max_retries
+
+    async def test_stale_job_claimed_by_another_worker(self, queue: IngestionQueue):
+        """Задание упавшего обработчика забирает другой после простоя"""
+        await queue.create_group()
+        await queue.publish("https://example.com/file.xls", date(2024, 1, 10))
+        [job] = await queue.read("crashed", count=1, block_ms=10)
+        assert await IngestionQueue(queue.redis, queue.stream, queue.group).read("alive", 1, 10) == []
+        claimed = await IngestionQueue(queue.redis, queue.stream, queue.group, claim_idle_ms=0).read("alive", 1, 10)
+        assert [item.message_id for item in claimed] == [job.message_id]
+
+    async def test_job_crashing_workers_moved_to_dead_letter_stream(self, queue: IngestionQueue):
+        """Задание, на котором падают обработчики, после исчерпания попыток переносится в поток недоставленных"""
+        await queue.create_group()
+        await queue.publish("https://example.com/file.xls", date(2024, 1, 10))
+        await queue.read("crashed-1", count=1, block_ms=10)
+        reclaiming = IngestionQueue(
+            queue.redis, queue.stream, queue.group, queue.dead_letter_stream, queue.max_retries, claim_idle_ms=0
+        )
+        [job] = await reclaiming.read("crashed-2", count=1, block_ms=10)
+        assert job.attempts == 1
+
+        assert await reclaiming.read("alive", count=1, block_ms=10) == []
+        dead = await queue.redis.xrange(queue.dead_letter_stream)
+        assert len(dead) == 1
+        assert dead[0][1][b"attempts"] == str(queue.max_retries).encode()
+        assert await queue.pending() == 0
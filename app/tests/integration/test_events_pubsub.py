@@ -0,0 +1,39 @@
+import asyncio
+from collections.abc import AsyncGenerator
+from datetime import date
+
+import pytest_asyncio
+import redis.asyncio as aioredis
+from services.events import TradingEventBroker
+
+from configs.config import settings
+from schemas.tradings import TradingDayEvent
+
+CHANNEL = "test:trading:events"
+
+
+@pytest_asyncio.fixture
+async def redis() -> AsyncGenerator[aioredis.Redis, None]:
+    redis = aioredis.from_url(settings.get_test_redis_url())
+    yield redis
+    await redis.aclose()
+
+
+async def test_event_fanned_out_to_all_processes(redis: aioredis.Redis):
+    """Событие доходит до подключений всех процессов API через канал Redis"""
+    brokers = [TradingEventBroker(channel=CHANNEL), TradingEventBroker(channel=CHANNEL)]
+    for broker in brokers:
+        await broker.start(redis)
+    try:
+        async with brokers[0].subscribe() as first, brokers[1].subscribe() as second:
+            event = TradingDayEvent(date=date(2024, 8, 9), rows=120, instruments=80)
+            for _ in range(50):
+                if await TradingEventBroker.publish(redis, event, CHANNEL) == len(brokers):
+                    break
+                # Подписка выполняется в фоновой задаче
+                await asyncio.sleep(0.02)
+            received = await asyncio.wait_for(asyncio.gather(first.get(), second.get()), timeout=1)
+        assert [TradingDayEvent.model_validate_json(payload) for payload in received] == [event, event]
+    finally:
+        for broker in brokers:
+            await broker.stop()
@@ -0,0 +1,83 @@
+from collections.abc import AsyncGenerator
+from datetime import date
+
+import parser_main
+import pytest
+import pytest_asyncio
+from benchmarks.spimex_stub import start_server, StubConfig
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from database.models import SpimexTradingResults
+
+
+@pytest.fixture
+def stub_config() -> StubConfig:
+    return StubConfig(files=6, files_per_page=4, rows_per_file=20)
+
+
+@pytest_asyncio.fixture
+async def stub_url(stub_config: StubConfig) -> AsyncGenerator[str, None]:
+    """Запускает локальную замену spimex.com"""
+    runner, base_url = await start_server(stub_config)
+    yield base_url
+    await runner.cleanup()
+
+
+class TestIngestion:
+    """Тестирование загрузки бюллетеней с локальной замены spimex.com"""
+
+    async def test_ingest_all_files(
+        self, stub_url: str, stub_config: StubConfig, session_factory: async_sessionmaker[AsyncSession]
+    ):
+        """Все бюллетени со всех страниц загружаются в БД, статистика заполнена"""
+        dates = stub_config.bidding_dates()
+        stats = await parser_main.ingest(
+            base_url=stub_url,
+            first_page=1,
+            last_page=stub_config.pages + 1,
+            min_year=dates[-1].year,
+            current_year=dates[0].year,
+            session_factory=session_factory,
+        )
+        async with session_factory() as session:
+            rows = await session.scalar(select(func.count()).select_from(SpimexTradingResults))
+            loaded_dates = set((await session.scalars(select(SpimexTradingResults.date).distinct())).all())
+        assert stats.files == stub_config.files
+        assert stats.pages == stub_config.pages + 1
+        assert stats.errors == 0
+        assert stats.rows == rows > 0
+        assert loaded_dates == set(dates)
+        assert {"page", "parse", "file", "extract", "db"} <= set(stats.summary()["stages"])
+
+    async def test_ingest_counts_failed_downloads(self, session_factory: async_sessionmaker[AsyncSession]):
+        """Ошибки сервера учитываются в статистике и не прерывают загрузку"""
+        config = StubConfig(files=4, rows_per_file=10, error_rate=1.0)
+        runner, base_url = await start_server(config)
+        try:
+            stats = await parser_main.ingest(base_url=base_url, last_page=1, session_factory=session_factory)
+        finally:
+            await runner.cleanup()
+        assert stats.files == 0
+        assert stats.errors == 1
+
+    async def test_ingest_stops_at_min_year(self, session_factory: async_sessionmaker[AsyncSession]):
+        """Обход страниц останавливается на первой дате раньше минимального года"""
+        # 10 рабочих дней: 8 в январе 2024 года и 2 в декабре 2023 года, по 3 на странице
+        config = StubConfig(files=10, files_per_page=3, rows_per_file=10, last_date=date(2024, 1, 10))
+        runner, base_url = await start_server(config)
+        try:
+            stats = await parser_main.ingest(
+                base_url=base_url,
+                last_page=10,
+                min_year=2024,
+                current_year=2024,
+                session_factory=session_factory,
+            )
+        finally:
+            await runner.cleanup()
+        async with session_factory() as session:
+            loaded_dates = set((await session.scalars(select(SpimexTradingResults.date).distinct())).all())
+        assert stats.pages == 3
+        assert stats.files == 8
+        assert loaded_dates == {day for day in config.bidding_dates() if day.year == 2024}
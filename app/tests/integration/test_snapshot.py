@@ -0,0 +1,240 @@
+import asyncio
+import contextlib
+import itertools
+import threading
+from datetime import date, datetime, timedelta, timezone
+from typing import Any
+from unittest.mock import AsyncMock
+
+import pytest
+import pytest_asyncio
+from benchmarks.seed import seed_database, SyntheticDataset
+from services.bulletin_writer import BulletinWriter
+from services.events import TradingEventBroker
+from services.snapshot import TradingSnapshot
+from services.tradings import FILTER_CONDITIONS, TradingService
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from api import dependencies
+from configs.config import settings
+from schemas.tradings import DataVersion, Trading
+from utils.ingestion_stats import IngestionStats
+
+FIELDS = ["id", "oil_id", "total", "date"]
+
+
+@pytest_asyncio.fixture
+async def dataset(test_database_engine) -> SyntheticDataset:
+    """Заполняет тестовую базу синтетическими торгами"""
+    return await seed_database(test_database_engine, rows=3000, rows_per_day=60, instruments=120)
+
+
+@pytest_asyncio.fixture
+async def snapshot(dataset: SyntheticDataset, session_factory: async_sessionmaker[AsyncSession]) -> TradingSnapshot:
+    snapshot = TradingSnapshot()
+    await snapshot.load(session_factory)
+    return snapshot
+
+
+async def sql_filter(session_factory: async_sessionmaker[AsyncSession], **filters: Any) -> list[dict[str, Any]]:
+    """Выполняет фильтрацию в БД (без кэша) и приводит записи к словарям"""
+    async with session_factory() as session:
+        results = await TradingService.filter.__wrapped__(TradingService(session), **filters)
+    if filters.get("fields"):
+        return results
+    return [Trading.model_validate(row, from_attributes=True).model_dump() for row in results]
+
+
+def filter_combinations(row: dict[str, Any]) -> list[dict[str, Any]]:
+    """Все 32 комбинации фильтров, под которые подходит строка `row`"""
+    values = {
+        "oil_id": row["oil_id"],
+        "delivery_type_id": row["delivery_type_id"],
+        "delivery_basis_id": row["delivery_basis_id"],
+        "start_date": row["date"] - timedelta(days=20),
+        "end_date": row["date"] + timedelta(days=10),
+    }
+    return [
+        {name: values[name] for name in names}
+        for size in range(len(FILTER_CONDITIONS) + 1)
+        for names in itertools.combinations(FILTER_CONDITIONS, size)
+    ]
+
+
+class TestTradingSnapshot:
+    """Снимок торгов в памяти возвращает то же, что и запросы к БД"""
+
+    @pytest.mark.parametrize("position", (0, 1500, 2999))
+    async def test_filter_matches_sql(
+        self, snapshot: TradingSnapshot, session_factory: async_sessionmaker[AsyncSession], position: int
+    ):
+        row = snapshot.filter(offset=position, limit=1)[0]
+        for filters in filter_combinations(row):
+            assert snapshot.filter(**filters), filters
+            for page in ({}, {"limit": 100, "offset": 5}, {"limit": 1000}, {"limit": 7, "fields": FIELDS}):
+                query = filters | page
+                assert snapshot.filter(**query) == await sql_filter(session_factory, **query), query
+
+    async def test_filter_without_matches(
+        self, snapshot: TradingSnapshot, session_factory: async_sessionmaker[AsyncSession]
+    ):
+        """Коды и даты без торгов дают пустой результат"""
+        assert snapshot.filter(oil_id="ZZZZ") == []
+        assert snapshot.filter(start_date=date(2100, 1, 1)) == []
+        assert snapshot.filter(end_date=date(2000, 1, 1)) == []
+        assert snapshot.filter(offset=10_000) == await sql_filter(session_factory, offset=10_000) == []
+
+    async def test_deep_pages_match_sql(
+        self, snapshot: TradingSnapshot, session_factory: async_sessionmaker[AsyncSession], dataset: SyntheticDataset
+    ):
+        """Дальние страницы пересечения списков вхождений совпадают с SQL"""
+        filters = {"delivery_type_id": dataset.delivery_type_ids[0], "start_date": dataset.first_date}
+        for page in ({"offset": 0, "limit": 1000}, {"offset": 300, "limit": 50}, {"offset": 450, "limit": 100}):
+            query = filters | page
+            assert snapshot.filter(**query) == await sql_filter(session_factory, **query), query
+
+    async def test_get_last_dates_matches_sql(
+        self, snapshot: TradingSnapshot, session_factory: async_sessionmaker[AsyncSession]
+    ):
+        async with session_factory() as session:
+            service = TradingService(session)
+            for offset, limit in ((0, 10), (3, 20), (45, 10)):
+                expected = await TradingService.get_last_dates.__wrapped__(service, offset=offset, limit=limit)
+                assert snapshot.get_last_dates(offset, limit) == expected
+
+    async def test_incremental_load(
+        self,
+        snapshot: TradingSnapshot,
+        session_factory: async_sessionmaker[AsyncSession],
+        trading_data: list[dict[str, Any]],
+    ):
+        """Новые бюллетени дочитываются в снимок, в том числе с новыми кодами и названиями"""
+        size = snapshot.columns.size
+        async with session_factory() as session:
+            await TradingService(session).mass_create_trading(trading_data)
+            await session.commit()
+        await snapshot.load(session_factory)
+        assert snapshot.columns.size == size + len(trading_data)
+        for query in ({"limit": 50}, {"oil_id": "A100"}, {"start_date": date(2024, 8, 8)}):
+            assert snapshot.filter(**query) == await sql_filter(session_factory, **query)
+        assert snapshot.filter(oil_id="A592")[0]["delivery_basis_name"] == "Ачинский НПЗ"
+
+    async def test_build_runs_off_event_loop(
+        self,
+        snapshot: TradingSnapshot,
+        session_factory: async_sessionmaker[AsyncSession],
+        trading_data: list[dict[str, Any]],
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        """Колонки строятся в отдельном потоке, а до замены запросы читают прежний снимок"""
+        previous = snapshot.columns
+        build = TradingSnapshot._build
+        threads = []
+
+        def tracked_build(*args):
+            threads.append(threading.current_thread())
+            assert snapshot.columns is previous
+            return build(*args)
+
+        monkeypatch.setattr(TradingSnapshot, "_build", staticmethod(tracked_build))
+        async with session_factory() as session:
+            await TradingService(session).mass_create_trading(trading_data)
+            await session.commit()
+        # Одновременные загрузки не дочитывают одни и те же строки дважды
+        await asyncio.gather(snapshot.load(session_factory), snapshot.load(session_factory))
+        assert threads == [threads[0]] and threads[0] is not threading.main_thread()
+        assert snapshot.columns.size == previous.size + len(trading_data)
+
+    async def test_rows_committed_out_of_id_order(
+        self,
+        snapshot: TradingSnapshot,
+        session_factory: async_sessionmaker[AsyncSession],
+        trading_data: list[dict[str, Any]],
+    ):
+        """Строка, зафиксированная позже строки с большим id, не теряется при дочитывании"""
+        size = snapshot.columns.size
+        async with session_factory() as first, session_factory() as second:
+            await TradingService(first).mass_create_trading(trading_data[:1])
+            await TradingService(second).mass_create_trading(trading_data[1:])
+            await second.commit()
+            await snapshot.load(session_factory)
+            assert snapshot.columns.size == size + len(trading_data) - 1
+            await first.commit()
+        await snapshot.load(session_factory)
+        assert snapshot.columns.size == size + len(trading_data)
+        for query in ({"limit": 50}, {"oil_id": trading_data[0]["oil_id"]}):
+            assert snapshot.filter(**query) == await sql_filter(session_factory, **query)
+
+    async def test_replaced_date_not_duplicated(
+        self,
+        snapshot: TradingSnapshot,
+        session_factory: async_sessionmaker[AsyncSession],
+        trading_data: list[dict[str, Any]],
+    ):
+        """Дата, перезаписанная загрузкой с заменой, перечитывается в снимке без дублей"""
+        [day] = snapshot.get_last_dates(0, 1)
+        [replaced] = await sql_filter(session_factory, start_date=day, end_date=day, limit=1, fields=["id"])
+        bulletin = (day, [row | {"date": day} for row in trading_data])
+        await BulletinWriter(session_factory, IngestionStats(), replace=True).write([bulletin])
+        await snapshot.load(session_factory)
+        query = {"start_date": day - timedelta(days=3), "end_date": day, "limit": 1000}
+        assert snapshot.filter(**query) == await sql_filter(session_factory, **query)
+        assert len(snapshot.filter(start_date=day, end_date=day, limit=1000)) == len(trading_data)
+        assert replaced["id"] not in snapshot.columns.numbers["id"]
+
+    async def test_outdated_snapshot_not_used(self, snapshot: TradingSnapshot, monkeypatch: pytest.MonkeyPatch):
+        """Пока снимок не догнал версию данных, запросы выполняются в БД"""
+        monkeypatch.setattr(settings, "SNAPSHOT_ENABLED", True)
+        monkeypatch.setattr(dependencies, "trading_snapshot", snapshot)
+        version_service = AsyncMock()
+        version_service.get.return_value = snapshot.version = DataVersion(
+            last_date=date(2024, 8, 8), updated_at=datetime(2024, 8, 8, tzinfo=timezone.utc)
+        )
+        assert await dependencies.snapshot(version_service) is snapshot
+        version_service.get.return_value = DataVersion(
+            last_date=date(2024, 8, 9), updated_at=datetime(2024, 8, 9, tzinfo=timezone.utc)
+        )
+        assert await dependencies.snapshot(version_service) is None
+
+    async def test_watch_reloads_on_event(
+        self,
+        snapshot: TradingSnapshot,
+        session_factory: async_sessionmaker[AsyncSession],
+        trading_data: list[dict[str, Any]],
+    ):
+        """Событие о новом торговом дне запускает дочитывание сразу, не дожидаясь периода проверки"""
+        size = snapshot.columns.size
+        version_service = AsyncMock()
+        version_service.get.return_value = snapshot.version
+        events = TradingEventBroker()
+        task = asyncio.create_task(snapshot.watch(session_factory, version_service, interval=60, events=events))
+        try:
+            await asyncio.sleep(0.1)
+            async with session_factory() as session:
+                await TradingService(session).mass_create_trading(trading_data)
+                await session.commit()
+            version = DataVersion(last_date=date(2024, 8, 9), updated_at=datetime(2024, 8, 9, tzinfo=timezone.utc))
+            version_service.get.return_value = version
+            events.broadcast('{"date":"2024-08-09"}')
+            async with asyncio.timeout(5):
+                while snapshot.version != version:
+                    await asyncio.sleep(0.05)
+            assert snapshot.columns.size == size + len(trading_data)
+        finally:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        assert not events.listeners
+
+    @pytest.mark.usefixtures("test_redis_cache")
+    async def test_service_reads_from_snapshot(self, snapshot: TradingSnapshot, dataset: SyntheticDataset):
+        """Сервис с загруженным снимком не обращается к БД"""
+
+        class NoSession:
+            def __getattr__(self, name: str):
+                raise AssertionError("Запрос к БД при загруженном снимке")
+
+        service = TradingService(NoSession(), snapshot)
+        assert await service.get_last_dates(limit=3) == snapshot.get_last_dates(0, 3)
+        oil_id = dataset.oil_ids[0]
+        assert await service.filter(oil_id=oil_id, limit=5) == snapshot.filter(oil_id=oil_id, limit=5)
@@ -1,14 +1,19 @@
+import json
 import operator
 from datetime import date
 from typing import Any
 
 import pytest
+from fastapi_cache import FastAPICache
+from services.catalog import CatalogService
 from services.tradings import TradingService
-from sqlalchemy import func, insert, select
+from sqlalchemy import event, func, select
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession, create_async_engine
 
-from database.models import SpimexTradingResults
+from configs.config import settings
+from database.database import LazySession, RoutingSession
+from database.models import DeliveryBasis, ExchangeProduct, SpimexTradingResults
 
 
 @pytest.mark.usefixtures("populate_test_database", "test_redis_cache")
@@ -22,6 +27,17 @@ class TestTradingServiceRead:
         assert len(response) == len(trading_data)
         assert response == sorted([obj["date"] for obj in trading_data], reverse=True)
 
+    async def test_cache_hit_does_not_create_session(self, session_factory, trading_data: list[dict[str, Any]]):
+        """Тест что при попадании в кэш сессия БД не создается"""
+        lazy = LazySession(session_factory)
+        assert len(await TradingService(lazy).filter(limit=100)) == len(trading_data)
+        assert lazy.started
+        await lazy.close()
+
+        lazy = LazySession(session_factory)
+        assert len(await TradingService(lazy).filter(limit=100)) == len(trading_data)
+        assert not lazy.started
+
     async def test_fetch_all_trading_results(self, session: AsyncSession, trading_data):
         """Тест получения всех торговых результатов без фильтров"""
         service = TradingService(session)
@@ -107,13 +123,29 @@ class TestTradingServiceRead:
         ]
         service = TradingService(session)
         result_1 = await service.get_last_dates()
-        await session.execute(insert(SpimexTradingResults), new_data)
+        await service.mass_create_trading(new_data)
         await session.commit()
         result_2 = await service.get_last_dates()
         assert len(result_1) == len(result_2)
         count_in_db = await session.scalar(select(func.count()).select_from(SpimexTradingResults))
         assert count_in_db == len(result_2) + 1
 
+    async def test_filter_reuses_prepared_statement(self, session: AsyncSession, trading_data: list[dict[str, Any]]):
+        """Запросы одной формы с разными значениями используют одно подготовленное выражение asyncpg"""
+        connection = await session.connection()
+        raw_connection = await connection.get_raw_connection()
+        statement_cache = raw_connection.dbapi_connection._prepared_statement_cache
+        service = TradingService(session)
+        oil_ids = sorted({obj["oil_id"] for obj in trading_data})
+        await FastAPICache.clear()
+        await service.filter(oil_id=oil_ids[0], limit=5)
+        prepared = len(statement_cache)
+        for oil_id in oil_ids[1:]:
+            await service.filter(oil_id=oil_id, limit=3, offset=1)
+        assert len(statement_cache) == prepared
+        await service.filter(oil_id=oil_ids[0], end_date=date.today())
+        assert len(statement_cache) == prepared + 1
+
 
 class TestTradingServiceWrite:
     """Тестирование сохранения данных в БД сервисов TradingService"""
@@ -149,5 +181,81 @@ class TestTradingServiceWrite:
         invalid_data = trading_data[0].copy()
         invalid_data[field] = 11111 if isinstance(invalid_data[field], str) else "invalid"
         with pytest.raises(SQLAlchemyError):
-            await service.mass_create_trading(invalid_data)
+            await service.mass_create_trading([invalid_data])
             await session.commit()
+
+    async def test_mass_create_trading_stores_names_in_references(
+        self, session: AsyncSession, trading_data: list[dict[str, Any]]
+    ):
+        """Тест словарного кодирования: названия хранятся в справочниках один раз и подставляются при чтении"""
+        service = TradingService(session)
+        await service.mass_create_trading(trading_data)
+        await service.mass_create_trading(trading_data)
+        await session.commit()
+        for model, field in ((ExchangeProduct, "exchange_product_name"), (DeliveryBasis, "delivery_basis_name")):
+            names = await session.scalars(select(model.name))
+            assert sorted(names.all()) == sorted({obj[field] for obj in trading_data})
+
+        results = await session.scalars(select(SpimexTradingResults).order_by(SpimexTradingResults.id))
+        for obj, result in zip(trading_data * 2, results.all()):
+            assert result.exchange_product_name == obj["exchange_product_name"]
+            assert result.delivery_basis_name == obj["delivery_basis_name"]
+
+
+@pytest.mark.usefixtures("populate_test_database")
+class TestCatalogService:
+    """Тестирование справочников кодов CatalogService"""
+
+    async def test_refresh_updates_cached_catalog(
+        self, session: AsyncSession, test_redis_cache, trading_data: list[dict[str, Any]]
+    ):
+        """Тест что справочник хранится в кеше и пересчитывается методом refresh после загрузки данных"""
+        service = CatalogService(session, FastAPICache.get_backend(), FastAPICache.get_prefix())
+        oils = json.loads(await service.get("oils"))
+        assert [item["code"] for item in oils] == sorted({obj["oil_id"] for obj in trading_data})
+
+        new_data = {**trading_data[0], "oil_id": "B111", "date": date(2024, 8, 10)}
+        await TradingService(session).mass_create_trading([new_data])
+        await session.commit()
+        assert json.loads(await service.get("oils")) == oils
+
+        await service.refresh()
+        oils = {item["code"]: item for item in json.loads(await service.get("oils"))}
+        assert oils["B111"] == {"code": "B111", "name": None, "first_date": "2024-08-10", "last_date": "2024-08-10", "count": 1}
+
+
+@pytest.mark.usefixtures("test_redis_cache")
+class TestReadReplicaRouting:
+    """Тестирование маршрутизации чтения на реплику через RoutingSession"""
+
+    async def test_reads_use_replica_and_writes_use_primary(self, test_database_engine, trading_data):
+        """Чтение TradingService идет на реплику, массовая вставка и справочники - на основной сервер"""
+        replica_engine = create_async_engine(settings.get_test_db_postgres_url())
+        statements = {"primary": [], "replica": []}
+        for name, engine in (("primary", test_database_engine), ("replica", replica_engine)):
+            event.listen(
+                engine.sync_engine,
+                "before_cursor_execute",
+                lambda conn, cursor, statement, *args, name=name: statements[name].append(statement),
+            )
+        session_factory = async_sessionmaker(
+            sync_session_class=RoutingSession,
+            primary=test_database_engine.sync_engine,
+            replica=replica_engine.sync_engine,
+        )
+        try:
+            async with session_factory() as session:
+                await TradingService(session).mass_create_trading(trading_data)
+                await session.commit()
+            assert any(statement.startswith("INSERT INTO spimex_trading_results") for statement in statements["primary"])
+            assert any(statement.startswith("INSERT INTO exchange_products") for statement in statements["primary"])
+            assert statements["replica"] == []
+            primary_statements = len(statements["primary"])
+
+            async with session_factory() as session:
+                results = await TradingService(session).filter(limit=100)
+            assert len(results) == len(trading_data)
+            assert any(statement.startswith("SELECT") for statement in statements["replica"])
+            assert len(statements["primary"]) == primary_statements
+        finally:
+            await replica_engine.dispose()
@@ -0,0 +1,40 @@
+from collections.abc import AsyncGenerator
+from datetime import date, datetime
+from unittest.mock import AsyncMock
+
+import pytest_asyncio
+from aiohttp import ClientSession
+from benchmarks.spimex_stub import start_server, StubConfig
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+from watcher import BulletinWatcher
+
+from database.models import SpimexTradingResults
+
+STUB_CONFIG = StubConfig(files=6, files_per_page=3, rows_per_file=10, last_date=date(2024, 12, 30))
+
+
+@pytest_asyncio.fixture
+async def stub_url() -> AsyncGenerator[str, None]:
+    """Запускает локальную замену spimex.com"""
+    runner, base_url = await start_server(STUB_CONFIG)
+    yield base_url
+    await runner.cleanup()
+
+
+async def test_poll_loads_new_bulletins(stub_url: str, session_factory: async_sessionmaker[AsyncSession]):
+    """Новые бюллетени первой страницы загружаются один раз, после загрузки вызывается обновление"""
+    on_loaded = AsyncMock()
+    watcher = BulletinWatcher(
+        stub_url, session_factory, on_loaded=on_loaded, clock=lambda: datetime(2024, 12, 30, 14, 15)
+    )
+    watcher.latest_date = date(2024, 12, 26)
+    async with ClientSession() as session:
+        assert await watcher.poll(session) == 2
+        assert await watcher.poll(session) == 0
+    async with session_factory() as db:
+        loaded_dates = set((await db.scalars(select(SpimexTradingResults.date).distinct())).all())
+    assert loaded_dates == {date(2024, 12, 30), date(2024, 12, 27)}
+    assert watcher.latest_date == date(2024, 12, 30)
+    assert not watcher.is_due(datetime(2024, 12, 30, 14, 15))
+    on_loaded.assert_awaited_once()
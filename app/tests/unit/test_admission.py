@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+from services.admission import AdmissionLimiter
+
+from exceptions import Overloaded
+
+
+class TestAdmissionLimiter:
+    """Тестирование контроля допуска запросов к БД"""
+
+    async def test_queue_overflow_rejected(self):
+        """Запрос сверх очереди отклоняется сразу, ожидающий получает место после освобождения"""
+        limiter = AdmissionLimiter("test", concurrency=1, queue_size=1, queue_timeout=5, retry_after=3)
+        entered = []
+
+        async def request(name: str) -> None:
+            async with limiter:
+                entered.append(name)
+
+        async with limiter:
+            queued = asyncio.create_task(request("queued"))
+            await asyncio.sleep(0)
+            assert limiter.waiting == 1
+            with pytest.raises(Overloaded) as exc_info:
+                await asyncio.wait_for(request("rejected"), timeout=1)
+            assert exc_info.value.retry_after == 3
+        await queued
+        assert entered == ["queued"]
+
+    async def test_queue_timeout(self):
+        """Запрос, не дождавшийся места за queue_timeout, отклоняется и покидает очередь"""
+        limiter = AdmissionLimiter("test", concurrency=1, queue_size=1, queue_timeout=0.05)
+        async with limiter:
+            with pytest.raises(Overloaded):
+                async with limiter:
+                    pass
+        assert limiter.waiting == 0
+        async with limiter:
+            assert limiter.semaphore.locked()
+        assert not limiter.semaphore.locked()
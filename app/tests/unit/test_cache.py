@@ -71,3 +71,47 @@ class TestCacheUnit:
         await getattr(trading_service, method)()
         assert mock_result.all.call_count == 1
         assert mock_session.scalars.call_count == 1
+
+    async def test_cache_shared_between_service_instances(
+        self, test_redis_cache: aioredis.Redis, mock_session: AsyncMock, trading_data: list[dict[str, Any]]
+    ):
+        """Тестируем что кеш не зависит от экземпляра сервиса, который создается на каждый запрос"""
+        mock_result = Mock()
+        mock_result.all.return_value = trading_data
+        mock_session.scalars.return_value = mock_result
+        await TradingService(mock_session).filter(oil_id="A100", limit=5)
+        await TradingService(mock_session).filter(limit=5, oil_id="A100")
+
+        keys = [key async for key in test_redis_cache.scan_iter("test-cache:*")]
+        assert len(keys) == 1
+        assert mock_session.scalars.call_count == 1
+
+    async def test_cache_key_includes_fields(
+        self, test_redis_cache: aioredis.Redis, mock_session: AsyncMock, trading_data: list[dict[str, Any]]
+    ):
+        """Тестируем что проекция (`fields`) входит в ключ кеша"""
+        mock_result = Mock()
+        mock_result.all.return_value = trading_data
+        mock_result.mappings.return_value = [{"oil_id": obj["oil_id"]} for obj in trading_data]
+        mock_session.scalars.return_value = mock_result
+        mock_session.execute.return_value = mock_result
+        trading_service = TradingService(mock_session)
+        await trading_service.filter()
+        await trading_service.filter(fields=["oil_id"])
+
+        keys = [key async for key in test_redis_cache.scan_iter("test-cache:*")]
+        assert len(keys) == 2
+
+    @patch("utils.redis_client.datetime")
+    async def test_ttl_counted_from_write_time(
+        self, mock_datetime: Mock, test_redis_cache: aioredis.Redis, mock_session: AsyncMock
+    ):
+        """Время жизни ключа отсчитывается от момента записи, а не от импорта модуля"""
+        mock_datetime.now.return_value = datetime(2025, 3, 31, 14, 0, 0)
+        mock_result = Mock()
+        mock_result.all.return_value = []
+        mock_session.scalars.return_value = mock_result
+        await TradingService(mock_session).get_last_dates()
+
+        keys = [key async for key in test_redis_cache.scan_iter("test-cache:*")]
+        assert await test_redis_cache.ttl(keys[0]) == 11 * 60
@@ -1,9 +1,18 @@
+import json
 import operator
+from datetime import date, datetime, timezone
 from typing import Any
 from unittest.mock import AsyncMock
 
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy.exc import DBAPIError
+
+from api.cancellation import QUERY_CANCELED
+from api.dependencies import trading_event_broker
+from configs.config import settings
+from exceptions import Overloaded
+from schemas.tradings import DataVersion, TradingDayEvent
 
 
 class TestEndpoints:
@@ -108,3 +117,188 @@ class TestEndpoints:
         assert mock_trading_service.filter.call_count == 1
         assert response.status_code == 200
         assert len(response.json()) == len(expected)
+
+    @pytest.mark.parametrize("url", ("/trading/trading_results", "/trading/dynamics"))
+    def test_fields_projection(
+        self,
+        client: TestClient,
+        mock_trading_service: AsyncMock,
+        trading_data_with_id: list[dict[str, Any]],
+        url: str,
+    ):
+        """Проверяет, что параметр `fields` передается в сервис и ограничивает поля ответа."""
+        fields = ["date", "oil_id", "volume"]
+        mock_trading_service.filter.return_value = [
+            {field: obj[field] for field in fields} for obj in trading_data_with_id
+        ]
+        response = client.get(f"{url}?fields=volume,date&fields=oil_id")
+        assert response.status_code == 200
+        assert mock_trading_service.filter.call_args.kwargs["fields"] == ["oil_id", "volume", "date"]
+        assert all(obj.keys() == set(fields) for obj in response.json())
+
+    @pytest.mark.parametrize("fields", ("unknown", "oil_id,created_on", ""))
+    def test_fields_projection_with_invalid_fields(
+        self, client: TestClient, mock_trading_service: AsyncMock, fields: str
+    ):
+        """Проверяет, что поля, отсутствующие в схеме `Trading`, отклоняются с ошибкой 422."""
+        response = client.get(f"/trading/trading_results?fields={fields}")
+        assert response.status_code == 422
+        assert mock_trading_service.filter.call_count == 0
+
+    def test_batch_results(
+        self, client: TestClient, mock_trading_batch_service: AsyncMock, trading_data_with_id: list[dict[str, Any]]
+    ):
+        """Проверяет, что эндпоинт `/trading/batch` передает все запросы пакета в сервис и сохраняет их порядок."""
+        mock_trading_batch_service.filter_many.return_value = [trading_data_with_id[:1], trading_data_with_id[1:]]
+        queries = [{"oil_id": "A100", "limit": 5}, {"start_date": "2024-08-08", "fields": ["oil_id", "date"]}]
+        response = client.post("/trading/batch", json={"queries": queries})
+        assert response.status_code == 200
+        assert [len(results) for results in response.json()] == [1, len(trading_data_with_id) - 1]
+        actual_queries = mock_trading_batch_service.filter_many.call_args[0][0]
+        assert actual_queries[0] == {"oil_id": "A100", "limit": 5}
+        assert actual_queries[1]["fields"] == ["oil_id", "date"]
+
+    @pytest.mark.parametrize(
+        "queries",
+        ([], [{"oil_id": ""}], [{"fields": ["unknown"]}], [{}] * 51),
+    )
+    def test_batch_results_with_invalid_queries(
+        self, client: TestClient, mock_trading_batch_service: AsyncMock, queries: list[dict[str, Any]]
+    ):
+        """Проверяет, что пустой, слишком большой или невалидный пакет отклоняется с ошибкой 422."""
+        response = client.post("/trading/batch", json={"queries": queries})
+        assert response.status_code == 422
+        assert mock_trading_batch_service.filter_many.call_count == 0
+
+    @pytest.mark.parametrize("catalog", ("oils", "bases", "delivery_types"))
+    def test_catalog_etag(self, client: TestClient, mock_catalog_service: AsyncMock, catalog: str):
+        """Проверяет, что справочники отдаются с ETag, а при совпадении If-None-Match возвращается 304."""
+        items = [{"code": "A100", "name": None, "first_date": "2024-08-07", "last_date": "2024-08-09", "count": 3}]
+        mock_catalog_service.get.return_value = json.dumps(items).encode()
+        response = client.get(f"/trading/catalog/{catalog}")
+        assert response.status_code == 200
+        assert response.json() == items
+        assert mock_catalog_service.get.call_args[0][0] == catalog
+        etag = response.headers["ETag"]
+
+        response = client.get(f"/trading/catalog/{catalog}", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+
+    @pytest.mark.parametrize(
+        "url, method",
+        (
+            ("/trading/last_trading_dates", "get_last_dates"),
+            ("/trading/dynamics?oil_id=A100", "filter"),
+            ("/trading/trading_results?fields=date,oil_id", "filter"),
+        ),
+    )
+    def test_conditional_response(
+        self,
+        client: TestClient,
+        mock_trading_service: AsyncMock,
+        mock_data_version_service: AsyncMock,
+        url: str,
+        method: str,
+    ):
+        """Проверяет ETag/Last-Modified по версии данных и ответ 304 без обращения к сервису."""
+        mock_data_version_service.get.return_value = DataVersion(
+            last_date=date(2024, 8, 9), updated_at=datetime(2024, 8, 9, 11, 15, tzinfo=timezone.utc)
+        )
+        getattr(mock_trading_service, method).return_value = []
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.headers["Last-Modified"] == "Fri, 09 Aug 2024 11:15:00 GMT"
+        assert response.headers["Cache-Control"].startswith("public, max-age=")
+        etag = response.headers["ETag"]
+
+        for headers in ({"If-None-Match": etag}, {"If-Modified-Since": response.headers["Last-Modified"]}):
+            response = client.get(url, headers=headers)
+            assert response.status_code == 304
+            assert response.headers["ETag"] == etag
+        assert getattr(mock_trading_service, method).call_count == 1
+
+        # Новая версия данных меняет ETag
+        mock_data_version_service.get.return_value = DataVersion(
+            last_date=date(2024, 8, 12), updated_at=datetime(2024, 8, 12, 11, 15, tzinfo=timezone.utc)
+        )
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+    def test_conditional_etag_depends_on_query(
+        self, client: TestClient, mock_trading_service: AsyncMock, mock_data_version_service: AsyncMock
+    ):
+        """Проверяет, что ETag зависит от параметров запроса, но не от порядка полей в `fields`."""
+        mock_data_version_service.get.return_value = DataVersion(
+            last_date=date(2024, 8, 9), updated_at=datetime(2024, 8, 9, 11, 15, tzinfo=timezone.utc)
+        )
+        mock_trading_service.filter.return_value = []
+        etags = [
+            client.get(url).headers["ETag"]
+            for url in (
+                "/trading/dynamics?fields=date,oil_id",
+                "/trading/dynamics?fields=oil_id&fields=date",
+                "/trading/dynamics?fields=date,oil_id&oil_id=A100",
+            )
+        ]
+        assert etags[0] == etags[1]
+        assert etags[0] != etags[2]
+
+    def test_events_stream(self, client: TestClient, test_app):
+        """Проверяет, что `/trading/events` отдает поток событий в формате Server-Sent Events."""
+
+        class FiniteEvents:
+            async def stream(self):
+                yield "event: trading_day\ndata: {}\n\n".format(
+                    TradingDayEvent(date=date(2024, 8, 9), rows=10, instruments=5).model_dump_json()
+                )
+
+        test_app.dependency_overrides[trading_event_broker] = FiniteEvents
+        response = client.get("/trading/events")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.headers["cache-control"] == "no-cache"
+        assert response.text == 'event: trading_day\ndata: {"date":"2024-08-09","rows":10,"instruments":5}\n\n'
+
+    @pytest.mark.parametrize(
+        "url",
+        (
+            f"/trading/trading_results?limit={settings.API_MAX_LIMIT + 1}",
+            f"/trading/last_trading_dates?limit={settings.API_MAX_LIMIT + 1}",
+            "/trading/trading_results?limit=0",
+            "/trading/trading_results?offset=-1",
+        ),
+    )
+    def test_limit_cap(self, client: TestClient, mock_trading_service: AsyncMock, url: str):
+        """Проверяет, что `limit` больше `API_MAX_LIMIT` (и некорректные `limit`/`offset`) отклоняются без запроса к БД."""
+        response = client.get(url)
+        assert response.status_code == 422
+        assert mock_trading_service.filter.call_count == 0
+        assert mock_trading_service.get_last_dates.call_count == 0
+
+    def test_batch_limit_cap(self, client: TestClient, mock_trading_batch_service: AsyncMock):
+        """Проверяет, что пакет с `limit` больше `API_MAX_LIMIT` в одном из запросов отклоняется."""
+        queries = [{"oil_id": "A100"}, {"limit": settings.API_MAX_LIMIT + 1}]
+        response = client.post("/trading/batch", json={"queries": queries})
+        assert response.status_code == 422
+        assert mock_trading_batch_service.filter_many.call_count == 0
+
+    def test_statement_timeout(self, client: TestClient, mock_trading_service: AsyncMock):
+        """Проверяет, что запрос, прерванный по statement_timeout, получает ответ 504."""
+
+        class QueryCanceledError(Exception):
+            sqlstate = QUERY_CANCELED
+
+        mock_trading_service.filter.side_effect = DBAPIError("SELECT", {}, QueryCanceledError())
+        response = client.get("/trading/dynamics?start_date=2000-01-01")
+        assert response.status_code == 504
+
+    def test_overloaded(self, client: TestClient, mock_trading_service: AsyncMock):
+        """Проверяет, что запрос, не допущенный к БД при перегрузке, получает 503 с Retry-After."""
+        mock_trading_service.get_last_dates.side_effect = Overloaded("dates", retry_after=2)
+        response = client.get("/trading/last_trading_dates")
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "2"
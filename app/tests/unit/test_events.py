@@ -0,0 +1,27 @@
+import asyncio
+
+from services.events import TradingEventBroker
+
+
+async def test_buffer_keeps_latest_events():
+    """Переполненный буфер подключения отбрасывает старые события"""
+    broker = TradingEventBroker(buffer_size=2)
+    async with broker.subscribe() as queue:
+        for payload in ("1", "2", "3"):
+            broker.broadcast(payload)
+        assert [queue.get_nowait() for _ in range(queue.qsize())] == ["2", "3"]
+    assert not broker.subscribers
+
+
+async def test_stream_sends_events_and_heartbeats():
+    """Поток отдает события в формате SSE, а без событий - пустые комментарии"""
+    broker = TradingEventBroker()
+    stream = broker.stream(heartbeat=0.05)
+    assert await anext(stream) == "retry: 50\n\n"
+    assert await anext(stream) == ": ping\n\n"
+    next_message = asyncio.ensure_future(anext(stream))
+    await asyncio.sleep(0)
+    broker.broadcast('{"date":"2024-08-09"}')
+    assert await next_message == 'event: trading_day\ndata: {"date":"2024-08-09"}\n\n'
+    await stream.aclose()
+    assert not broker.subscribers
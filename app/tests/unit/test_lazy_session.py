@@ -0,0 +1,41 @@
+from unittest.mock import AsyncMock, Mock
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database import get_db, LazySession
+
+
+async def test_session_is_created_on_first_access():
+    """Сессия создается при первом обращении к ее атрибутам и переиспользуется"""
+    session = AsyncMock(spec=AsyncSession)
+    factory = Mock(return_value=session)
+    lazy = LazySession(factory)
+    assert not lazy.started
+    factory.assert_not_called()
+
+    await lazy.scalars("stmt")
+    await lazy.execute("stmt")
+    factory.assert_called_once_with()
+    session.scalars.assert_awaited_once_with("stmt")
+    assert lazy.started
+
+    await lazy.close()
+    session.close.assert_awaited_once()
+    assert not lazy.started
+
+
+async def test_close_without_session_does_nothing():
+    """Закрытие неиспользованной сессии не создает ее"""
+    factory = Mock()
+    lazy = LazySession(factory)
+    await lazy.close()
+    factory.assert_not_called()
+
+
+async def test_get_db_yields_lazy_session():
+    """Зависимость get_db отдает ленивую сессию, не обращаясь к пулу соединений"""
+    dependency = get_db()
+    db = await anext(dependency)
+    assert isinstance(db, LazySession)
+    assert not db.started
+    await dependency.aclose()
@@ -0,0 +1,117 @@
+import io
+import json
+import logging
+import queue
+import threading
+
+from configs.logging_config import (
+    attach_queue,
+    create_handlers,
+    JsonFormatter,
+    NonBlockingQueueHandler,
+)
+
+
+class BlockingHandler(logging.Handler):
+    """Обработчик, который ждет разрешения на запись"""
+
+    def __init__(self):
+        super().__init__()
+        self.unblock = threading.Event()
+        self.records: list[logging.LogRecord] = []
+
+    def emit(self, record):
+        self.unblock.wait(5)
+        self.records.append(record)
+
+
+def make_logger(name: str) -> logging.Logger:
+    target = logging.getLogger(f"tests.logging.{name}")
+    target.propagate = False
+    target.setLevel(logging.INFO)
+    return target
+
+
+def test_json_formatter_with_exception():
+    """Запись форматируется в одну строку JSON с текстом исключения"""
+    target = make_logger("json")
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    target.addHandler(handler)
+    try:
+        raise ValueError("плохой файл")
+    except ValueError:
+        target.error("Ошибка при разборе %s", "файла", exc_info=True)
+    target.removeHandler(handler)
+
+    line = stream.getvalue().strip()
+    assert "\n" not in line
+    document = json.loads(line)
+    assert document["level"] == "ERROR"
+    assert document["logger"] == "tests.logging.json"
+    assert document["message"] == "Ошибка при разборе файла"
+    assert "ValueError: плохой файл" in document["exception"]
+
+
+def test_queue_writes_in_background(tmp_path):
+    """Записи передаются через очередь обработчикам в фоновом потоке"""
+    target = make_logger("queue")
+    stream = io.StringIO()
+    listener = attach_queue(target, create_handlers(tmp_path / "app.log", stream=stream))
+    try:
+        raise KeyError("oil_id")
+    except KeyError:
+        target.error("Ошибка в строке %s", 7, exc_info=True)
+    target.debug("Ниже уровня логгера %s", object())
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+    lines = (tmp_path / "app.log").read_text(encoding="utf-8").splitlines()
+    assert stream.getvalue().splitlines() == lines
+    [document] = [json.loads(line) for line in lines]
+    assert document["message"] == "Ошибка в строке 7"
+    assert "KeyError: 'oil_id'" in document["exception"]
+
+
+def test_full_queue_drops_records():
+    """Переполненная очередь отбрасывает записи, а остановка дописывает оставшиеся"""
+    target = make_logger("full")
+    handler = BlockingHandler()
+    listener = attach_queue(target, [handler], queue_size=2)
+    [queue_handler] = target.handlers
+    assert isinstance(queue_handler, NonBlockingQueueHandler)
+    for index in range(10):
+        target.info("Запись %s", index)
+    assert queue_handler.dropped >= 10 - 3
+
+    stopper = threading.Thread(target=listener.stop)
+    stopper.start()
+    stopper.join(0.1)
+    assert stopper.is_alive()
+    handler.unblock.set()
+    stopper.join(5)
+    assert not stopper.is_alive()
+    assert len(handler.records) == 10 - queue_handler.dropped
+
+
+def test_dropped_records_are_reported():
+    """Записи WARNING ждут места в очереди, об отброшенных записях пишется предупреждение"""
+    log_queue = queue.Queue(maxsize=2)
+    handler = NonBlockingQueueHandler(log_queue, block_timeout=0.01, report_interval=0)
+    target = make_logger("report")
+    target.addHandler(handler)
+    for index in range(3):
+        target.info("Запись %s", index)
+    target.warning("Предупреждение")
+    assert handler.dropped == 2
+
+    log_queue.get_nowait()
+    log_queue.get_nowait()
+    target.info("Запись после переполнения")
+    target.removeHandler(handler)
+    record, report = log_queue.get_nowait(), log_queue.get_nowait()
+    assert record.getMessage() == "Запись после переполнения"
+    assert report.levelno == logging.WARNING
+    assert report.getMessage() == "Очередь лога переполнена, отброшено записей: 2 (всего 2)"
@@ -0,0 +1,117 @@
+from pathlib import Path
+
+import pytest
+import redis.asyncio as aioredis
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from api.middleware import PrometheusMiddleware
+from api.routers.metrics import router as metrics_router
+from configs.config import settings
+from utils.ingestion_stats import IngestionStats
+from utils.metrics import (
+    cache_method,
+    instrument_engine,
+    InstrumentedQueuePool,
+    write_ingestion_metrics,
+)
+from utils.redis_client import InstrumentedRedisBackend
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.parametrize(
+    "key, expected",
+    [
+        ("test-cache:TradingService.filter:abc", "TradingService.filter"),
+        ("test-cache:catalog:oils", "catalog"),
+        ("test-cache:data_version", "data_version"),
+        ("test-cache::abc", "unknown"),
+    ],
+)
+def test_cache_method(key: str, expected: str):
+    """Метка метода извлекается из пространства имен ключа кэша"""
+    assert cache_method(key, "test-cache") == expected
+
+
+@pytest.mark.usefixtures("test_redis_cache")
+async def test_backend_counts_hits_and_misses(test_redis_cache: aioredis.Redis):
+    """Бэкенд кэша считает попадания и промахи по методам и время команд Redis"""
+    backend = InstrumentedRedisBackend(test_redis_cache, "test-cache")
+    key = "test-cache:TradingService.get_last_dates:key"
+    labels = {"method": "TradingService.get_last_dates"}
+    misses = sample("cache_requests_total", result="miss", **labels)
+    hits = sample("cache_requests_total", result="hit", **labels)
+    commands = sample("redis_command_duration_seconds_count", command="get_with_ttl")
+
+    assert (await backend.get_with_ttl(key))[1] is None
+    await backend.set(key, b"[]", 60)
+    assert (await backend.get_with_ttl(key))[1] is not None
+
+    assert sample("cache_requests_total", result="miss", **labels) == misses + 1
+    assert sample("cache_requests_total", result="hit", **labels) == hits + 1
+    assert sample("redis_command_duration_seconds_count", command="get_with_ttl") == commands + 2
+
+
+def test_middleware_records_route_template():
+    """Время запроса записывается с шаблоном пути маршрута, а не с фактическим URL"""
+    app = FastAPI()
+    app.add_middleware(PrometheusMiddleware)
+    app.include_router(metrics_router)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    before = sample("http_request_duration_seconds_count", method="GET", route="/items/{item_id}", status="200")
+    with TestClient(app) as client:
+        assert client.get("/items/1").status_code == 200
+        assert client.get("/items/2").status_code == 200
+        assert client.get("/missing").status_code == 404
+        response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "http_request_duration_seconds" in response.text
+    assert (
+        sample("http_request_duration_seconds_count", method="GET", route="/items/{item_id}", status="200")
+        == before + 2
+    )
+    assert sample("http_request_duration_seconds_count", method="GET", route="unmatched", status="404") >= 1
+
+
+async def test_pool_metrics():
+    """Выдачи соединений и время ожидания пула попадают в метрики"""
+    engine = create_async_engine(
+        settings.get_test_db_postgres_url(), poolclass=InstrumentedQueuePool, pool_size=2, pool_logging_name="test"
+    )
+    instrument_engine(engine, "test")
+    checkouts = sample("db_pool_checkouts_total", engine="test")
+    waits = sample("db_pool_wait_seconds_count", engine="test")
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            assert sample("db_pool_checked_out", engine="test") == 1
+    finally:
+        await engine.dispose()
+    assert sample("db_pool_checkouts_total", engine="test") == checkouts + 1
+    assert sample("db_pool_wait_seconds_count", engine="test") == waits + 1
+    assert sample("db_pool_size", engine="test") == 2
+
+
+def test_write_ingestion_metrics(tmp_path: Path):
+    """Метрики загрузки сохраняются в текстовом формате Prometheus"""
+    stats = IngestionStats(pages=2, files=5, rows=100, errors=1)
+    with stats.stage("file"):
+        pass
+    stats.finish()
+    path = tmp_path / "metrics" / "ingestion.prom"
+    write_ingestion_metrics(stats, path)
+    content = path.read_text()
+    assert "spimex_ingestion_files 5.0" in content
+    assert "spimex_ingestion_rows 100.0" in content
+    assert "spimex_ingestion_failures 1.0" in content
+    assert 'spimex_ingestion_stage_calls{stage="file"} 1.0' in content
@@ -0,0 +1,49 @@
+from datetime import date
+
+from benchmarks.spimex_stub import build_page
+
+from parsers.parser import Parser
+
+
+def test_extract_file_links():
+    """Ссылки и даты торгов извлекаются из элементов аккордеона"""
+    dates = [date(2024, 12, 30), date(2024, 12, 27)]
+    parser = Parser(build_page(dates), 2023, 2024)
+    assert parser.extract_file_links() == [
+        ("/upload/reports/oil_xls/oil_xls_20241230162000.xls", date(2024, 12, 30)),
+        ("/upload/reports/oil_xls/oil_xls_20241227162000.xls", date(2024, 12, 27)),
+    ]
+    assert not parser.reached_boundary
+
+
+def test_stops_at_min_year():
+    """Дата раньше минимального года останавливает разбор и обход страниц"""
+    dates = [date(2024, 1, 3), date(2023, 12, 29), date(2023, 12, 28)]
+    parser = Parser(build_page(dates), 2024, 2024)
+    assert parser.extract_file_links() == [("/upload/reports/oil_xls/oil_xls_20240103162000.xls", date(2024, 1, 3))]
+    assert parser.reached_boundary
+
+
+def test_skips_items_without_link_or_date():
+    """Элементы без ссылки на файл или без даты пропускаются"""
+    content = """
+        <div class="accordeon-inner__item"><p>Без ссылки <span>30.12.2024</span></p></div>
+        <div class="accordeon-inner__item">
+          <div class="accordeon-inner__item-inner__title"><a class="link xls" href="/file.xls">Скачать</a></div>
+        </div>
+        <div class="accordeon-inner__item">
+          <div class="accordeon-inner__item-inner__title">
+            <a class="xls link" href="/ok.xls">Скачать</a><p><span>27.12.2024</span></p>
+          </div>
+        </div>
+    """
+    parser = Parser(content, 2023, 2024)
+    assert parser.extract_file_links() == [("/ok.xls", date(2024, 12, 27))]
+    assert not parser.reached_boundary
+
+
+def test_empty_page_reaches_boundary():
+    """Страница без бюллетеней означает конец списка"""
+    parser = Parser(build_page([]), 2023, 2024)
+    assert parser.extract_file_links() == []
+    assert parser.reached_boundary
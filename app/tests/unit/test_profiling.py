@@ -0,0 +1,45 @@
+from contextlib import nullcontext
+
+from utils.profiling import current_profile, profile_stage, RequestProfile
+
+
+def test_profile_stage_without_profile_is_noop():
+    """Без профилирования возвращается общий пустой контекстный менеджер"""
+    assert isinstance(profile_stage("db"), nullcontext)
+    assert profile_stage("db") is profile_stage("cache")
+
+
+def test_profile_stage_accumulates_time():
+    """Время этапа накапливается в профиле текущего запроса"""
+    profile = RequestProfile()
+    token = current_profile.set(profile)
+    try:
+        with profile_stage("cache"):
+            pass
+        with profile_stage("cache"):
+            pass
+        profile.add("db", 0.002)
+    finally:
+        current_profile.reset(token)
+    assert profile.stages["cache"] > 0
+    assert profile.stages["db"] == 0.002
+
+
+def test_timings_split_request():
+    """Время запроса делится на зависимости, этапы эндпоинта и сериализацию"""
+    profile = RequestProfile()
+    profile.started = 0.0
+    profile.endpoint_started = 0.001
+    profile.add("db", 0.004)
+    profile.add("orm", 0.002)
+    profile.endpoint_finished = 0.010
+    profile.finished = 0.012
+    assert profile.timings() == {
+        "dependencies": 1.0,
+        "db": 4.0,
+        "orm": 2.0,
+        "endpoint": 3.0,
+        "serialization": 2.0,
+        "total": 12.0,
+    }
+    assert profile.server_timing().startswith("dependencies;dur=1.0, db;dur=4.0")
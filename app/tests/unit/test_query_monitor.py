@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from api.routers.admin import router as admin_router
+from configs.config import settings
+from utils.query_monitor import query_monitor, QueryMonitor
+
+
+@pytest.fixture
+async def engine():
+    engine = create_async_engine(settings.get_test_db_postgres_url())
+    yield engine
+    await engine.dispose()
+
+
+class TestQueryMonitor:
+    """Тестирование мониторинга медленных запросов"""
+
+    async def test_slow_select_is_recorded_with_plan(self, engine):
+        """Медленный SELECT сохраняется с параметрами, а его план снимается в фоне"""
+        monitor = QueryMonitor(threshold_ms=0, sample_rate=1.0, size=10)
+        monitor.instrument(engine)
+        async with engine.connect() as conn:
+            stmt = text("SELECT CAST(:value AS int) + 1 AS result").bindparams(bindparam("value", 41))
+            assert (await conn.execute(stmt)).scalar() == 42
+        await asyncio.gather(*monitor._tasks)
+
+        query = next(query for query in monitor.recent() if "+ 1" in query.statement)
+        assert query.parameters == (41,)
+        assert query.duration_ms >= 0
+        assert "actual time" in query.plan
+
+    async def test_fast_queries_are_not_recorded(self, engine):
+        """Запросы быстрее порога не сохраняются"""
+        monitor = QueryMonitor(threshold_ms=60_000, sample_rate=1.0, size=10)
+        monitor.instrument(engine)
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        assert monitor.recent() == []
+
+    async def test_plan_is_not_captured_for_writes(self, engine):
+        """Для запросов, изменяющих данные, план с ANALYZE не снимается"""
+        monitor = QueryMonitor(threshold_ms=0, sample_rate=1.0, size=10)
+        monitor.instrument(engine)
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE TEMPORARY TABLE monitor_test (id int)"))
+            await conn.execute(text("INSERT INTO monitor_test VALUES (1)"))
+        assert not monitor._tasks
+        assert all(query.plan is None for query in monitor.recent())
+
+    async def test_failed_query_start_is_discarded(self, engine):
+        """Время начала запроса, завершившегося ошибкой, не остается в info соединения"""
+        monitor = QueryMonitor(threshold_ms=60_000, sample_rate=0, size=10)
+        monitor.instrument(engine)
+        async with engine.connect() as conn:
+            with pytest.raises(DBAPIError):
+                await conn.execute(text("SELECT 1 / 0"))
+            assert conn.sync_connection.info["query_started"] == []
+            await conn.rollback()
+            await conn.execute(text("SELECT 1"))
+            assert conn.sync_connection.info["query_started"] == []
+
+    def test_buffer_size_is_limited(self):
+        """Буфер хранит только последние запросы"""
+        monitor = QueryMonitor(threshold_ms=0, sample_rate=0, size=2)
+        for i in range(3):
+            monitor.record(None, f"SELECT {i}", (), 1.0, False)
+        assert [query.statement for query in monitor.recent()] == ["SELECT 2", "SELECT 1"]
+
+
+class TestSlowQueriesEndpoint:
+    """Тестирование административного эндпоинта медленных запросов"""
+
+    @pytest.fixture
+    def admin_client(self, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+        app = FastAPI()
+        app.include_router(admin_router, prefix="/admin")
+        with TestClient(app) as client:
+            yield client
+
+    def test_requires_token(self, admin_client: TestClient):
+        assert admin_client.get("/admin/slow_queries").status_code == 403
+        assert admin_client.get("/admin/slow_queries", headers={"X-Admin-Token": "wrong"}).status_code == 403
+        assert admin_client.get("/admin/slow_queries", headers={"X-Admin-Token": "secre"}).status_code == 403
+
+    def test_disabled_without_configured_token(self, admin_client: TestClient, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(settings, "ADMIN_TOKEN", None)
+        assert admin_client.get("/admin/slow_queries", headers={"X-Admin-Token": "secret"}).status_code == 404
+
+    def test_returns_recent_queries(self, admin_client: TestClient, monkeypatch: pytest.MonkeyPatch):
+        monitor = QueryMonitor(threshold_ms=0, sample_rate=0, size=10)
+        monitor.record(None, "SELECT $1::int", (1,), 12.5, False)
+        monkeypatch.setattr(query_monitor, "slow_queries", monitor.slow_queries)
+        response = admin_client.get("/admin/slow_queries", headers={"X-Admin-Token": "secret"})
+        assert response.status_code == 200
+        assert response.json()[0]["statement"] == "SELECT $1::int"
+        assert response.json()[0]["parameters"] == [1]
+        assert response.json()[0]["duration_ms"] == 12.5
@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+from services.snapshot import TradingSnapshot
+
+
+@pytest.mark.parametrize("needed", (1, 10, 1500, 100_000))
+def test_intersect_matches_full_intersection(needed: int):
+    """Пересечение частями дает те же первые строки, что и полное пересечение"""
+    rng = np.random.default_rng(42)
+    postings = [
+        np.sort(rng.choice(50_000, size=size, replace=False)).astype(np.int32) for size in (20_000, 8_000, 30_000)
+    ]
+    expected = np.intersect1d(np.intersect1d(postings[0], postings[1]), postings[2])
+    assert TradingSnapshot._intersect(postings, needed).tolist() == expected[:needed].tolist()
+
+
+def test_intersect_with_empty_posting():
+    """Пустой список вхождений дает пустое пересечение"""
+    postings = [np.arange(10, dtype=np.int32), np.array([], dtype=np.int32)]
+    assert TradingSnapshot._intersect(postings, 5).tolist() == []
@@ -1,13 +1,33 @@
+import asyncio
 import operator
 from typing import Any
-from unittest.mock import AsyncMock, Mock
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
-from services.tradings import TradingService
-from sqlalchemy import insert, select
+from services.tradings import (
+    build_filter_statement,
+    TradingBatchService,
+    TradingService,
+)
+from sqlalchemy import bindparam, insert, Select, select
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import with_expression
 
-from database.models import SpimexTradingResults
+from database.models import DeliveryBasis, ExchangeProduct, SpimexTradingResults
+
+
+def select_with_names() -> Select:
+    """Запрос записей торгов с названиями из справочников."""
+    model = SpimexTradingResults
+    return (
+        select(model)
+        .options(
+            with_expression(model.exchange_product_name, ExchangeProduct.name),
+            with_expression(model.delivery_basis_name, DeliveryBasis.name),
+        )
+        .join(ExchangeProduct, ExchangeProduct.id == model.exchange_product_name_id)
+        .join(DeliveryBasis, DeliveryBasis.id == model.delivery_basis_name_id)
+    )
 
 
 @pytest.mark.usefixtures("test_redis_cache")
@@ -44,9 +64,15 @@ class TestTradingServiceRead:
         assert len(response) == len(trading_data)
         assert mock_session.scalars.call_count == 1
         assert mock_result.all.call_count == 1
-        expected_stmt = select(SpimexTradingResults).limit(10).offset(0)
-        actual_stmt = mock_session.scalars.call_args[0][0]
+        expected_stmt = (
+            select_with_names()
+            .order_by(SpimexTradingResults.date.desc(), SpimexTradingResults.id.desc())
+            .limit(bindparam("limit"))
+            .offset(bindparam("offset"))
+        )
+        actual_stmt, params = mock_session.scalars.call_args[0]
         assert str(expected_stmt) == str(actual_stmt)
+        assert params == {"limit": 10, "offset": 0}
 
     @pytest.mark.parametrize(
         "field",
@@ -65,10 +91,15 @@ class TestTradingServiceRead:
         assert mock_session.scalars.call_count == 1
         assert mock_result.all.call_count == 1
         expected_stmt = (
-            select(SpimexTradingResults).where(getattr(SpimexTradingResults, field) == query_data).limit(10).offset(0)
+            select_with_names()
+            .where(getattr(SpimexTradingResults, field) == bindparam(field))
+            .order_by(SpimexTradingResults.date.desc(), SpimexTradingResults.id.desc())
+            .limit(bindparam("limit"))
+            .offset(bindparam("offset"))
         )
-        actual_stmt = mock_session.scalars.call_args[0][0]
+        actual_stmt, params = mock_session.scalars.call_args[0]
         assert str(expected_stmt) == str(actual_stmt)
+        assert params == {field: query_data, "limit": 10, "offset": 0}
 
     @pytest.mark.parametrize(
         "field, operator",
@@ -92,10 +123,58 @@ class TestTradingServiceRead:
         assert mock_session.scalars.call_count == 1
         assert mock_result.all.call_count == 1
         expected_stmt = (
-            select(SpimexTradingResults).where(operator(SpimexTradingResults.date, obj["date"])).limit(10).offset(0)
+            select_with_names()
+            .where(operator(SpimexTradingResults.date, bindparam(field)))
+            .order_by(SpimexTradingResults.date.desc(), SpimexTradingResults.id.desc())
+            .limit(bindparam("limit"))
+            .offset(bindparam("offset"))
         )
-        actual_stmt = mock_session.scalars.call_args[0][0]
+        actual_stmt, params = mock_session.scalars.call_args[0]
         assert str(expected_stmt) == str(actual_stmt)
+        assert params == {field: obj["date"], "limit": 10, "offset": 0}
+
+    async def test_filter_with_fields(self, mock_session: AsyncMock, trading_data: list[dict[str, Any]]):
+        """Проверяет, что при передаче `fields` выбираются только указанные колонки."""
+        fields = ["oil_id", "volume", "date"]
+        rows = [{field: obj[field] for field in fields} for obj in trading_data]
+        mock_result = Mock()
+        mock_result.mappings.return_value = rows
+        mock_session.execute.return_value = mock_result
+        service = self.trading_service(mock_session)
+        response = await service.filter(fields=fields)
+        assert response == rows
+        assert mock_session.execute.call_count == 1
+        assert mock_session.scalars.call_count == 0
+        expected_stmt = (
+            select(*[getattr(SpimexTradingResults, field) for field in fields])
+            .order_by(SpimexTradingResults.date.desc(), SpimexTradingResults.id.desc())
+            .limit(bindparam("limit"))
+            .offset(bindparam("offset"))
+        )
+        actual_stmt = mock_session.execute.call_args[0][0]
+        assert str(expected_stmt) == str(actual_stmt)
+
+    @pytest.mark.parametrize("fields", (None, ("id", "exchange_product_name", "delivery_basis_name")))
+    def test_filter_statement_joins_references(self, fields: tuple[str, ...] | None):
+        """Проверяет, что названия берутся соединением со справочниками, а не подзапросом на строку."""
+        sql = str(build_filter_statement(("oil_id",), fields))
+        assert "JOIN exchange_products" in sql and "JOIN delivery_bases" in sql
+        assert "(SELECT" not in sql
+
+    async def test_filter_closes_session_before_releasing_limiter(
+        self, mock_session: AsyncMock, trading_data: list[dict[str, Any]]
+    ):
+        """Проверяет, что место ограничения освобождается только после возврата соединения (закрытия сессии)."""
+        limiter = asyncio.Semaphore(1)
+        held_on_close = []
+        mock_session.close.side_effect = lambda: held_on_close.append(limiter.locked())
+        mock_result = Mock()
+        mock_result.all.return_value = trading_data
+        mock_session.scalars.return_value = mock_result
+        service = self.trading_service(mock_session, limiters={"filter": limiter})
+        assert await service.filter() == trading_data
+        assert held_on_close == [True]
+        assert not limiter.locked()
 
     @pytest.mark.parametrize(
         "field, value",
@@ -124,7 +203,9 @@ class TestTradingServiceWrite:
     async def test_mass_create_trading(self, mock_session: AsyncMock, trading_data: list[dict[str, Any]]):
         """Проверяет массовую вставку данных о торгах."""
         trading_service = self.trading_service(mock_session)
-        await trading_service.mass_create_trading(trading_data)
+        names = {name: i for i, obj in enumerate(trading_data, 1) for name in obj.values() if isinstance(name, str)}
+        with patch("services.tradings.reference_cache.resolve", AsyncMock(return_value=names)):
+            await trading_service.mass_create_trading(trading_data)
 
         # Проверяем, что execute был вызван один раз с правильными аргументами
         assert mock_session.execute.call_count == 1
@@ -133,3 +214,40 @@ class TestTradingServiceWrite:
 
         # Проверяем, что первый аргумент — это insert(SpimexTradingResults)
         assert str(actual_call_args[0][0]) == str(expected_call)
+        # Названия заменены идентификаторами справочников
+        for obj, row in zip(trading_data, actual_call_args[0][1]):
+            assert "exchange_product_name" not in row and "delivery_basis_name" not in row
+            assert row["exchange_product_name_id"] == names[obj["exchange_product_name"]]
+            assert row["delivery_basis_name_id"] == names[obj["delivery_basis_name"]]
+
+
+class TestTradingBatchService:
+    """Тесты для сервиса пакетных запросов TradingBatchService."""
+
+    @pytest.mark.usefixtures("test_redis_cache")
+    async def test_filter_many(self, trading_data: list[dict[str, Any]]):
+        """Проверяет, что каждый запрос выполняется в своей сессии, а результаты сохраняют порядок запросов."""
+        sessions = []
+
+        def session_factory():
+            mock_session = AsyncMock()
+            mock_result = Mock()
+            mock_result.all.return_value = [trading_data[len(sessions) % len(trading_data)]]
+            mock_session.scalars.return_value = mock_result
+            mock_session.__aenter__.return_value = mock_session
+            sessions.append(mock_session)
+            return mock_session
+
+        service = TradingBatchService(session_factory, limiter=asyncio.Semaphore(2))
+        queries = [{"oil_id": obj["oil_id"]} for obj in trading_data]
+        response = await service.filter_many(queries)
+        assert response == [[obj] for obj in trading_data]
+        assert len(sessions) == len(queries)
+        assert all(mock_session.scalars.call_count == 1 for mock_session in sessions)
+
+        # Ответы из кэша не ждут ограничение, даже если все его места заняты
+        busy = TradingBatchService(session_factory, limiter=asyncio.Semaphore(0))
+        response = await asyncio.wait_for(busy.filter_many(queries), timeout=1)
+        assert response == [[obj] for obj in trading_data]
+        assert len(sessions) == 2 * len(queries)
+        assert all(mock_session.scalars.call_count == 0 for mock_session in sessions[len(queries) :])
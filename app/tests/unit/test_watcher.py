@@ -0,0 +1,40 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+from watcher import BulletinWatcher
+
+
+@pytest.fixture
+def watcher() -> BulletinWatcher:
+    return BulletinWatcher(
+        publication_time=time(14, 11), lead=timedelta(minutes=5), min_interval=5, max_interval=60, backoff=2
+    )
+
+
+def test_sleeps_until_window(watcher: BulletinWatcher):
+    """До окна опроса процесс спит до его начала"""
+    now = datetime(2024, 12, 30, 13, 0)
+    assert not watcher.is_due(now)
+    assert watcher.next_delay(now) == timedelta(hours=1, minutes=6).total_seconds()
+
+
+def test_backs_off_after_publication_time(watcher: BulletinWatcher):
+    """До времени публикации интервал минимальный, после него растет до максимума"""
+    assert watcher.is_due(datetime(2024, 12, 30, 14, 6))
+    watcher.adapt(0, datetime(2024, 12, 30, 14, 8))
+    assert watcher.next_delay(datetime(2024, 12, 30, 14, 8)) == 5
+    delays = []
+    for _ in range(6):
+        watcher.adapt(0, datetime(2024, 12, 30, 14, 15))
+        delays.append(watcher.next_delay(datetime(2024, 12, 30, 14, 15)))
+    assert delays == [10, 20, 40, 60, 60, 60]
+
+
+def test_waits_for_next_day_after_load(watcher: BulletinWatcher):
+    """После загрузки бюллетеня за сегодня опрос возобновляется на следующий день"""
+    watcher.interval = 60
+    watcher.latest_date = date(2024, 12, 30)
+    now = datetime(2024, 12, 30, 14, 12)
+    assert not watcher.is_due(now)
+    assert watcher.next_delay(now) == timedelta(days=1, minutes=-6).total_seconds()
+    assert watcher.interval == 5
@@ -22,7 +22,7 @@ class XLSExtractor:
             else:
                 self.bidding_date = bidding_date
                 self.dataframe: pd.DataFrame = self._load_xls(file)
-                logger.info(f"Файл преобразован в DataFrame для даты {bidding_date}")
+                logger.info("Файл преобразован в DataFrame для даты %s", bidding_date)
         except ValueError as e:
             raise XLSExtractorError(e) from e
 
@@ -0,0 +1,67 @@
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass
+class IngestionStats:
+    """
+    Статистика загрузки бюллетеней.
+
+    Хранит счетчики файлов и строк, а также суммарное время и количество
+    вызовов по этапам (получение страницы, разбор, скачивание файла, извлечение
+    данных, запись в БД). Этапы выполняются конкурентно, поэтому сумма времени
+    этапов может превышать общее время загрузки.
+    """
+
+    pages: int = 0
+    files: int = 0
+    rows: int = 0
+    errors: int = 0
+    stage_time: dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    stage_calls: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    started: float = field(default_factory=time.perf_counter)
+    finished: float | None = None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Замеряет время выполнения этапа `name`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_time[name] += time.perf_counter() - started
+            self.stage_calls[name] += 1
+
+    def finish(self) -> None:
+        """Фиксирует окончание загрузки."""
+        self.finished = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        """Общее время загрузки в секундах."""
+        return (self.finished or time.perf_counter()) - self.started
+
+    def summary(self) -> dict[str, Any]:
+        """Возвращает сводку: пропускную способность и время по этапам."""
+        elapsed = self.elapsed
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "pages": self.pages,
+            "files": self.files,
+            "rows": self.rows,
+            "errors": self.errors,
+            "files_per_s": round(self.files / elapsed, 2) if elapsed else 0.0,
+            "rows_per_s": round(self.rows / elapsed, 2) if elapsed else 0.0,
+            "stages": {
+                name: {
+                    "calls": self.stage_calls[name],
+                    "total_s": round(total, 3),
+                    "mean_ms": round(total / self.stage_calls[name] * 1000, 3),
+                }
+                for name, total in self.stage_time.items()
+            },
+        }
@@ -0,0 +1,167 @@
+import os
+import time
+from pathlib import Path
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    generate_latest,
+    Histogram,
+    multiprocess,
+    push_to_gateway,
+    write_to_textfile,
+)
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from utils.ingestion_stats import IngestionStats
+
+# Границы гистограмм в секундах: от долей миллисекунды (Redis, кэш) до секунд (тяжелые выборки)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_CANCELLED = Counter(
+    "http_requests_cancelled_total", "Запросы, отмененные из-за разрыва соединения клиентом", ["route"]
+)
+HTTP_STATEMENT_TIMEOUTS = Counter(
+    "http_statement_timeouts_total", "Запросы, прерванные по statement_timeout", ["route"]
+)
+ADMISSION_QUEUED = Gauge(
+    "admission_queued", "Запросы, ждущие допуска к БД", ["route_class"], multiprocess_mode="livesum"
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total", "Запросы, отклоненные контролем допуска к БД", ["route_class", "reason"]
+)
+CACHE_REQUESTS = Counter("cache_requests_total", "Обращения к кэшу", ["method", "result"])
+REDIS_COMMAND_DURATION = Histogram(
+    "redis_command_duration_seconds", "Время выполнения команд Redis", ["command"], buckets=LATENCY_BUCKETS
+)
+DB_QUERY_DURATION = Histogram("db_query_duration_seconds", "Время выполнения запросов к БД", buckets=LATENCY_BUCKETS)
+DB_POOL_CHECKOUTS = Counter("db_pool_checkouts_total", "Выдачи соединений из пула", ["engine"])
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds", "Время ожидания соединения из пула", ["engine"], buckets=LATENCY_BUCKETS
+)
+# При нескольких процессах API (server.py) значения пулов живых процессов суммируются
+DB_POOL_SIZE = Gauge("db_pool_size", "Размер пула соединений", ["engine"], multiprocess_mode="livesum")
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Выданные соединения", ["engine"], multiprocess_mode="livesum")
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Соединения сверх размера пула", ["engine"], multiprocess_mode="livesum"
+)
+EVENT_SUBSCRIBERS = Gauge("event_subscribers", "Подключения к потоку событий", multiprocess_mode="livesum")
+EVENTS_DROPPED = Counter("events_dropped_total", "События, отброшенные из-за переполнения буфера подключения")
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, замеряющий время ожидания свободного соединения
+    и обновляющий метрики состояния пула при выдаче и возврате соединений.
+
+    Метка `engine` берется из `pool_logging_name` движка: это имя сохраняется
+    при пересоздании пула (`engine.dispose()`).
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.labels(self._engine_label).observe(time.perf_counter() - started)
+            self._update_gauges()
+
+    def _do_return_conn(self, record) -> None:
+        super()._do_return_conn(record)
+        self._update_gauges()
+
+    @property
+    def _engine_label(self) -> str:
+        return self._orig_logging_name or "default"
+
+    def _update_gauges(self) -> None:
+        # Значения сохраняются, а не вычисляются при сборе: в режиме нескольких
+        # процессов prometheus_client не поддерживает Gauge.set_function
+        label = self._engine_label
+        DB_POOL_SIZE.labels(label).set(self.size())
+        DB_POOL_CHECKED_OUT.labels(label).set(self.checkedout())
+        DB_POOL_OVERFLOW.labels(label).set(max(self.overflow(), 0))
+
+
+def instrument_engine(engine: AsyncEngine, name: str = "default") -> None:
+    """
+    Подключает метрики пула соединений движка.
+
+    Время ожидания соединения и состояние пула фиксируются только для
+    `InstrumentedQueuePool` (метка берется из `pool_logging_name`).
+
+    :param engine: Асинхронный движок SQLAlchemy.
+    :param name: Значение метки `engine`.
+    """
+    checkouts = DB_POOL_CHECKOUTS.labels(name)
+    event.listen(engine.sync_engine, "checkout", lambda *args: checkouts.inc())
+
+
+def collect_metrics() -> bytes:
+    """
+    Возвращает метрики в текстовом формате Prometheus.
+
+    Если задан `PROMETHEUS_MULTIPROC_DIR` (несколько процессов API, см. server.py),
+    метрики собираются из файлов всех процессов.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return generate_latest()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+def cache_method(key: str, prefix: str) -> str:
+    """
+    Возвращает метку метода по ключу кэша.
+
+    Ключи имеют вид `{prefix}:{namespace}:...`, где namespace - имя кэшируемого
+    метода (`TradingService.filter`) или раздела (`catalog`, `data_version`).
+    """
+    return key.removeprefix(f"{prefix}:").split(":", 1)[0] or "unknown"
+
+
+def write_ingestion_metrics(stats: IngestionStats, path: Path, pushgateway_url: str | None = None) -> None:
+    """
+    Сохраняет метрики загрузки бюллетеней в текстовом формате Prometheus.
+
+    Файл подходит для textfile-коллектора node_exporter и для отправки в
+    Pushgateway (`curl --data-binary @ingestion.prom .../metrics/job/ingestion`).
+
+    :param stats: Статистика загрузки.
+    :param path: Путь к файлу метрик.
+    :param pushgateway_url: Адрес Pushgateway (если задан, метрики отправляются и туда).
+    """
+    registry = CollectorRegistry()
+    for name, value, description in (
+        ("pages", stats.pages, "Обработанные страницы"),
+        ("files", stats.files, "Загруженные бюллетени"),
+        ("rows", stats.rows, "Загруженные строки"),
+        ("failures", stats.errors, "Ошибки загрузки"),
+    ):
+        Gauge(f"spimex_ingestion_{name}", description, registry=registry).set(value)
+    stage_seconds = Gauge(
+        "spimex_ingestion_stage_seconds", "Суммарное время этапа загрузки", ["stage"], registry=registry
+    )
+    stage_calls = Gauge("spimex_ingestion_stage_calls", "Количество вызовов этапа загрузки", ["stage"], registry=registry)
+    for stage, seconds in stats.stage_time.items():
+        stage_seconds.labels(stage).set(seconds)
+        stage_calls.labels(stage).set(stats.stage_calls[stage])
+    Gauge("spimex_ingestion_duration_seconds", "Общее время загрузки", registry=registry).set(stats.elapsed)
+    Gauge(
+        "spimex_ingestion_last_run_timestamp_seconds", "Время окончания последней загрузки", registry=registry
+    ).set_to_current_time()
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_to_textfile(str(path), registry)
+    if pushgateway_url:
+        push_to_gateway(pushgateway_url, job="spimex_ingestion", registry=registry)
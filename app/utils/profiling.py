@@ -0,0 +1,76 @@
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import ContextManager
+
+_NO_PROFILE = nullcontext()
+
+
+class RequestProfile:
+    """
+    Профиль одного запроса: время по этапам обработки.
+
+    Этапы `cache`, `db` и `orm` накапливаются по всем обращениям за запрос,
+    `dependencies`, `endpoint` и `serialization` вычисляются по отметкам начала
+    и окончания эндпоинта (см. `api.profiling.ProfiledRoute`).
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished: float | None = None
+        self.endpoint_started: float | None = None
+        self.endpoint_finished: float | None = None
+        self.stages: dict[str, float] = defaultdict(float)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Замеряет время этапа `name`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] += time.perf_counter() - started
+
+    def add(self, name: str, seconds: float) -> None:
+        """Добавляет время к этапу `name`."""
+        self.stages[name] += seconds
+
+    def finish(self) -> None:
+        """Фиксирует окончание обработки запроса."""
+        self.finished = time.perf_counter()
+
+    def timings(self) -> dict[str, float]:
+        """Возвращает время этапов в миллисекундах."""
+        finished = self.finished or time.perf_counter()
+        timings = {}
+        if self.endpoint_started is not None:
+            timings["dependencies"] = self.endpoint_started - self.started
+        for name in ("cache", "db", "orm"):
+            if name in self.stages:
+                timings[name] = self.stages[name]
+        if self.endpoint_started is not None and self.endpoint_finished is not None:
+            measured = sum(self.stages.values())
+            timings["endpoint"] = max(self.endpoint_finished - self.endpoint_started - measured, 0.0)
+            timings["serialization"] = finished - self.endpoint_finished
+        timings["total"] = finished - self.started
+        return {name: round(seconds * 1000, 3) for name, seconds in timings.items()}
+
+    def server_timing(self) -> str:
+        """Формирует значение заголовка `Server-Timing`."""
+        return ", ".join(f"{name};dur={duration}" for name, duration in self.timings().items())
+
+
+current_profile: ContextVar[RequestProfile | None] = ContextVar("current_profile", default=None)
+
+
+def profile_stage(name: str) -> ContextManager[None]:
+    """
+    Замеряет этап `name`, если для текущего запроса включено профилирование.
+
+    Без профилирования возвращает общий пустой контекстный менеджер, поэтому
+    накладные расходы сводятся к чтению контекстной переменной.
+    """
+    profile = current_profile.get()
+    return _NO_PROFILE if profile is None else profile.stage(name)
@@ -0,0 +1,123 @@
+import asyncio
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from configs.config import settings
+from configs.logging_config import logger
+from utils.metrics import DB_QUERY_DURATION
+from utils.profiling import current_profile
+
+
+@dataclass
+class SlowQuery:
+    """Медленный запрос: SQL, параметры, длительность и (если снят) план выполнения."""
+
+    statement: str
+    parameters: Any
+    duration_ms: float
+    executed_at: datetime = field(default_factory=datetime.now)
+    plan: str | None = None
+
+
+class QueryMonitor:
+    """
+    Мониторинг запросов к БД через события движка SQLAlchemy.
+
+    Время каждого запроса попадает в гистограмму `db_query_duration_seconds`.
+    Запросы дольше `threshold_ms` сохраняются в кольцевой буфер и пишутся в лог
+    вместе с параметрами. Для доли `sample_rate` медленных SELECT-запросов
+    в фоне снимается план `EXPLAIN (ANALYZE, BUFFERS)` на отдельном соединении;
+    одновременно снимается не больше одного плана, чтобы не нагружать БД.
+    """
+
+    def __init__(self, threshold_ms: float, sample_rate: float, size: int):
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.slow_queries: deque[SlowQuery] = deque(maxlen=size)
+        self._explaining = False
+        self._tasks: set[asyncio.Task] = set()
+
+    def instrument(self, engine: AsyncEngine) -> None:
+        """
+        Подключает мониторинг к движку.
+
+        :param engine: Асинхронный движок SQLAlchemy.
+        """
+        sync_engine = engine.sync_engine
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_started", []).append((context, time.perf_counter()))
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            _, started = conn.info["query_started"].pop()
+            duration = time.perf_counter() - started
+            DB_QUERY_DURATION.observe(duration)
+            if (profile := current_profile.get()) is not None:
+                profile.add("db", duration)
+            if duration * 1000 >= self.threshold_ms and not statement.startswith("EXPLAIN"):
+                self.record(engine, statement, parameters, duration * 1000, executemany)
+
+        @event.listens_for(sync_engine, "handle_error")
+        def handle_error(exception_context):
+            # Запрос, завершившийся ошибкой или отменой, не доходит до after_cursor_execute:
+            # без этого время его начала осталось бы в info соединения, которое живет в пуле
+            conn = exception_context.connection
+            started = conn.info.get("query_started") if conn is not None else None
+            if started and started[-1][0] is exception_context.execution_context:
+                started.pop()
+
+    def record(self, engine: AsyncEngine, statement: str, parameters: Any, duration_ms: float, executemany: bool):
+        """Сохраняет медленный запрос и при попадании в выборку планирует снятие плана."""
+        query = SlowQuery(statement, parameters, round(duration_ms, 3))
+        self.slow_queries.append(query)
+        logger.warning("Медленный запрос (%s мс): %s %s", query.duration_ms, statement, parameters)
+        if (
+            executemany
+            or self._explaining
+            or not statement.lstrip().upper().startswith("SELECT")
+            or random.random() >= self.sample_rate
+        ):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._explaining = True
+        task = loop.create_task(self._explain(engine, query))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _explain(self, engine: AsyncEngine, query: SlowQuery) -> None:
+        """Снимает план выполнения медленного запроса."""
+        try:
+            async with engine.connect() as conn:
+                # ANALYZE выполняет запрос повторно, поэтому запрещаем изменения данных
+                await conn.exec_driver_sql("SET TRANSACTION READ ONLY")
+                result = await conn.exec_driver_sql(
+                    f"EXPLAIN (ANALYZE, BUFFERS) {query.statement}", query.parameters
+                )
+                query.plan = "\n".join(row[0] for row in result)
+            logger.warning("План медленного запроса (%s мс):\n%s", query.duration_ms, query.plan)
+        except Exception as e:
+            logger.error("Не удалось получить план запроса: %s", e)
+        finally:
+            self._explaining = False
+
+    def recent(self, limit: int | None = None) -> list[SlowQuery]:
+        """Возвращает последние медленные запросы (новые первыми)."""
+        queries = list(reversed(self.slow_queries))
+        return queries[:limit] if limit else queries
+
+
+query_monitor = QueryMonitor(
+    settings.SLOW_QUERY_THRESHOLD_MS, settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE, settings.SLOW_QUERY_LOG_SIZE
+)
@@ -1,10 +1,56 @@
+import hashlib
+from collections.abc import Callable
 from datetime import datetime, timedelta
+from typing import Any
 
 import redis.asyncio as aioredis
 from fastapi_cache import FastAPICache
 from fastapi_cache.backends.redis import RedisBackend
+from starlette.requests import Request
+from starlette.responses import Response
 
 from configs.config import settings
+from utils.metrics import cache_method, CACHE_REQUESTS, REDIS_COMMAND_DURATION
+from utils.profiling import profile_stage
+
+
+class InstrumentedRedisBackend(RedisBackend):
+    """
+    Бэкенд кэша с метриками Prometheus.
+
+    Замеряет время команд Redis и считает попадания и промахи кэша
+    по пространствам имен ключей (кэшируемым методам сервисов).
+
+    Время жизни ключей с ограниченным сроком пересчитывается при записи до
+    ближайшей публикации бюллетеня (`get_expiries`): декоратор `cache` получает
+    `expire` один раз при импорте модуля, и без пересчета срок отсчитывался бы
+    от времени запуска процесса.
+    """
+
+    def __init__(self, redis: aioredis.Redis, prefix: str):
+        super().__init__(redis)
+        self.prefix = prefix
+
+    async def get_with_ttl(self, key: str) -> tuple[int, bytes | None]:
+        with REDIS_COMMAND_DURATION.labels("get_with_ttl").time(), profile_stage("cache"):
+            ttl, value = await super().get_with_ttl(key)
+        self._count(key, value)
+        return ttl, value
+
+    async def get(self, key: str) -> bytes | None:
+        with REDIS_COMMAND_DURATION.labels("get").time(), profile_stage("cache"):
+            value = await super().get(key)
+        self._count(key, value)
+        return value
+
+    async def set(self, key: str, value: bytes, expire: int | None = None) -> None:
+        if expire:
+            expire = get_expiries()
+        with REDIS_COMMAND_DURATION.labels("set").time(), profile_stage("cache"):
+            await super().set(key, value, expire)
+
+    def _count(self, key: str, value: bytes | None) -> None:
+        CACHE_REQUESTS.labels(cache_method(key, self.prefix), "miss" if value is None else "hit").inc()
 
 
 async def get_redis() -> aioredis.Redis:
@@ -15,7 +61,8 @@ async def get_redis() -> aioredis.Redis:
     """
     host = settings.REDIS_HOST
     port = settings.REDIS_PORT
-    redis = aioredis.from_url(f"redis://{host}:{port}", encoding="utf8", decode_responses=True)
+    # Ответы не декодируются: кодеры fastapi-cache и сервисы кэша работают с bytes
+    redis = aioredis.from_url(f"redis://{host}:{port}", encoding="utf8")
     return redis
 
 
@@ -26,19 +73,49 @@ async def init_redis() -> aioredis.Redis:
     :return: Экземпляр асинхронного клиента Redis.
     """
     redis_client = await get_redis()
-    FastAPICache.init(RedisBackend(redis_client), prefix=settings.CACHE_PREFIX)
+    FastAPICache.init(InstrumentedRedisBackend(redis_client, settings.CACHE_PREFIX), prefix=settings.CACHE_PREFIX)
     return redis_client
 
 
 def get_expiries() -> int:
     """
-    Рассчитывает время (в секундах) до ближайшего сброса кэша в 14:11.
+    Рассчитывает время (в секундах) до ближайшего сброса кэша
+    во время публикации бюллетеня (`BULLETIN_PUBLICATION_TIME`, по умолчанию 14:11).
 
     :return: Количество секунд до следующего сброса.
     """
     now = datetime.now()
-    reset_time = now.replace(hour=14, minute=11, second=0, microsecond=0)
+    publication_time = settings.BULLETIN_PUBLICATION_TIME
+    reset_time = now.replace(hour=publication_time.hour, minute=publication_time.minute, second=0, microsecond=0)
     if now > reset_time:
         reset_time += timedelta(days=1)
 
     return (reset_time - now).seconds
+
+
+def service_key_builder(
+    func: Callable[..., Any],
+    namespace: str = "",
+    *,
+    request: Request | None = None,
+    response: Response | None = None,
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+) -> str:
+    """
+    Формирует ключ кэша для методов сервисов.
+
+    В отличие от `default_key_builder` не учитывает экземпляр сервиса (`self`),
+    который создается заново на каждый запрос, и не зависит от порядка
+    именованных аргументов.
+
+    :param func: Кэшируемый метод сервиса.
+    :param namespace: Пространство имен кэша.
+    :param args: Позиционные аргументы вызова (первый из них - экземпляр сервиса).
+    :param kwargs: Именованные аргументы вызова.
+    :return: Ключ кэша.
+    """
+    cache_key = hashlib.md5(  # noqa: S324
+        f"{func.__module__}:{func.__qualname__}:{args[1:]}:{sorted(kwargs.items())}".encode()
+    ).hexdigest()
+    return f"{namespace}:{cache_key}"
@@ -0,0 +1,165 @@
+"""
+Наблюдение за публикацией бюллетеней.
+
+Долго работающий процесс опрашивает первую страницу результатов торгов,
+начиная незадолго до ожидаемого времени публикации (`BULLETIN_PUBLICATION_TIME`),
+и загружает новый бюллетень сразу после его появления, после чего очищает
+кэш API и обновляет версию данных. Пока бюллетеня нет, интервал опроса
+растет; после загрузки бюллетеня за текущий день опрос возобновляется
+на следующий день.
+
+Запуск:
+
+    python watcher.py
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from datetime import date, datetime, time, timedelta
+
+from aiohttp import ClientSession
+from parser_main import download_data, process_page, refresh_derived_data
+from services.bulletin_writer import BulletinWriter
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from configs.config import settings
+from configs.logging_config import logger
+from database.database import PrimarySessionLocal
+from database.models import SpimexTradingResults
+from utils.ingestion_stats import IngestionStats
+
+
+class BulletinWatcher:
+    """
+    Опрос первой страницы результатов торгов с адаптивным интервалом.
+
+    - до окна опроса (`lead` до времени публикации) процесс спит до его начала;
+    - в окне до времени публикации страница опрашивается каждые `min_interval` секунд;
+    - после времени публикации интервал растет в `backoff` раз после каждого
+      опроса без нового бюллетеня, но не больше `max_interval`;
+    - после загрузки бюллетеня за текущий день процесс спит до окна следующего дня.
+    """
+
+    def __init__(
+        self,
+        base_url: str = settings.SPIMEX_BASE_URL,
+        session_factory: async_sessionmaker = PrimarySessionLocal,
+        publication_time: time = settings.BULLETIN_PUBLICATION_TIME,
+        lead: timedelta = timedelta(minutes=settings.WATCHER_LEAD_MINUTES),
+        min_interval: float = settings.WATCHER_MIN_INTERVAL,
+        max_interval: float = settings.WATCHER_MAX_INTERVAL,
+        backoff: float = settings.WATCHER_BACKOFF,
+        on_loaded: Callable[[], Awaitable[None]] = refresh_derived_data,
+        clock: Callable[[], datetime] = datetime.now,
+    ):
+        """
+        :param base_url: Адрес сайта биржи.
+        :param session_factory: Фабрика сессий БД.
+        :param publication_time: Ожидаемое время публикации бюллетеня.
+        :param lead: За сколько до времени публикации начинать опрос.
+        :param min_interval: Начальный интервал опроса в секундах.
+        :param max_interval: Максимальный интервал опроса в секундах.
+        :param backoff: Множитель интервала после опроса без нового бюллетеня.
+        :param on_loaded: Вызывается после загрузки новых бюллетеней (очистка кэша, версия данных).
+        :param clock: Источник текущего времени.
+        """
+        self.base_url = base_url
+        self.session_factory = session_factory
+        self.publication_time = publication_time
+        self.lead = lead
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.on_loaded = on_loaded
+        self.clock = clock
+        self.interval = min_interval
+        self.latest_date: date | None = None
+
+    def window_start(self, day: date) -> datetime:
+        """Начало окна опроса в день `day`."""
+        return datetime.combine(day, self.publication_time) - self.lead
+
+    def is_due(self, now: datetime) -> bool:
+        """Нужно ли опрашивать страницу: бюллетень за сегодня не загружен и окно опроса началось."""
+        loaded_today = self.latest_date is not None and self.latest_date >= now.date()
+        return not loaded_today and now >= self.window_start(now.date())
+
+    def next_delay(self, now: datetime) -> float:
+        """
+        Возвращает паузу до следующего опроса в секундах.
+
+        :param now: Текущее время.
+        """
+        if self.latest_date is not None and self.latest_date >= now.date():
+            self.interval = self.min_interval
+            return (self.window_start(now.date() + timedelta(days=1)) - now).total_seconds()
+        if now < self.window_start(now.date()):
+            self.interval = self.min_interval
+            return (self.window_start(now.date()) - now).total_seconds()
+        return self.interval
+
+    def adapt(self, loaded: int, now: datetime) -> None:
+        """
+        Пересчитывает интервал опроса по результату опроса.
+
+        :param loaded: Количество загруженных бюллетеней.
+        :param now: Время опроса.
+        """
+        if loaded:
+            self.interval = self.min_interval
+        elif now >= datetime.combine(now.date(), self.publication_time):
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+
+    async def load_latest_date(self) -> date | None:
+        """Возвращает дату последнего загруженного бюллетеня."""
+        async with self.session_factory() as db:
+            return await db.scalar(select(func.max(SpimexTradingResults.date)))
+
+    async def poll(self, session: ClientSession) -> int:
+        """
+        Опрашивает первую страницу и загружает бюллетени новее последнего загруженного.
+
+        :param session: HTTP-сессия.
+        :return: Количество загруженных бюллетеней.
+        """
+        stats = IngestionStats()
+        now = self.clock()
+        file_links, _ = await process_page(session, 1, stats, self.base_url, settings.PARSER_MIN_YEAR, now.year)
+        new_links = [
+            (link, bidding_date)
+            for link, bidding_date in file_links
+            if self.latest_date is None or bidding_date > self.latest_date
+        ]
+        if not new_links:
+            return 0
+        async with BulletinWriter(self.session_factory, stats, batch_size=len(new_links)) as writer:
+            await asyncio.gather(
+                *(download_data(session, self.base_url + link, day, writer, stats) for link, day in new_links)
+            )
+        if stats.files:
+            self.latest_date = await self.load_latest_date()
+            logger.info("Загружено бюллетеней: %s, последняя дата торгов %s", stats.files, self.latest_date)
+            await self.on_loaded()
+        return stats.files
+
+    async def run(self) -> None:
+        """Опрашивает страницу результатов торгов до остановки процесса."""
+        self.latest_date = await self.load_latest_date()
+        logger.info("Наблюдение за бюллетенями запущено, последняя дата торгов %s", self.latest_date)
+        async with ClientSession() as session:
+            while True:
+                if self.is_due(self.clock()):
+                    try:
+                        loaded = await self.poll(session)
+                    except Exception as e:
+                        logger.error("Ошибка при опросе страницы результатов: %s", e, exc_info=True)
+                        loaded = 0
+                    self.adapt(loaded, self.clock())
+                delay = self.next_delay(self.clock())
+                logger.debug("Следующий опрос через %.0f с", delay)
+                await asyncio.sleep(delay)
+
+
+if __name__ == "__main__":
+    asyncio.run(BulletinWatcher().run())